@@ -19,15 +19,101 @@ class Settings(BaseSettings):
 
     # AI Try-On
     USE_MOCK_AI: bool = False
+    TRYON_ENGINE: str = "remote"  # "remote" (HF spaces) or "local" (instant CPU preview)
     HF_TOKEN: str = ""  # HuggingFace token for higher ZeroGPU quota
 
+    # Gradio client pool — warm clients reused across remote try-ons
+    GRADIO_PREWARM: bool = True  # build clients for both spaces at startup (skipped in mock mode)
+    GRADIO_POOL_MAX_IDLE: int = 4  # idle clients kept per (space, token)
+    GRADIO_POOL_IDLE_TTL_SECONDS: int = 900
+    UPLOAD_HANDLE_TTL_SECONDS: int = 1800  # reuse a space-side upload for this long
+    UPLOAD_HANDLE_MAX_ENTRIES: int = 1000
+
+    # Remote try-on executor — dedicated threads, per-space concurrency limits
+    TRYON_TIMEOUT_SECONDS: int = 120
+    TRYON_EXECUTOR_WORKERS: int = 8
+    IDM_VTON_MAX_CONCURRENCY: int = 4
+    OOTD_MAX_CONCURRENCY: int = 4
+
+    # Quality tiers — named parameter overrides per space; fewer steps = lower latency
+    TRYON_DEFAULT_QUALITY: str = "standard"
+    TRYON_BATCH_QUALITY: str = "fast"  # batch try-ons favour throughput
+    IDM_VTON_PRESETS: dict[str, dict] = {
+        "fast": {"denoise_steps": 15},
+        "standard": {"denoise_steps": 30},
+        "high": {"denoise_steps": 40},
+    }
+    OOTD_PRESETS: dict[str, dict] = {
+        "fast": {"n_steps": 10, "image_scale": 1.5},
+        "standard": {"n_steps": 20, "image_scale": 2.0},
+        "high": {"n_steps": 30, "image_scale": 2.0},
+    }
+
+    # Upload normalization — inputs are downsized to each space's working resolution
+    IDM_VTON_UPLOAD_SIZE: str = "768x1024"  # WIDTHxHEIGHT
+    OOTD_UPLOAD_SIZE: str = "768x1024"
+    TRYON_UPLOAD_FORMAT: str = "JPEG"  # JPEG or WEBP
+    TRYON_UPLOAD_QUALITY: int = 90
+
     # Google Gemini
     GEMINI_API_KEY: str = ""
+    GEMINI_MAX_CONCURRENCY: int = 4  # concurrent model calls; the rest wait for a slot
+    GEMINI_TIMEOUT_SECONDS: float = 20.0  # slot wait + model time, then the caller falls back
+    GEMINI_STREAM_IDLE_SECONDS: float = 10.0  # longest gap between streamed chunks (the first gets GEMINI_TIMEOUT_SECONDS)
+    RECOMMEND_CACHE_ENABLED: bool = True  # identical /recommend requests reuse the suggestion
+    RECOMMEND_CACHE_TTL_SECONDS: int = 24 * 3600
+    RECOMMEND_CACHE_MAX_ENTRIES: int = 1024
+    RECOMMEND_CACHE_SQLITE: bool = False  # share entries across workers through the metadata DB
+    COMBO_TIP_REFRESH_SECONDS: int = 6 * 3600  # combo tips are regenerated in the background this often
+    WARDROBE_DESCRIPTIONS: bool = True  # saved results get a Gemini outfit description for wardrobe search
 
     # Paths
     TEMP_DIR: Path = Path(__file__).parent.parent / "temp"
     STORAGE_DIR: Path = Path(__file__).parent.parent / "storage" / "images"
     DB_PATH: Path = Path(__file__).parent.parent / "storage" / "metadata.db"
+    DB_POOL_SIZE: int = 4  # threads (each with its own connection) behind run_db
+    DB_BUSY_TIMEOUT_MS: int = 5000  # how long a writer waits for the lock before erroring
+    METADATA_BATCH_WINDOW_MS: int = 20  # image rows arriving within this window share one commit
+    METADATA_BATCH_MAX: int = 200
+
+    # Upload ingestion — streamed to TEMP_DIR in chunks, rejected early when too large
+    UPLOAD_MAX_BYTES: int = 20 * 1024 * 1024
+    UPLOAD_MAX_PIXELS: int = 40_000_000  # width x height, read from the image header
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+    UPLOAD_MIN_SIDE: int = 128  # smaller images can't produce a usable try-on
+    UPLOAD_FORMATS: str = "JPEG,PNG,WEBP,MPO"  # PIL format names; MPO is a multi-picture phone JPEG
+
+    # Image derivatives — /images/{path}?w=256&fmt=webp, cached on disk by (source hash, params)
+    DERIVATIVE_CACHE_DIR: Path = Path(__file__).parent.parent / "storage" / "derivatives"
+    DERIVATIVE_WIDTHS: str = "128,256,512,1024"  # whitelist — keeps the cache bounded
+    DERIVATIVE_FORMATS: str = "webp,jpeg,png,avif"
+    DERIVATIVE_QUALITY: int = 80
+
+    # Frontend static files — gzip/brotli variants are built at startup into STATIC_CACHE_DIR
+    STATIC_CACHE_DIR: Path = Path(__file__).parent.parent / "storage" / "static_cache"
+    STATIC_MAX_AGE: int = 3600  # seconds for JS/CSS/images; HTML always revalidates
+
+    # Janitor — background cleanup of temp uploads and stored results
+    JANITOR_ENABLED: bool = True
+    JANITOR_INTERVAL_SECONDS: int = 600
+    TEMP_TTL_SECONDS: int = 2 * 3600  # temp uploads older than this are deleted (except inputs of unfinished jobs)
+    STORAGE_MAX_BYTES: int = 5 * 1024 * 1024 * 1024  # least recently accessed results evicted above this
+
+    # Try-on result cache — repeat try-ons skip the remote space entirely
+    TRYON_CACHE_ENABLED: bool = True
+    TRYON_CACHE_DIR: Path = Path(__file__).parent.parent / "storage" / "tryon_cache"
+    TRYON_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    TRYON_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    TRYON_CACHE_MEMORY_ITEMS: int = 32
+
+    # Try-on jobs — async /try_on/jobs API
+    TRYON_JOB_WORKERS: int = 2
+    TRYON_JOB_QUEUE_SIZE: int = 5000
+    TRYON_JOB_TTL_SECONDS: int = 3600  # how long finished jobs stay retrievable
+
+    # Batch try-on — one person, many garments
+    TRYON_BATCH_MAX_GARMENTS: int = 10
+    TRYON_BATCH_CONCURRENCY: int = 3
 
     model_config = {
         "env_file": os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env"),
@@ -42,6 +128,21 @@ class Settings(BaseSettings):
             return ["*"]
         return [o.strip() for o in self.CORS_ORIGINS.split(",") if o.strip()]
 
+    @property
+    def derivative_width_list(self) -> list[int]:
+        """Parse DERIVATIVE_WIDTHS into a list of ints."""
+        return [int(w) for w in self.DERIVATIVE_WIDTHS.split(",") if w.strip()]
+
+    @property
+    def derivative_format_list(self) -> list[str]:
+        """Parse DERIVATIVE_FORMATS into a list."""
+        return [f.strip().lower() for f in self.DERIVATIVE_FORMATS.split(",") if f.strip()]
+
+    @property
+    def upload_format_list(self) -> list[str]:
+        """Parse UPLOAD_FORMATS into a list."""
+        return [f.strip().upper() for f in self.UPLOAD_FORMATS.split(",") if f.strip()]
+
 
 @lru_cache()
 def get_settings() -> Settings:
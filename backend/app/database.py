@@ -1,50 +1,531 @@
 """
 SQLite database for storing image metadata.
+
+Each thread keeps one connection per database file, opened once in WAL mode
+with ``synchronous=NORMAL`` and a busy timeout, so readers never block the
+writer and concurrent writers wait briefly instead of failing. Writes take
+the lock up front (``BEGIN IMMEDIATE``) rather than upgrading mid-transaction.
+
+The functions below are blocking. From async code, call them through
+``run_db``, which runs them on a small dedicated thread pool.
 """
+import asyncio
+import functools
+import re
 import sqlite3
-import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
 
 from app.config import get_settings
 
+_local = threading.local()
+_registry_lock = threading.Lock()
+_connections: list[sqlite3.Connection] = []
+# Bumped by close_connections() so threads drop their cached handles
+_generation = 0
+
+_executor: Optional[ThreadPoolExecutor] = None
+
 
 def get_db_connection() -> sqlite3.Connection:
-    """Get a connection to the SQLite database."""
+    """Return this thread's connection to the database. Don't close it."""
+    db_path = get_settings().DB_PATH
+    cache = getattr(_local, "connections", None)
+    if cache is None or _local.generation != _generation:
+        cache = _local.connections = {}
+        _local.generation = _generation
+
+    conn = cache.get(db_path)
+    if conn is None:
+        conn = cache[db_path] = _open(db_path)
+    return conn
+
+
+def _open(db_path: Path) -> sqlite3.Connection:
     settings = get_settings()
-    # Ensure parent directory exists
-    settings.DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    
-    conn = sqlite3.connect(settings.DB_PATH)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Autocommit mode: transactions are explicit (see _write)
+    conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {int(settings.DB_BUSY_TIMEOUT_MS)}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    # Safe in WAL mode: a crash can lose the last commits, never corrupt the file
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    with _registry_lock:
+        _connections.append(conn)
     return conn
 
 
+@contextmanager
+def _write() -> Iterator[sqlite3.Connection]:
+    """Run a write transaction on this thread's connection."""
+    conn = get_db_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def close_connections() -> None:
+    """Close every open connection; threads reopen lazily on next use."""
+    global _generation
+    with _registry_lock:
+        _generation += 1
+        for conn in _connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _connections.clear()
+
+
+# ── Async facade ────────────────────────────────────────────────────
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=get_settings().DB_POOL_SIZE, thread_name_prefix="db"
+        )
+    return _executor
+
+
+async def run_db(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking database function off the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_db() -> None:
+    """Stop the database thread pool and close all connections."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    close_connections()
+
+
+def db_stats() -> dict:
+    with _registry_lock:
+        open_connections = len(_connections)
+    return {
+        "connections": open_connections,
+        "pool_size": get_settings().DB_POOL_SIZE,
+    }
+
+
+# ── Images ──────────────────────────────────────────────────────────
+
+# Optional wardrobe metadata columns on the images table
+IMAGE_META_FIELDS = (
+    "owner", "name", "style", "accessories", "category", "description",
+    "width", "height", "byte_size", "content_hash",
+)
+
+_IMAGE_COLUMNS = {
+    "owner": "TEXT",
+    "name": "TEXT",  # user-given item name
+    "style": "TEXT",
+    "accessories": "TEXT",  # comma-separated; also one image_accessories row per tag
+    "category": "TEXT",
+    "description": "TEXT",  # AI-generated description of the outfit
+    "width": "INTEGER",
+    "height": "INTEGER",
+    "byte_size": "INTEGER",
+    "content_hash": "TEXT",
+}
+
+# Listing is newest-first by id, so every filter index ends in id for keyset scans
+_IMAGE_INDEXES = {
+    "idx_images_url": "images (url)",
+    "idx_images_owner": "images (owner, id)",
+    "idx_images_owner_style": "images (owner, style, id)",
+    "idx_images_owner_category": "images (owner, category, id)",
+    "idx_images_style": "images (style, id)",
+    "idx_images_category": "images (category, id)",
+    "idx_images_hash": "images (content_hash)",
+}
+
+
 def init_db():
     """Initialize the database tables."""
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS images (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            filename TEXT UNIQUE NOT NULL,
-            url TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    with _write() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS images (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT UNIQUE NOT NULL,
+                url TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # Databases from before the wardrobe columns get them added in place
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(images)")}
+        for column, sql_type in _IMAGE_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE images ADD COLUMN {column} {sql_type}")
+
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS image_accessories (
+                tag TEXT NOT NULL,
+                image_id INTEGER NOT NULL REFERENCES images (id) ON DELETE CASCADE,
+                PRIMARY KEY (tag, image_id)
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_image_accessories_image ON image_accessories (image_id)')
+
+        # Content-addressed result files, shared by every image row whose url points at them
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS blobs (
+                path TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                refcount INTEGER NOT NULL DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        for name, target in _IMAGE_INDEXES.items():
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {target}')
+
+        _create_search_index(conn)
+
+        # Second tier of the recommendation cache, shared by every worker process
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS recommendation_cache (
+                key TEXT PRIMARY KEY,
+                suggestion TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+
+
+# ── Search ──────────────────────────────────────────────────────────
+
+# Columns indexed for wardrobe search, with their bm25 weights
+_SEARCH_COLUMNS = {
+    "name": 10.0,
+    "style": 5.0,
+    "accessories": 5.0,
+    "category": 2.0,
+    "description": 1.0,
+}
+
+
+def _create_search_index(conn: sqlite3.Connection) -> None:
+    """FTS5 index over the images table, kept in sync by triggers."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'images_fts'"
+    ).fetchone()
+    columns = ", ".join(_SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{c}" for c in _SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{c}" for c in _SEARCH_COLUMNS)
+
+    # External-content table: the text lives in images, FTS only stores the index.
+    # Prefix indexes make short prefix queries ("wat*") index lookups.
+    conn.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS images_fts USING fts5(
+            {columns},
+            content='images', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
         )
     ''')
-    conn.commit()
-    conn.close()
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS images_fts_insert AFTER INSERT ON images BEGIN
+            INSERT INTO images_fts (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS images_fts_delete AFTER DELETE ON images BEGIN
+            INSERT INTO images_fts (images_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+    ''')
+    # Only the indexed columns — url rewrites by the storage migration don't touch the index
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS images_fts_update AFTER UPDATE OF {columns} ON images BEGIN
+            INSERT INTO images_fts (images_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO images_fts (rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
+    if not exists:
+        # Index rows stored before the search table existed
+        conn.execute("INSERT INTO images_fts (images_fts) VALUES ('rebuild')")
 
 
-def save_image_metadata(filename: str, url: str) -> int:
-    """Save image metadata and return the new ID."""
-    conn = get_db_connection()
-    c = conn.cursor()
-    try:
-        c.execute(
-            'INSERT INTO images (filename, url) VALUES (?, ?)',
-            (filename, url)
+def _match_expression(query: str) -> str | None:
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    # Quoting keeps FTS syntax (AND, NEAR, *, ...) in user input literal
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_images(query: str, owner: str | None = None, limit: int = 50) -> list[dict]:
+    """Return image rows matching ``query``, best match first."""
+    match = _match_expression(query)
+    if match is None:
+        return []
+
+    weights = ", ".join(str(w) for w in _SEARCH_COLUMNS.values())
+    sql = f'''
+        SELECT i.*, bm25(images_fts, {weights}) AS score
+        FROM images_fts JOIN images i ON i.id = images_fts.rowid
+        WHERE images_fts MATCH ?
+    '''
+    params: list[Any] = [match]
+    if owner is not None:
+        sql += " AND i.owner = ?"
+        params.append(owner)
+    sql += " ORDER BY score, i.id DESC LIMIT ?"
+    params.append(limit)
+    return [dict(row) for row in get_db_connection().execute(sql, params)]
+
+
+def parse_accessories(accessories: str | list[str] | None) -> list[str]:
+    """Normalise accessory tags: lower-case, trimmed, de-duplicated, in order."""
+    if not accessories:
+        return []
+    if isinstance(accessories, str):
+        accessories = accessories.split(",")
+    tags = []
+    for tag in accessories:
+        tag = tag.strip().lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def _insert_image(
+    conn: sqlite3.Connection,
+    filename: str,
+    url: str,
+    meta: dict | None,
+    blob: tuple[str, str, int] | None = None,
+) -> int:
+    meta = {k: v for k, v in (meta or {}).items() if v is not None}
+    unknown = set(meta) - set(IMAGE_META_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown image fields: {', '.join(sorted(unknown))}")
+
+    tags = parse_accessories(meta.get("accessories"))
+    if tags:
+        meta["accessories"] = ",".join(tags)
+    else:
+        meta.pop("accessories", None)
+
+    columns = ["filename", "url", *meta]
+    placeholders = ", ".join("?" * len(columns))
+    image_id = conn.execute(
+        f'INSERT INTO images ({", ".join(columns)}) VALUES ({placeholders})',
+        (filename, url, *meta.values()),
+    ).lastrowid
+    if tags:
+        conn.executemany(
+            'INSERT INTO image_accessories (tag, image_id) VALUES (?, ?)',
+            [(tag, image_id) for tag in tags],
+        )
+    if blob is not None:
+        _add_blob_reference(conn, *blob)
+    return image_id
+
+
+def save_image_metadata(
+    filename: str, url: str, meta: dict | None = None, blob: tuple[str, str, int] | None = None
+) -> int:
+    """
+    Save image metadata (optional fields in ``meta``, see IMAGE_META_FIELDS) and return the new ID.
+
+    ``blob`` is the (path, hash, size) of the stored file the row points at;
+    its reference is counted in the same transaction.
+    """
+    with _write() as conn:
+        return _insert_image(conn, filename, url, meta, blob)
+
+
+def insert_images(rows: list[tuple]) -> list[int]:
+    """Insert (filename, url, meta[, blob]) rows in one transaction and return their IDs in order."""
+    with _write() as conn:
+        return [_insert_image(conn, *row) for row in rows]
+
+
+def list_images(
+    owner: str | None = None,
+    style: str | None = None,
+    category: str | None = None,
+    accessory: str | None = None,
+    before_id: int | None = None,
+    limit: int = 50,
+) -> list[dict]:
+    """
+    Return image rows newest first, filtered by any of the given fields.
+
+    Keyset pagination: pass the last row's id as ``before_id`` for the next
+    page. Every filter combination is served by an index ending in ``id``, so
+    a page costs the same at row 100 as at row 1,000,000.
+    """
+    where, params = [], []
+    for column, value in (("owner", owner), ("style", style), ("category", category)):
+        if value is not None:
+            where.append(f"i.{column} = ?")
+            params.append(value)
+
+    if accessory is not None:
+        # Drive the scan from the tag index, which is ordered by image id
+        source = "image_accessories a JOIN images i ON i.id = a.image_id"
+        id_column = "a.image_id"
+        where.insert(0, "a.tag = ?")
+        params.insert(0, accessory.strip().lower())
+    else:
+        source = "images i"
+        id_column = "i.id"
+
+    if before_id is not None:
+        where.append(f"{id_column} < ?")
+        params.append(before_id)
+
+    sql = f"SELECT i.* FROM {source}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {id_column} DESC LIMIT ?"
+    params.append(limit)
+    return [dict(row) for row in get_db_connection().execute(sql, params)]
+
+
+def get_image_url(filename: str) -> str | None:
+    """Return the current URL of an image by its original filename, or None."""
+    row = get_db_connection().execute('SELECT url FROM images WHERE filename = ?', (filename,)).fetchone()
+    return row["url"] if row else None
+
+
+def list_image_urls() -> list[str]:
+    """Return the URL of every stored image."""
+    return [row["url"] for row in get_db_connection().execute('SELECT url FROM images')]
+
+
+def delete_images_by_url(urls: list[str], blob_paths: dict[str, str] | None = None) -> int:
+    """
+    Delete image rows pointing at the given URLs and return how many were removed.
+
+    ``blob_paths`` maps a URL to the blob behind it: each removed row drops
+    one reference to that blob, and a blob left with none is deleted.
+    """
+    if not urls:
+        return 0
+    blob_paths = blob_paths or {}
+    removed = 0
+    with _write() as conn:
+        for url in urls:
+            count = conn.execute('DELETE FROM images WHERE url = ?', (url,)).rowcount
+            removed += count
+            if count and url in blob_paths:
+                _release_blob(conn, blob_paths[url], count)
+        return removed
+
+
+def delete_image(image_id: int) -> str | None:
+    """Delete one image row and return the URL it pointed at, or None if there was no such row."""
+    with _write() as conn:
+        row = conn.execute('SELECT url FROM images WHERE id = ?', (image_id,)).fetchone()
+        if row is None:
+            return None
+        conn.execute('DELETE FROM images WHERE id = ?', (image_id,))
+        return row["url"]
+
+
+def set_image_url(filename: str, url: str) -> None:
+    """Point an existing image row at a new URL."""
+    with _write() as conn:
+        conn.execute('UPDATE images SET url = ? WHERE filename = ?', (url, filename))
+
+
+def get_image_description(url: str) -> str | None:
+    """Return the description stored on any image row with this URL, or None."""
+    row = get_db_connection().execute(
+        'SELECT description FROM images WHERE url = ? AND description IS NOT NULL LIMIT 1', (url,)
+    ).fetchone()
+    return row["description"] if row else None
+
+
+def set_image_description(url: str, description: str) -> int:
+    """Fill in the description of undescribed image rows with this URL; returns how many were updated."""
+    with _write() as conn:
+        return conn.execute(
+            'UPDATE images SET description = ? WHERE url = ? AND description IS NULL', (description, url)
+        ).rowcount
+
+
+# ── Recommendation cache ────────────────────────────────────────────
+
+def get_cached_recommendation(key: str, now: float) -> tuple[str, float] | None:
+    """Return (suggestion, expires_at) for an unexpired cache entry, or None."""
+    row = get_db_connection().execute(
+        'SELECT suggestion, expires_at FROM recommendation_cache WHERE key = ? AND expires_at > ?',
+        (key, now),
+    ).fetchone()
+    return (row["suggestion"], row["expires_at"]) if row else None
+
+
+def put_cached_recommendation(key: str, suggestion: str, expires_at: float, purge: bool = False) -> None:
+    """Store a cache entry; with ``purge``, also delete expired ones."""
+    with _write() as conn:
+        conn.execute(
+            'INSERT OR REPLACE INTO recommendation_cache (key, suggestion, expires_at) VALUES (?, ?, ?)',
+            (key, suggestion, expires_at),
         )
-        conn.commit()
-        return c.lastrowid
-    finally:
-        conn.close()
+        if purge:
+            conn.execute('DELETE FROM recommendation_cache WHERE expires_at <= ?', (time.time(),))
+
+
+# ── Blobs ───────────────────────────────────────────────────────────
+
+def add_blob_reference(path: str, content_hash: str, size: int) -> bool:
+    """Count one more reference to a blob. Returns True if the blob is new."""
+    with _write() as conn:
+        return _add_blob_reference(conn, path, content_hash, size)
+
+
+def _add_blob_reference(conn: sqlite3.Connection, path: str, content_hash: str, size: int) -> bool:
+    c = conn.execute('UPDATE blobs SET refcount = refcount + 1 WHERE path = ?', (path,))
+    if c.rowcount == 0:
+        conn.execute(
+            'INSERT INTO blobs (path, hash, size) VALUES (?, ?, ?)',
+            (path, content_hash, size)
+        )
+    return c.rowcount == 0
+
+
+def release_blob_reference(path: str) -> int:
+    """Drop one reference to a blob and return how many remain (0 = row deleted)."""
+    with _write() as conn:
+        return _release_blob(conn, path, 1)
+
+
+def _release_blob(conn: sqlite3.Connection, path: str, count: int) -> int:
+    conn.execute('UPDATE blobs SET refcount = refcount - ? WHERE path = ?', (count, path))
+    row = conn.execute('SELECT refcount FROM blobs WHERE path = ?', (path,)).fetchone()
+    remaining = row["refcount"] if row else 0
+    if row and remaining <= 0:
+        conn.execute('DELETE FROM blobs WHERE path = ?', (path,))
+    return max(remaining, 0)
+
+
+def list_blob_paths() -> list[str]:
+    """Return the path of every blob."""
+    return [row["path"] for row in get_db_connection().execute('SELECT path FROM blobs')]
+
+
+def delete_blobs(paths: list[str]) -> int:
+    """Delete blob rows outright (their files are gone) and return how many were removed."""
+    if not paths:
+        return 0
+    with _write() as conn:
+        c = conn.executemany('DELETE FROM blobs WHERE path = ?', [(p,) for p in paths])
+        return c.rowcount
@@ -5,15 +5,17 @@ Run with:
     cd backend
     python -m app.main
 """
+import asyncio
 import logging
 import sys
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app.config import get_settings
-from app.routers import tryon, recommend, combos
+from app.routers import tryon, recommend, combos, images, wardrobe
 
 # ── Logging ─────────────────────────────────────────────────────────
 
@@ -25,6 +27,65 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# ── Lifespan ────────────────────────────────────────────────────────
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers with the server."""
+    from app.database import shutdown_db
+    from app.services.combo_service import get_combo_tip_table
+    from app.services.gemini_service import shutdown_gemini_executor
+    from app.services.gradio_pool import get_client_pool
+    from app.services.janitor import get_janitor
+    from app.services.job_service import get_job_manager
+    from app.services.metadata_writer import get_metadata_writer
+    from app.services.storage import migrate_legacy_files
+    from app.services.tryon_service import prewarm_clients, shutdown_remote_executor
+
+    settings = get_settings()
+    background: list[asyncio.Task] = []
+
+    writer = get_metadata_writer()
+    await writer.start()
+
+    jobs = get_job_manager()
+    await jobs.start()
+
+    if settings.GRADIO_PREWARM and not settings.USE_MOCK_AI:
+        # Don't hold up startup on the spaces' config fetch
+        background.append(asyncio.create_task(prewarm_clients()))
+
+    # Hash and compress frontend assets off the request path; until this
+    # finishes they are served uncompressed with Starlette's default ETags
+    background.append(asyncio.create_task(asyncio.to_thread(app.state.frontend.precompress)))
+
+    # Pre-sharding results move into the content-addressed layout in the background.
+    # Each move holds the storage lock, which the janitor also takes before it
+    # reconciles the image table, so the two can run side by side.
+    background.append(asyncio.create_task(asyncio.to_thread(migrate_legacy_files)))
+
+    if settings.JANITOR_ENABLED:
+        background.append(asyncio.create_task(get_janitor().run()))
+
+    if settings.GEMINI_API_KEY:
+        # Combo tips are generated once up front and refreshed on a schedule;
+        # /combos only reads the table
+        background.append(asyncio.create_task(get_combo_tip_table().run()))
+
+    yield
+
+    for task in background:
+        task.cancel()
+    await jobs.stop()
+    shutdown_remote_executor()
+    shutdown_gemini_executor()
+    get_client_pool().clear()
+    # Background tasks are cancelled but a to_thread call (the legacy
+    # migration) may still be submitting rows — they fall back to direct writes
+    await writer.stop()
+    shutdown_db()
+
+
 # ── App ─────────────────────────────────────────────────────────────
 
 def create_app() -> FastAPI:
@@ -37,6 +98,7 @@ def create_app() -> FastAPI:
                     "Supports virtual clothing try-on, AI-powered style recommendations, "
                     "and outfit combo suggestions.",
         version="2.0.0",
+        lifespan=lifespan,
     )
 
     # ── CORS ────────────────────────────────────────────────────────
@@ -52,6 +114,8 @@ def create_app() -> FastAPI:
     app.include_router(tryon.router)
     app.include_router(recommend.router)
     app.include_router(combos.router)
+    app.include_router(images.router)
+    app.include_router(wardrobe.router)
 
     # ── Health check ────────────────────────────────────────────────
     @app.get("/api/health", tags=["Health"])
@@ -65,7 +129,53 @@ def create_app() -> FastAPI:
             "gemini_configured": bool(settings.GEMINI_API_KEY),
         }
 
-    # ── Global exception handler ────────────────────────────────────
+    @app.get("/api/metrics", tags=["Health"])
+    def metrics():
+        """Runtime counters for caches and remote backends."""
+        from app.database import db_stats
+        from app.services.combo_service import get_combo_tip_table
+        from app.services.gemini_service import get_gemini_executor
+        from app.services.gradio_pool import get_client_pool
+        from app.services.janitor import get_janitor
+        from app.services.job_service import get_job_manager
+        from app.services.metadata_writer import get_metadata_writer
+        from app.services.recommendation_cache import get_recommendation_cache
+        from app.services.result_cache import get_result_cache
+        from app.services.tryon_service import get_inflight_stats, get_remote_executor
+        from app.services.upload_cache import get_upload_cache
+        from app.utils.upload_errors import rejection_stats
+
+        cache = get_result_cache()
+        recommendations = get_recommendation_cache()
+        return {
+            "tryon_cache": cache.stats() if cache is not None else None,
+            "tryon_inflight": get_inflight_stats(),
+            "tryon_jobs": get_job_manager().stats(),
+            "gradio_clients": get_client_pool().stats(),
+            "remote_executor": get_remote_executor().stats(),
+            "upload_handles": get_upload_cache().stats(),
+            "upload_rejects": rejection_stats(),
+            "janitor": get_janitor().stats(),
+            "static_files": app.state.frontend.stats(),
+            "database": db_stats(),
+            "metadata_writer": get_metadata_writer().stats(),
+            "gemini": get_gemini_executor().stats(),
+            "combo_tips": get_combo_tip_table().stats(),
+            "recommendation_cache": recommendations.stats() if recommendations is not None else None,
+        }
+
+    # ── Exception handlers ──────────────────────────────────────────
+    from app.utils.upload_errors import UploadRejectedError, record_rejection
+
+    @app.exception_handler(UploadRejectedError)
+    async def upload_rejected_handler(request: Request, exc: UploadRejectedError):
+        record_rejection(exc.error_code)
+        logger.info(f"Upload rejected ({exc.error_code}): {exc.user_message}")
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"status": "error", "error_code": exc.error_code, "message": exc.user_message},
+        )
+
     @app.exception_handler(Exception)
     async def global_exception_handler(request: Request, exc: Exception):
         logger.error(f"Unhandled exception: {exc}", exc_info=True)
@@ -75,15 +185,22 @@ def create_app() -> FastAPI:
         )
 
     # ── Static Files ────────────────────────────────────────────────
-    from fastapi.staticfiles import StaticFiles
     from pathlib import Path
+    from app.utils.static_files import PrecompressedStaticFiles
 
     settings.STORAGE_DIR.mkdir(parents=True, exist_ok=True)
-    app.mount("/images", StaticFiles(directory=settings.STORAGE_DIR), name="images")
 
-    # Serve frontend files (HTML/JS/CSS) — avoids file:// CORS issues
+    # Serve frontend files (HTML/JS/CSS) — avoids file:// CORS issues.
+    # The frontend lives at the repo root, so the backend directory is excluded.
     frontend_dir = Path(__file__).resolve().parent.parent.parent  # e:\pinku
-    app.mount("/", StaticFiles(directory=frontend_dir, html=True), name="frontend")
+    app.state.frontend = PrecompressedStaticFiles(
+        directory=frontend_dir,
+        compressed_dir=settings.STATIC_CACHE_DIR,
+        exclude_dirs=("backend",),
+        max_age=settings.STATIC_MAX_AGE,
+        html=True,
+    )
+    app.mount("/", app.state.frontend, name="frontend")
 
     # ── Database ────────────────────────────────────────────────────
     from app.database import init_db
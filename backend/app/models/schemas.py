@@ -11,9 +11,72 @@ class TryOnResponse(BaseModel):
     """Response from the /try_on endpoint."""
     status: str = Field(..., examples=["success"])
     image_url: Optional[str] = Field(None, description="URL of the result image")
+    image_data: Optional[str] = Field(None, description="Base64 data URI of the result, only when requested with inline=true")
     message: Optional[str] = Field(None, description="Error message if status is 'error'")
 
 
+class TryOnJobResponse(BaseModel):
+    """State of an asynchronous try-on job."""
+    job_id: str
+    status: str = Field(..., examples=["queued", "running", "done", "failed"])
+    position: int = Field(0, description="1-based queue position while queued, 0 afterwards")
+    image_url: Optional[str] = Field(None, description="URL of the result image once done")
+    error_code: Optional[str] = Field(None, description="Machine-readable error code if failed")
+    message: Optional[str] = Field(None, description="Error message if failed")
+
+
+class TryOnBatchResult(BaseModel):
+    """One garment's outcome in a /try_on/batch stream."""
+    index: int = Field(..., description="Position of the garment in the request")
+    garment: Optional[str] = Field(None, description="Uploaded garment filename")
+    category: str = Field(..., examples=["upper_body"])
+    status: str = Field(..., examples=["success", "error"])
+    image_url: Optional[str] = Field(None, description="URL of the result image")
+    error_code: Optional[str] = Field(None, description="Machine-readable error code if status is 'error'")
+    message: Optional[str] = Field(None, description="Error message if status is 'error'")
+
+
+# ── Images ──────────────────────────────────────────────────────────
+
+class ImageRecord(BaseModel):
+    """One stored image with its wardrobe metadata."""
+    id: int
+    url: str = Field(..., description="URL of the image")
+    category: Optional[str] = Field(None, examples=["upper_body"])
+    owner: Optional[str] = None
+    name: Optional[str] = Field(None, examples=["Navy blazer"])
+    style: Optional[str] = Field(None, examples=["formal"])
+    accessories: list[str] = Field(default_factory=list, examples=[["watch", "glasses"]])
+    width: Optional[int] = None
+    height: Optional[int] = None
+    byte_size: Optional[int] = None
+    content_hash: Optional[str] = Field(None, description="SHA-256 of the image bytes")
+    description: Optional[str] = Field(None, description="AI-generated description, if any")
+    created_at: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: dict, base_url: str = "") -> "ImageRecord":
+        """Build from an images table row; ``base_url`` makes the url absolute."""
+        fields = {name: row.get(name) for name in cls.model_fields if name in row}
+        fields["url"] = base_url + row["url"]
+        fields["accessories"] = row["accessories"].split(",") if row.get("accessories") else []
+        return cls(**fields)
+
+
+class ImageListResponse(BaseModel):
+    """A page of images from GET /images, newest first."""
+    status: str = Field(..., examples=["success"])
+    items: list[ImageRecord]
+    next_cursor: Optional[int] = Field(None, description="Pass as cursor for the next page; null on the last page")
+
+
+class WardrobeSearchResponse(BaseModel):
+    """Ranked results from GET /wardrobe/search."""
+    status: str = Field(..., examples=["success"])
+    query: str
+    items: list[ImageRecord]
+
+
 # ── Recommendation ──────────────────────────────────────────────────
 
 class RecommendRequest(BaseModel):
@@ -29,7 +92,7 @@ class RecommendResponse(BaseModel):
     """Response from the /recommend endpoint."""
     status: str = Field(..., examples=["success"])
     suggestion: str = Field(..., description="AI-generated style recommendation text")
-    source: str = Field(..., examples=["gemini", "fallback"], description="Whether AI or fallback was used")
+    source: str = Field(..., examples=["gemini", "cache", "fallback"], description="Whether AI, a cached AI answer or the fallback was used")
 
 
 # ── Combos ──────────────────────────────────────────────────────────
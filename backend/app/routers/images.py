@@ -0,0 +1,121 @@
+"""
+Images router — lists and serves stored result images.
+"""
+import asyncio
+import logging
+import re
+from pathlib import Path
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response
+
+from app.database import list_images, run_db
+from app.models.schemas import ImageListResponse, ImageRecord
+from app.services.derivatives import DerivativeParamsError, get_derivative, validate_params
+from app.services.storage import record_access, resolve
+from app.utils.static_files import etag_matches
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Images"])
+
+# Content-addressed URLs never change what they point at
+_IMMUTABLE = "public, max-age=31536000, immutable"
+# Legacy names resolve through the database and may move, so clients revalidate
+_REVALIDATE = "no-cache"
+
+_CONTENT_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+
+@router.get(
+    "/images",
+    response_model=ImageListResponse,
+    summary="List stored images",
+    description="Newest first, filtered by owner, style, category and/or accessory tag. "
+                "Pages are keyset-based: pass the returned next_cursor as cursor to continue.",
+)
+async def list_stored_images(
+    request: Request,
+    owner: str | None = Query(None, description="Only this owner's images"),
+    style: str | None = Query(None, description="Style combo tag, e.g. formal"),
+    category: str | None = Query(None, description="upper_body, lower_body or dresses"),
+    accessory: str | None = Query(None, description="Only images tagged with this accessory"),
+    cursor: int | None = Query(None, ge=1, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+) -> ImageListResponse:
+    """List images with filters and keyset pagination."""
+    rows = await run_db(
+        list_images,
+        owner=owner,
+        style=style.strip().lower() if style else None,
+        category=category,
+        accessory=accessory,
+        before_id=cursor,
+        limit=limit + 1,  # one extra row tells us whether another page exists
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    base_url = str(request.base_url).rstrip("/")
+    items = [ImageRecord.from_row(row, base_url) for row in rows]
+    return ImageListResponse(
+        status="success",
+        items=items,
+        next_cursor=rows[-1]["id"] if has_more else None,
+    )
+
+
+def _resolve_and_record_access(path: str) -> Path | None:
+    """Resolve an image path and, if it exists, mark it as recently used for eviction."""
+    file_path = resolve(path)
+    if file_path is not None:
+        record_access(file_path)
+    return file_path
+
+
+@router.get(
+    "/images/{path:path}",
+    summary="Get a stored image",
+    description="Serves a stored image by its content-addressed path (ab/cd/<sha256>.<ext>). "
+                "Legacy flat names from before content addressing are resolved through the image table. "
+                "Pass w and/or fmt for a resized / re-encoded derivative (e.g. ?w=256&fmt=webp).",
+    response_class=FileResponse,
+    responses={400: {"description": "Width or format not allowed"}, 404: {"description": "Image not found"}},
+)
+async def get_image(
+    request: Request,
+    path: str,
+    w: int | None = Query(None, description="Derivative width in pixels (DERIVATIVE_WIDTHS)"),
+    fmt: str | None = Query(None, description="Derivative format (DERIVATIVE_FORMATS)"),
+) -> FileResponse:
+    """Serve a stored image or one of its derivatives."""
+    if w is not None or fmt is not None:
+        try:
+            w, fmt = validate_params(w, fmt)
+        except DerivativeParamsError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # Legacy names are looked up in the database
+    file_path = await run_db(_resolve_and_record_access, path)
+    if file_path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    # Stored files are named by their SHA-256, which doubles as a strong ETag
+    content_hash = file_path.stem if _CONTENT_HASH.match(file_path.stem) else None
+    cache_control = _IMMUTABLE if _CONTENT_HASH.match(Path(path).stem) else _REVALIDATE
+    derived = w is not None or fmt is not None
+    etag = None
+    if content_hash:
+        etag = f'"{content_hash}-w{w or 0}-{fmt or "orig"}"' if derived else f'"{content_hash}"'
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"etag": etag, "cache-control": cache_control})
+
+    headers = {"cache-control": cache_control}
+    if etag:
+        headers["etag"] = etag
+
+    if not derived:
+        return FileResponse(file_path, headers=headers)
+
+    derivative, media_type = await asyncio.to_thread(get_derivative, file_path, w, fmt)
+    return FileResponse(derivative, media_type=media_type, headers=headers)
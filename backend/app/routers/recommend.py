@@ -2,11 +2,14 @@
 Recommendation router — AI-powered style recommendations via Gemini.
 """
 import logging
+import time
 
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 
 from app.models.schemas import RecommendRequest, RecommendResponse
-from app.services.gemini_service import get_recommendation
+from app.services.gemini_service import get_recommendation, stream_recommendation
+from app.utils.sse import SSE_HEADERS, SSE_MEDIA_TYPE, format_sse
 
 logger = logging.getLogger(__name__)
 
@@ -40,3 +43,42 @@ async def recommend(request: RecommendRequest = None) -> RecommendResponse:
         suggestion=suggestion,
         source=source,
     )
+
+
+@router.post(
+    "/recommend/stream",
+    summary="Stream an AI style recommendation (SSE)",
+    description="Same body as /recommend. Text arrives as 'chunk' events while Gemini generates it. "
+                "If generation fails midway, a 'fallback' event carries replacement text for what was sent. "
+                "A final 'done' event carries the source and timings.",
+)
+async def recommend_stream(request: RecommendRequest = None) -> StreamingResponse:
+    """Stream a style recommendation as Server-Sent Events."""
+    if request is None:
+        request = RecommendRequest()
+
+    logger.info(f"Streaming recommendation request: type={request.clothing_type}, occasion={request.occasion}")
+
+    async def events():
+        started = time.monotonic()
+        first_chunk_ms = None
+        async for kind, value in stream_recommendation(
+            clothing_type=request.clothing_type,
+            occasion=request.occasion,
+            preferences=request.preferences,
+            colors=request.colors,
+            image_data=request.image_data,
+        ):
+            if kind == "done":
+                yield format_sse({
+                    "status": "success",
+                    "source": value,
+                    "first_chunk_ms": first_chunk_ms,
+                    "total_ms": round((time.monotonic() - started) * 1000, 1),
+                }, event="done")
+            else:
+                if first_chunk_ms is None:
+                    first_chunk_ms = round((time.monotonic() - started) * 1000, 1)
+                yield format_sse({"text": value}, event=kind)
+
+    return StreamingResponse(events(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
@@ -1,22 +1,140 @@
 """
 Try-On router — handles virtual try-on image generation.
 """
+import asyncio
 import logging
+from pathlib import Path
 
 from fastapi import APIRouter, File, Form, UploadFile, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from app.models.schemas import TryOnResponse
-from app.services.tryon_service import process_tryon
-from app.utils.image_utils import save_upload_to_temp, save_base64_to_storage
+from app.config import get_settings
+from app.database import get_image_description, run_db, set_image_description
+from app.models.schemas import TryOnBatchResult, TryOnJobResponse, TryOnResponse
+from app.services.job_service import JobQueueFullError, TryOnJob, get_job_manager
+from app.services.storage import URL_PREFIX, resolve
+from app.services.tryon_service import TRYON_ENGINES, TryOnResult, process_tryon, quality_tiers
+from app.utils.image_utils import IngestedUpload, ingest_upload, save_result_to_storage
 from app.utils.hf_errors import HFTokenError
+from app.utils.upload_errors import UploadRejectedError, record_rejection
 import base64
-from app.services.gemini_service import analyze_vto_images
+from app.services.gemini_service import analyze_vto_images, describe_outfit
+from app.utils.sse import SSE_HEADERS, SSE_KEEPALIVE, SSE_MEDIA_TYPE, format_sse
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Try-On"])
 
+# Seconds between SSE keep-alive comments while a job is idle in the queue
+_SSE_KEEPALIVE_SECONDS = 15
+
+
+def _sanitize_token(hf_token: str | None) -> str | None:
+    """Strip a user-provided HF token — never log it."""
+    if hf_token is not None:
+        hf_token = hf_token.strip() or None
+        if hf_token:
+            logger.info("User-provided HF token received (not logged for security)")
+    return hf_token
+
+
+def _absolute_url(request: Request | None, url_path: str) -> str:
+    """Prefix a storage URL path with the request's base URL."""
+    if request:
+        return str(request.base_url).rstrip("/") + url_path
+    return url_path
+
+
+def _file_to_base64(path: Path) -> str:
+    return base64.b64encode(path.read_bytes()).decode("utf-8")
+
+
+def _wardrobe_tags(owner: str | None, name: str | None, style: str | None, accessories: str | None) -> dict:
+    """Wardrobe fields from the form, with blank values dropped."""
+    return {
+        "owner": (owner or "").strip() or None,
+        "name": (name or "").strip() or None,
+        "style": (style or "").strip().lower() or None,
+        "accessories": accessories,
+    }
+
+
+def _check_quality(quality: str | None) -> None:
+    """Reject quality tiers that aren't configured for every backend."""
+    tiers = quality_tiers()
+    if quality is not None and quality not in tiers:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown quality '{quality}'. Choose one of: {', '.join(tiers)}.",
+        )
+
+
+async def _run_tryon(
+    person_path: Path,
+    clothing_path: Path,
+    hf_token: str | None,
+    category: str,
+    person_hash: str | None = None,
+    garment_hash: str | None = None,
+    engine: str | None = None,
+    quality: str | None = None,
+    tags: dict | None = None,
+) -> tuple[str, TryOnResult]:
+    """
+    Run the try-on pipeline and persist the result. Returns its URL path and the result.
+
+    ``tags`` holds the wardrobe fields (owner, style, accessories) stored with the image.
+    """
+    # Process try-on (mock, local or remote) -> file path or bytes, never base64
+    result = await process_tryon(
+        person_path,
+        clothing_path,
+        hf_token=hf_token,
+        category=category,
+        person_hash=person_hash,
+        garment_hash=garment_hash,
+        engine=engine,
+        quality=quality,
+    )
+
+    # Link/copy the result into persistent storage off the event loop
+    meta = {**(tags or {}), "category": category}
+    url_path = await asyncio.to_thread(save_result_to_storage, result.source, result.mime_type, meta)
+    _describe_later(url_path)
+    return url_path, result
+
+
+# ── Wardrobe descriptions ───────────────────────────────────────────
+
+# Background description tasks, held until done so they aren't garbage-collected
+_description_tasks: set[asyncio.Task] = set()
+
+
+def _describe_later(url_path: str) -> None:
+    """Describe a saved result with Gemini in the background; the response doesn't wait for it."""
+    settings = get_settings()
+    if not (settings.WARDROBE_DESCRIPTIONS and settings.GEMINI_API_KEY):
+        return
+    task = asyncio.create_task(_describe_result(url_path))
+    _description_tasks.add(task)
+    task.add_done_callback(_description_tasks.discard)
+
+
+async def _describe_result(url_path: str) -> None:
+    """Store an outfit description on a saved result's rows, for wardrobe search. Best effort."""
+    try:
+        # Identical results share one file — reuse a description already made for it
+        description = await run_db(get_image_description, url_path)
+        if description is None:
+            file_path = await run_db(resolve, url_path[len(URL_PREFIX):])
+            if file_path is None:
+                return
+            description = await describe_outfit(file_path)
+        if description:
+            await run_db(set_image_description, url_path, description)
+    except Exception as e:
+        logger.warning(f"Could not describe {url_path}: {e}")
+
 
 @router.post(
     "/try_on",
@@ -29,35 +147,51 @@ async def try_on(
     garment_image: UploadFile = File(..., description="Photo of the clothing item"),
     hf_token: str | None = Form(None, description="Optional user-provided HuggingFace token"),
     category: str = Form("upper_body", description="Clothing category: upper_body, lower_body, dresses"),
+    engine: str | None = Form(
+        None, description="'remote' (AI model) or 'local' (instant rough preview); defaults to TRYON_ENGINE"
+    ),
+    quality: str | None = Form(
+        None, description="Remote quality tier: fast, standard, high; defaults to TRYON_DEFAULT_QUALITY"
+    ),
+    inline: bool = Form(False, description="Also return the result inline as a base64 data URI"),
+    owner: str | None = Form(None, description="Wardrobe owner id (e.g. the signed-in user's id)"),
+    name: str | None = Form(None, description="Item name shown in the wardrobe and used by search"),
+    style: str | None = Form(None, description="Style combo tag for wardrobe filtering, e.g. formal"),
+    accessories: str | None = Form(None, description="Comma-separated accessory tags, e.g. watch,glasses"),
     request: Request = None,
 ) -> TryOnResponse | JSONResponse:
     """Process a virtual try-on request."""
     logger.info(f"Try-on request: person={person_image.filename}, garment={garment_image.filename}")
 
-    # Sanitize token — never log it
-    if hf_token is not None:
-        hf_token = hf_token.strip() or None
-        if hf_token:
-            logger.info("User-provided HF token received (not logged for security)")
+    if engine is not None and engine not in TRYON_ENGINES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown engine '{engine}'. Choose one of: {', '.join(TRYON_ENGINES)}.",
+        )
+    _check_quality(quality)
+    hf_token = _sanitize_token(hf_token)
 
     try:
-        # Save uploads to temp directory
-        person_path = await save_upload_to_temp(person_image, prefix="person")
-        clothing_path = await save_upload_to_temp(garment_image, prefix="garment")
+        # Stream uploads to the temp directory, hashing them on the way in
+        person = await ingest_upload(person_image, prefix="person")
+        garment = await ingest_upload(garment_image, prefix="garment")
 
-        # Process try-on (mock or real) -> Returns base64 string
-        result_data_uri = await process_tryon(person_path, clothing_path, hf_token=hf_token, category=category)
-
-        # Decode base64 and save to persistent storage
-        image_url_path = save_base64_to_storage(result_data_uri)
-
-        if request:
-            full_url = str(request.base_url).rstrip("/") + image_url_path
-        else:
-            full_url = image_url_path
+        image_url_path, result = await _run_tryon(
+            person.path,
+            garment.path,
+            hf_token,
+            category,
+            person_hash=person.sha256,
+            garment_hash=garment.sha256,
+            engine=engine,
+            quality=quality,
+            tags=_wardrobe_tags(owner, name, style, accessories),
+        )
+        full_url = _absolute_url(request, image_url_path)
+        image_data = await asyncio.to_thread(result.to_data_uri) if inline else None
 
         logger.info(f"Try-on completed successfully. Saved to: {image_url_path}")
-        return TryOnResponse(status="success", image_url=full_url)
+        return TryOnResponse(status="success", image_url=full_url, image_data=image_data)
 
     except HFTokenError as e:
         # Structured error — frontend detects error_code to show token modal
@@ -71,11 +205,233 @@ async def try_on(
             },
         )
 
+    except UploadRejectedError:
+        raise  # Structured 4xx from the app's exception handler
+
     except Exception as e:
         logger.error(f"Try-on failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ── Batch ───────────────────────────────────────────────────────────
+
+@router.post(
+    "/try_on/batch",
+    summary="Try several garments on one person (SSE)",
+    description="Upload one person image and up to TRYON_BATCH_MAX_GARMENTS garments. "
+                "Each garment's result is streamed back as a Server-Sent Event as soon as it finishes; "
+                "failures are reported per garment. A final 'done' event carries the totals.",
+)
+async def try_on_batch(
+    person_image: UploadFile = File(..., description="Photo of the person"),
+    garment_images: list[UploadFile] = File(..., description="Photos of the clothing items"),
+    categories: list[str] | None = Form(
+        None, description="Category per garment (same order), or a single category for all"
+    ),
+    hf_token: str | None = Form(None, description="Optional user-provided HuggingFace token"),
+    quality: str | None = Form(
+        None, description="Remote quality tier: fast, standard, high; defaults to TRYON_BATCH_QUALITY"
+    ),
+    owner: str | None = Form(None, description="Wardrobe owner id (e.g. the signed-in user's id)"),
+    name: str | None = Form(None, description="Item name shown in the wardrobe and used by search"),
+    style: str | None = Form(None, description="Style combo tag for wardrobe filtering, e.g. formal"),
+    accessories: str | None = Form(None, description="Comma-separated accessory tags, e.g. watch,glasses"),
+    request: Request = None,
+) -> StreamingResponse:
+    """Fan one person image out over several garments."""
+    settings = get_settings()
+    count = len(garment_images)
+    logger.info(f"Batch try-on request: person={person_image.filename}, garments={count}")
+
+    if count > settings.TRYON_BATCH_MAX_GARMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many garments ({count}); the limit is {settings.TRYON_BATCH_MAX_GARMENTS}.",
+        )
+    categories = categories or ["upper_body"]
+    if len(categories) == 1:
+        categories = categories * count
+    elif len(categories) != count:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Got {len(categories)} categories for {count} garments.",
+        )
+    _check_quality(quality)
+    quality = quality or settings.TRYON_BATCH_QUALITY
+
+    hf_token = _sanitize_token(hf_token)
+    tags = _wardrobe_tags(owner, name, style, accessories)
+
+    # The person image is saved and hashed once for the whole batch
+    person = await ingest_upload(person_image, prefix="person")
+
+    # A rejected garment fails only its own slot, not the whole batch
+    garments: list[IngestedUpload | UploadRejectedError] = []
+    for garment_image in garment_images:
+        try:
+            garments.append(await ingest_upload(garment_image, prefix="garment"))
+        except UploadRejectedError as e:
+            record_rejection(e.error_code)
+            garments.append(e)
+
+    semaphore = asyncio.Semaphore(settings.TRYON_BATCH_CONCURRENCY)
+
+    async def run_one(index: int) -> TryOnBatchResult:
+        result = TryOnBatchResult(
+            index=index,
+            garment=garment_images[index].filename,
+            category=categories[index],
+            status="success",
+        )
+        garment = garments[index]
+        if isinstance(garment, UploadRejectedError):
+            result.status, result.error_code, result.message = "error", garment.error_code, garment.user_message
+            return result
+        async with semaphore:
+            try:
+                image_url_path, _ = await _run_tryon(
+                    person.path,
+                    garment.path,
+                    hf_token,
+                    categories[index],
+                    person_hash=person.sha256,
+                    garment_hash=garment.sha256,
+                    quality=quality,
+                    tags=tags,
+                )
+                result.image_url = _absolute_url(request, image_url_path)
+            except HFTokenError as e:
+                result.status, result.error_code, result.message = "error", e.error_code, e.user_message
+            except Exception as e:
+                logger.error(f"Batch try-on failed for garment {index}: {e}", exc_info=True)
+                result.status, result.message = "error", str(e)
+        return result
+
+    async def events():
+        tasks = [asyncio.ensure_future(run_one(i)) for i in range(count)]
+        succeeded = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                succeeded += result.status == "success"
+                yield format_sse(result.model_dump(), event="result")
+            yield format_sse({"total": count, "succeeded": succeeded, "failed": count - succeeded}, event="done")
+        finally:
+            # Client went away mid-stream — stop the garments still pending
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(events(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+# ── Async jobs ──────────────────────────────────────────────────────
+
+def _job_response(job: TryOnJob) -> TryOnJobResponse:
+    return TryOnJobResponse(
+        job_id=job.id,
+        status=job.status,
+        position=get_job_manager().position(job),
+        image_url=job.image_url,
+        error_code=job.error_code,
+        message=job.message,
+    )
+
+
+def _get_job_or_404(job_id: str) -> TryOnJob:
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Try-on job '{job_id}' not found")
+    return job
+
+
+@router.post(
+    "/try_on/jobs",
+    response_model=TryOnJobResponse,
+    status_code=202,
+    responses={503: {"description": "Job queue is full"}},
+    summary="Queue a virtual try-on job",
+    description="Same inputs as /try_on, but returns a job id immediately. "
+                "Poll GET /try_on/jobs/{job_id} or stream GET /try_on/jobs/{job_id}/events for the result.",
+)
+async def create_try_on_job(
+    person_image: UploadFile = File(..., description="Photo of the person"),
+    garment_image: UploadFile = File(..., description="Photo of the clothing item"),
+    hf_token: str | None = Form(None, description="Optional user-provided HuggingFace token"),
+    category: str = Form("upper_body", description="Clothing category: upper_body, lower_body, dresses"),
+    quality: str | None = Form(
+        None, description="Remote quality tier: fast, standard, high; defaults to TRYON_DEFAULT_QUALITY"
+    ),
+    owner: str | None = Form(None, description="Wardrobe owner id (e.g. the signed-in user's id)"),
+    name: str | None = Form(None, description="Item name shown in the wardrobe and used by search"),
+    style: str | None = Form(None, description="Style combo tag for wardrobe filtering, e.g. formal"),
+    accessories: str | None = Form(None, description="Comma-separated accessory tags, e.g. watch,glasses"),
+    request: Request = None,
+) -> TryOnJobResponse:
+    """Queue a try-on and return its job id."""
+    logger.info(f"Try-on job request: person={person_image.filename}, garment={garment_image.filename}")
+
+    _check_quality(quality)
+    hf_token = _sanitize_token(hf_token)
+    tags = _wardrobe_tags(owner, name, style, accessories)
+    person = await ingest_upload(person_image, prefix="person")
+    garment = await ingest_upload(garment_image, prefix="garment")
+
+    async def run() -> str:
+        image_url_path, _ = await _run_tryon(
+            person.path,
+            garment.path,
+            hf_token,
+            category,
+            person_hash=person.sha256,
+            garment_hash=garment.sha256,
+            quality=quality,
+            tags=tags,
+        )
+        return _absolute_url(request, image_url_path)
+
+    try:
+        job = await get_job_manager().submit(run, inputs=(person.path, garment.path))
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return _job_response(job)
+
+
+@router.get(
+    "/try_on/jobs/{job_id}",
+    response_model=TryOnJobResponse,
+    summary="Get try-on job status",
+)
+async def get_try_on_job(job_id: str) -> TryOnJobResponse:
+    """Return the current state of a try-on job."""
+    return _job_response(_get_job_or_404(job_id))
+
+
+@router.get(
+    "/try_on/jobs/{job_id}/events",
+    summary="Stream try-on job status (SSE)",
+    description="Server-Sent Events stream of job state and queue position. Closes after the job is done or failed.",
+)
+async def stream_try_on_job(job_id: str) -> StreamingResponse:
+    """Stream job state changes as Server-Sent Events."""
+    job = _get_job_or_404(job_id)
+    manager = get_job_manager()
+
+    async def events():
+        last = None
+        while True:
+            state = _job_response(job)
+            if state != last:
+                yield format_sse(state.model_dump(), event=state.status)
+                last = state
+            if job.finished:
+                return
+            if not await manager.wait_for_change(timeout=_SSE_KEEPALIVE_SECONDS):
+                yield SSE_KEEPALIVE
+
+    return StreamingResponse(events(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
 @router.post(
     "/analyze_vto",
     summary="Analyze VTO images via Gemini",
@@ -85,12 +441,14 @@ async def analyze_vto(
     person_image: UploadFile = File(..., description="Photo of the person"),
     garment_image: UploadFile = File(..., description="Photo of the clothing item"),
 ) -> JSONResponse:
+    # Size limits are enforced while streaming, before anything is held in memory
+    person = await ingest_upload(person_image, prefix="person")
+    garment = await ingest_upload(garment_image, prefix="garment")
     try:
-        p_bytes = await person_image.read()
-        g_bytes = await garment_image.read()
-        
-        p_b64 = base64.b64encode(p_bytes).decode("utf-8")
-        g_b64 = base64.b64encode(g_bytes).decode("utf-8")
+        p_b64, g_b64 = await asyncio.gather(
+            asyncio.to_thread(_file_to_base64, person.path),
+            asyncio.to_thread(_file_to_base64, garment.path),
+        )
         
         json_resp_str = await analyze_vto_images(p_b64, g_b64)
         
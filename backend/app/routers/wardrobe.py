@@ -0,0 +1,36 @@
+"""
+Wardrobe router — full-text search over saved try-on results.
+"""
+import logging
+
+from fastapi import APIRouter, Query, Request
+
+from app.database import run_db, search_images
+from app.models.schemas import ImageRecord, WardrobeSearchResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Wardrobe"])
+
+
+@router.get(
+    "/wardrobe/search",
+    response_model=WardrobeSearchResponse,
+    summary="Search the wardrobe",
+    description="Ranked full-text search over item names, style combos, accessories, categories "
+                "and AI descriptions. Every word matches as a prefix: 'blu wat' finds a blue outfit with a watch.",
+)
+async def search_wardrobe(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="Search text"),
+    owner: str | None = Query(None, description="Only this owner's items"),
+    limit: int = Query(50, ge=1, le=200),
+) -> WardrobeSearchResponse:
+    """Search saved images, best match first."""
+    rows = await run_db(search_images, q, owner=owner, limit=limit)
+    base_url = str(request.base_url).rstrip("/")
+    return WardrobeSearchResponse(
+        status="success",
+        query=q,
+        items=[ImageRecord.from_row(row, base_url) for row in rows],
+    )
@@ -1,9 +1,16 @@
 """
 Combo service — static outfit combo definitions with optional AI tips.
+
+A tip depends only on the style name, so tips are generated ahead of time
+into an in-memory table and refreshed in the background. Requests read the
+table and never wait on the model.
 """
+import asyncio
 import logging
+import time
 from typing import Optional
 
+from app.config import get_settings
 from app.models.schemas import ComboAccessories, ComboResponse
 from app.services.gemini_service import get_combo_tip
 
@@ -48,6 +55,75 @@ COMBO_DEFINITIONS: dict[str, dict] = {
 }
 
 
+class ComboTipTable:
+    """Latest AI tip per style; a failed refresh keeps serving the previous tip."""
+
+    def __init__(self, styles: list[str], interval: float):
+        self.styles = list(styles)
+        self.interval = interval
+        self._tips: dict[str, tuple[str, float]] = {}  # style -> (tip, generated_at)
+
+        self.refreshes = 0
+        self.failures = 0
+        self.last_refresh_at: Optional[float] = None
+
+    def get(self, style: str) -> Optional[str]:
+        """Current tip for ``style``, or None if none has been generated yet."""
+        entry = self._tips.get(style)
+        return entry[0] if entry else None
+
+    async def refresh(self) -> int:
+        """Regenerate every style's tip concurrently. Returns how many were updated."""
+        tips = await asyncio.gather(*(get_combo_tip(style) for style in self.styles), return_exceptions=True)
+        now = time.time()
+        updated = 0
+        for style, tip in zip(self.styles, tips):
+            if isinstance(tip, str) and tip:
+                self._tips[style] = (tip, now)
+                updated += 1
+            else:
+                self.failures += 1
+                if isinstance(tip, Exception):
+                    logger.warning(f"Combo tip refresh failed for '{style}': {tip}")
+        self.refreshes += 1
+        self.last_refresh_at = now
+        return updated
+
+    async def run(self) -> None:
+        """Refresh now and then every ``interval`` seconds until cancelled."""
+        while True:
+            try:
+                updated = await self.refresh()
+                logger.info(f"Combo tips refreshed ({updated}/{len(self.styles)} styles)")
+            except Exception as e:
+                logger.error(f"Combo tip refresh failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "styles": len(self.styles),
+            "tips": len(self._tips),
+            "oldest_tip_age_seconds": round(now - min(t for _, t in self._tips.values())) if self._tips else None,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
+
+
+_tip_table: Optional[ComboTipTable] = None
+
+
+def get_combo_tip_table() -> ComboTipTable:
+    """Process-wide combo tip table singleton."""
+    global _tip_table
+    if _tip_table is None:
+        _tip_table = ComboTipTable(
+            styles=list(COMBO_DEFINITIONS),
+            interval=get_settings().COMBO_TIP_REFRESH_SECONDS,
+        )
+    return _tip_table
+
+
 def get_available_styles() -> list[str]:
     """Return list of available combo styles."""
     return list(COMBO_DEFINITIONS.keys())
@@ -72,13 +148,8 @@ async def get_combo(style: str, include_ai_tip: bool = True) -> Optional[ComboRe
     combo = COMBO_DEFINITIONS[style_lower]
     accessories = ComboAccessories(**combo["accessories"])
 
-    # Optionally get AI styling tip
-    ai_tip = None
-    if include_ai_tip:
-        try:
-            ai_tip = await get_combo_tip(style_lower)
-        except Exception as e:
-            logger.warning(f"Failed to get AI tip for combo '{style_lower}': {e}")
+    # Precomputed AI styling tip — None until the first refresh has produced one
+    ai_tip = get_combo_tip_table().get(style_lower) if include_ai_tip else None
 
     return ComboResponse(
         status="success",
@@ -0,0 +1,91 @@
+"""
+Image derivatives — resized / re-encoded variants of stored images.
+
+Thumbnails for the wardrobe grid don't need full-size PNGs. A derivative is
+rendered on first request and cached on disk under the source's content
+hash and the requested parameters; only whitelisted widths and formats are
+accepted so the cache can't grow without bound.
+"""
+import logging
+import os
+import re
+import uuid
+from pathlib import Path
+
+from PIL import Image, ImageOps, features
+
+from app.config import get_settings
+from app.services.result_cache import file_sha256
+
+logger = logging.getLogger(__name__)
+
+# PIL encoder name and MIME type per format
+_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "png": ("PNG", "image/png"),
+    "avif": ("AVIF", "image/avif"),
+}
+
+_CONTENT_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+
+class DerivativeParamsError(ValueError):
+    """Raised when a derivative is requested with a width or format outside the whitelist."""
+
+
+def supported_formats() -> list[str]:
+    """Configured derivative formats this Pillow build can encode."""
+    allowed = get_settings().derivative_format_list
+    return [f for f in allowed if f in _FORMATS and (f != "avif" or features.check("avif"))]
+
+
+def validate_params(width: int | None, fmt: str | None) -> tuple[int | None, str | None]:
+    """Check derivative parameters against the whitelist; returns them normalized."""
+    widths = get_settings().derivative_width_list
+    if width is not None and width not in widths:
+        raise DerivativeParamsError(f"Width must be one of: {', '.join(map(str, widths))}.")
+    if fmt is not None:
+        fmt = fmt.lower().replace("jpg", "jpeg")
+        formats = supported_formats()
+        if fmt not in formats:
+            raise DerivativeParamsError(f"Format must be one of: {', '.join(formats)}.")
+    return width, fmt
+
+
+def get_derivative(source: Path, width: int | None, fmt: str | None) -> tuple[Path, str]:
+    """
+    Return (path, media type) of the derivative of ``source``, rendering it on a miss.
+    Parameters must already be validated. Blocking: call it off the event loop.
+    """
+    settings = get_settings()
+    fmt = fmt or _format_of(source)
+    pil_format, media_type = _FORMATS[fmt]
+
+    # Content-addressed sources are named by their hash; legacy ones are hashed here
+    content_hash = source.stem if _CONTENT_HASH.match(source.stem) else file_sha256(source)
+    dest = settings.DERIVATIVE_CACHE_DIR / content_hash[:2] / f"{content_hash}_w{width or 0}.{fmt}"
+    if dest.exists():
+        return dest, media_type
+
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        if width is not None and img.width > width:
+            img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+        if pil_format == "JPEG" and img.mode != "RGB":
+            img = img.convert("RGB")
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent requests never serve a partial file
+        tmp = dest.with_name(f"{dest.name}.{uuid.uuid4().hex[:8]}.tmp")
+        img.save(tmp, format=pil_format, quality=settings.DERIVATIVE_QUALITY)
+        os.replace(tmp, dest)
+
+    logger.info(f"Rendered derivative {dest.name} ({dest.stat().st_size} bytes)")
+    return dest, media_type
+
+
+def _format_of(source: Path) -> str:
+    ext = source.suffix.lower().lstrip(".")
+    ext = "jpeg" if ext == "jpg" else ext
+    return ext if ext in _FORMATS else "png"
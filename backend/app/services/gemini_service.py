@@ -1,16 +1,74 @@
 """
 Google Gemini AI service — provides recommendations and style tips.
+
+``generate_content`` is a blocking network call (often several seconds), so
+every request runs on a dedicated ``RemoteCallExecutor`` behind a
+concurrency limit, with a per-call timeout. Streams are timed per chunk
+instead, so a slow but healthy stream isn't cut off.
 """
+import asyncio
 import logging
 import base64
 import io
+import threading
+from pathlib import Path
 from PIL import Image
-from typing import Optional, List, Union
+from typing import Any, AsyncIterator, Callable, Optional, List, Union
 
 from app.config import get_settings
+from app.services.recommendation_cache import get_recommendation_cache, make_recommendation_key
+from app.services.remote_executor import RemoteCallExecutor
 
 logger = logging.getLogger(__name__)
 
+
+# Backend name of Gemini calls on their executor (and in its metrics)
+GEMINI_BACKEND = "gemini"
+
+_executor: Optional[RemoteCallExecutor] = None
+
+
+def get_gemini_executor() -> RemoteCallExecutor:
+    """Dedicated executor for Gemini calls, at most GEMINI_MAX_CONCURRENCY at a time."""
+    global _executor
+    if _executor is None:
+        settings = get_settings()
+        _executor = RemoteCallExecutor(
+            max_workers=settings.GEMINI_MAX_CONCURRENCY,
+            limits={GEMINI_BACKEND: settings.GEMINI_MAX_CONCURRENCY},
+            thread_name_prefix="gemini",
+        )
+    return _executor
+
+
+def shutdown_gemini_executor() -> None:
+    """Shut down the Gemini pool; the next call creates a fresh one."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+async def _run_gemini(fn: Callable[[threading.Event], Any]) -> Any:
+    """
+    Run ``fn(cancel_event)`` on the Gemini pool.
+
+    GEMINI_TIMEOUT_SECONDS covers the wait for a slot too: callers fall back
+    to a local answer on timeout, so it caps their total latency.
+    """
+    timeout = get_settings().GEMINI_TIMEOUT_SECONDS
+    return await get_gemini_executor().run(GEMINI_BACKEND, fn, timeout, include_wait=True)
+
+
+async def _generate_text(model, content) -> str:
+    """Run ``model.generate_content`` on the Gemini pool and return the response text."""
+    return await _run_gemini(lambda _: model.generate_content(content).text)
+
+GEMINI_MODEL = "gemini-2.0-flash"
+
+# Results are shrunk to this longest side before being sent for a description
+_DESCRIBE_MAX_SIDE = 512
+
 # Module-level model cache
 _model = None
 
@@ -30,7 +88,7 @@ def _get_model():
         import google.generativeai as genai
 
         genai.configure(api_key=settings.GEMINI_API_KEY)
-        _model = genai.GenerativeModel("gemini-2.0-flash")
+        _model = genai.GenerativeModel(GEMINI_MODEL)
         logger.info("Gemini model initialized successfully")
         return _model
     except Exception as e:
@@ -49,42 +107,145 @@ async def get_recommendation(
     Get an AI-powered style recommendation.
 
     Returns:
-        Tuple of (suggestion_text, source) where source is "gemini" or "fallback".
+        Tuple of (suggestion_text, source) where source is "gemini", "cache" or "fallback".
     """
     model = _get_model()
 
     if model is None:
         return _fallback_recommendation(clothing_type, occasion), "fallback"
 
+    prompt, image_data, cache_key = _prepare_recommendation(clothing_type, occasion, preferences, colors, image_data)
+    cache = get_recommendation_cache()
+    if cache is not None:
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            logger.info("Recommendation served from cache")
+            return cached, "cache"
+
     try:
-        # Prepare inputs for Gemini
-        prompt_parts = _build_recommendation_prompt(clothing_type, occasion, preferences, colors, has_image=bool(image_data))
-        
-        content = [prompt_parts]
-        
-        if image_data:
-            try:
-                # Remove header if present (e.g. "data:image/png;base64,")
-                if "base64," in image_data:
-                    image_data = image_data.split("base64,")[1]
-                
-                image_bytes = base64.b64decode(image_data)
-                image = Image.open(io.BytesIO(image_bytes))
-                content.append(image)
-                logger.info("Image attached to recommendation request")
-            except Exception as img_err:
-                logger.error(f"Failed to process image for recommendation: {img_err}")
-                # Continue without image if it fails
-
-        response = model.generate_content(content)
-        suggestion = response.text.strip()
+        content = _recommendation_content(prompt, image_data)
+        suggestion = (await _generate_text(model, content)).strip()
         logger.info("Gemini recommendation generated successfully")
+        if cache is not None and suggestion:
+            await cache.put(cache_key, suggestion)
         return suggestion, "gemini"
     except Exception as e:
         logger.error(f"Gemini recommendation failed: {e}")
         return _fallback_recommendation(clothing_type, occasion), "fallback"
 
 
+async def stream_recommendation(
+    clothing_type: Optional[str] = None,
+    occasion: Optional[str] = None,
+    preferences: Optional[str] = None,
+    colors: Optional[list[str]] = None,
+    image_data: Optional[str] = None,
+) -> AsyncIterator[tuple[str, str]]:
+    """
+    Stream a style recommendation as it is generated.
+
+    Yields ``("chunk", text)`` pieces in order, then ``("done", source)``
+    with source "gemini", "cache" or "fallback". If the stream fails after
+    some chunks were sent, ``("fallback", text)`` carries a complete
+    replacement for the partial text before the final event.
+    """
+    model = _get_model()
+    if model is None:
+        yield "chunk", _fallback_recommendation(clothing_type, occasion)
+        yield "done", "fallback"
+        return
+
+    prompt, image_data, cache_key = _prepare_recommendation(clothing_type, occasion, preferences, colors, image_data)
+    cache = get_recommendation_cache()
+    if cache is not None:
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            yield "chunk", cached
+            yield "done", "cache"
+            return
+
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    content = _recommendation_content(prompt, image_data)
+
+    def produce(cancel: threading.Event) -> None:
+        # Runs on the Gemini pool: each iteration blocks until the next chunk arrives
+        for chunk in model.generate_content(content, stream=True):
+            if stop.is_set() or cancel.is_set():
+                break
+            if chunk.text:
+                loop.call_soon_threadsafe(chunks.put_nowait, chunk.text)
+
+    # No total cap: the stream is bounded by the wait for each chunk instead
+    producer = asyncio.ensure_future(get_gemini_executor().run(GEMINI_BACKEND, produce, timeout=None))
+    # Chunk callbacks are queued on the loop before the call completes, so this lands last
+    producer.add_done_callback(lambda _: chunks.put_nowait(None))
+
+    settings = get_settings()
+    parts: list[str] = []
+    try:
+        # The first chunk also covers the wait for a slot and the model's start-up
+        timeout = settings.GEMINI_TIMEOUT_SECONDS
+        while (text := await asyncio.wait_for(chunks.get(), timeout)) is not None:
+            parts.append(text)
+            yield "chunk", text
+            timeout = settings.GEMINI_STREAM_IDLE_SECONDS
+        producer.result()  # re-raise a failed stream
+        if not "".join(parts).strip():
+            raise ValueError("Gemini returned an empty stream")
+    except Exception as e:
+        logger.error(f"Gemini recommendation stream failed after {len(parts)} chunks: {e}")
+        yield "fallback", _fallback_recommendation(clothing_type, occasion)
+        yield "done", "fallback"
+        return
+    finally:
+        # Client went away (or we're done) — stop pulling chunks from the model
+        stop.set()
+        if not producer.done():
+            producer.cancel()
+
+    suggestion = "".join(parts).strip()
+    logger.info(f"Gemini recommendation streamed in {len(parts)} chunks")
+    if cache is not None:
+        await cache.put(cache_key, suggestion)
+    yield "done", "gemini"
+
+
+def _prepare_recommendation(
+    clothing_type: Optional[str],
+    occasion: Optional[str],
+    preferences: Optional[str],
+    colors: Optional[list[str]],
+    image_data: Optional[str],
+) -> tuple[str, Optional[str], str]:
+    """Normalise a request and return (prompt, image base64 payload, cache key)."""
+    # Normalised fields make equivalent requests share one prompt — and one cache entry
+    clothing_type, occasion, preferences = (_normalize(v) for v in (clothing_type, occasion, preferences))
+    colors = sorted({c for c in (_normalize(c) for c in colors or []) if c}) or None
+    if image_data and "base64," in image_data:
+        # Remove header if present (e.g. "data:image/png;base64,")
+        image_data = image_data.split("base64,")[1]
+
+    prompt = _build_recommendation_prompt(clothing_type, occasion, preferences, colors, has_image=bool(image_data))
+    return prompt, image_data, make_recommendation_key(prompt, image_data, GEMINI_MODEL)
+
+
+def _recommendation_content(prompt: str, image_data: Optional[str]) -> list:
+    """Gemini content parts: the prompt, plus the user's image when it decodes."""
+    content: list = [prompt]
+    if image_data:
+        try:
+            image_bytes = base64.b64decode(image_data)
+            image = Image.open(io.BytesIO(image_bytes))
+            content.append(image)
+            logger.info("Image attached to recommendation request")
+        except Exception as img_err:
+            logger.error(f"Failed to process image for recommendation: {img_err}")
+            # Continue without image if it fails
+    return content
+
+
 async def get_combo_tip(style: str) -> Optional[str]:
     """
     Get an AI-generated styling tip for a combo style.
@@ -102,13 +263,49 @@ async def get_combo_tip(style: str) -> Optional[str]:
             f"(2-3 sentences max) for a '{style}' outfit combo. Be specific about "
             f"colors, fit, and accessories. Keep it conversational and actionable."
         )
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        return (await _generate_text(model, prompt)).strip()
     except Exception as e:
         logger.error(f"Gemini combo tip failed: {e}")
         return None
 
 
+async def describe_outfit(image_path: Path) -> Optional[str]:
+    """
+    Describe the outfit in a try-on result in one sentence, for wardrobe search.
+
+    Returns:
+        The description, or None if Gemini is unavailable or the call failed.
+    """
+    model = _get_model()
+    if model is None:
+        return None
+
+    try:
+        image = await asyncio.to_thread(_load_thumbnail, image_path)
+        prompt = (
+            "Describe the outfit this person is wearing in one sentence for a wardrobe "
+            "search index: garment types, colors, materials, patterns and overall style. "
+            "Reply with the sentence only."
+        )
+        return (await _generate_text(model, [prompt, image])).strip() or None
+    except Exception as e:
+        logger.error(f"Gemini outfit description failed: {e}")
+        return None
+
+
+def _load_thumbnail(path: Path) -> Image.Image:
+    with Image.open(path) as img:
+        img.thumbnail((_DESCRIBE_MAX_SIDE, _DESCRIBE_MAX_SIDE))
+        return img.convert("RGB")
+
+
+def _normalize(value: Optional[str]) -> Optional[str]:
+    """Lower-case and collapse whitespace; blank becomes None."""
+    if value is None:
+        return None
+    return " ".join(value.lower().split()) or None
+
+
 def _build_recommendation_prompt(
     clothing_type: Optional[str],
     occasion: Optional[str],
@@ -192,10 +389,9 @@ async def analyze_vto_images(person_b64: str, garment_b64: str) -> str:
         content.append("Garment Image:")
         content.append(g_img)
 
-        response = model.generate_content(content)
-        
+        result_text = (await _generate_text(model, content)).strip()
+
         # Try to parse the markdown block out if the AI wrapped it in ```json
-        result_text = response.text.strip()
         if result_text.startswith("```json"):
             result_text = result_text.split("```json")[1].split("```")[0].strip()
         elif result_text.startswith("```"):
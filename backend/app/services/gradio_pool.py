@@ -0,0 +1,180 @@
+"""
+Pool of warm gradio_client.Client instances, keyed by (space, token).
+
+Constructing a Client fetches the space config and API info before any
+work starts, so reusing clients saves seconds on every remote try-on.
+"""
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import httpx
+
+    _CONNECTION_ERRORS: tuple[type[BaseException], ...] = (ConnectionError, OSError, httpx.TransportError)
+except ImportError:  # httpx ships with gradio_client, but keep the pool importable without it
+    _CONNECTION_ERRORS = (ConnectionError, OSError)
+
+
+def _build_client(space: str, token: Optional[str]) -> Any:
+    from gradio_client import Client
+
+    return Client(space, token=token) if token else Client(space)
+
+
+def _close_client(client: Any) -> None:
+    close = getattr(client, "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception as e:
+            logger.debug(f"Ignoring error while closing gradio client: {e}")
+
+
+class GradioClientPool:
+    """
+    Thread-safe pool of idle clients per (space, token).
+
+    A client is checked out for the duration of one call and returned
+    afterwards. Clients that raise a connection error are discarded so the
+    next call rebuilds them; clients idle longer than ``idle_ttl`` are closed.
+    """
+
+    def __init__(
+        self,
+        max_idle_per_key: int,
+        idle_ttl: float,
+        factory: Callable[[str, Optional[str]], Any] = _build_client,
+    ):
+        self.max_idle_per_key = max_idle_per_key
+        self.idle_ttl = idle_ttl
+        self._factory = factory
+        self._idle: dict[tuple[str, str], list[tuple[Any, float]]] = {}
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.expired = 0
+
+    @contextmanager
+    def client(self, space: str, token: Optional[str] = None) -> Iterator[Any]:
+        """Check out a client for ``space``; it is returned to the pool afterwards."""
+        key = self._key(space, token)
+        client = self._acquire(key, space, token)
+        try:
+            yield client
+        except _CONNECTION_ERRORS:
+            self.discarded += 1
+            logger.info(f"Discarding gradio client for {space} after connection error")
+            _close_client(client)
+            raise
+        except BaseException:
+            self._release(key, client)
+            raise
+        else:
+            self._release(key, client)
+
+    def warm(self, space: str, token: Optional[str] = None) -> None:
+        """Build a client ahead of time so the first request finds it ready."""
+        key = self._key(space, token)
+        with self._lock:
+            if self._idle.get(key):
+                return
+        client = self._create(space, token)
+        self._release(key, client)
+        logger.info(f"Pre-warmed gradio client for {space}")
+
+    def evict_idle(self) -> int:
+        """Close clients idle for longer than ``idle_ttl``. Returns how many were closed."""
+        cutoff = time.monotonic() - self.idle_ttl
+        stale = []
+        with self._lock:
+            for key, entries in list(self._idle.items()):
+                fresh = [(c, t) for c, t in entries if t >= cutoff]
+                stale.extend(c for c, t in entries if t < cutoff)
+                if fresh:
+                    self._idle[key] = fresh
+                else:
+                    del self._idle[key]
+            self.expired += len(stale)
+        for client in stale:
+            _close_client(client)
+        return len(stale)
+
+    def clear(self) -> None:
+        """Close every idle client."""
+        with self._lock:
+            entries = [c for clients in self._idle.values() for c, _ in clients]
+            self._idle.clear()
+        for client in entries:
+            _close_client(client)
+
+    def stats(self) -> dict:
+        """Counters for the metrics endpoint."""
+        with self._lock:
+            idle = {space: 0 for space, _ in self._idle}
+            for (space, _), entries in self._idle.items():
+                idle[space] += len(entries)
+        return {
+            "idle": idle,
+            "created": self.created,
+            "reused": self.reused,
+            "discarded": self.discarded,
+            "expired": self.expired,
+        }
+
+    # ── Internals ───────────────────────────────────────────────────
+
+    @staticmethod
+    def _key(space: str, token: Optional[str]) -> tuple[str, str]:
+        # Tokens are only ever held as a digest, so pool keys are safe to log
+        token_id = hashlib.sha256(token.encode("utf-8")).hexdigest()[:16] if token else ""
+        return space, token_id
+
+    def _create(self, space: str, token: Optional[str]) -> Any:
+        client = self._factory(space, token)
+        self.created += 1
+        return client
+
+    def _acquire(self, key: tuple[str, str], space: str, token: Optional[str]) -> Any:
+        self.evict_idle()
+        with self._lock:
+            entries = self._idle.get(key)
+            if entries:
+                client, _ = entries.pop()  # most recently used — the warmest connection
+                self.reused += 1
+                return client
+        return self._create(space, token)
+
+    def _release(self, key: tuple[str, str], client: Any) -> None:
+        overflow = None
+        with self._lock:
+            entries = self._idle.setdefault(key, [])
+            entries.append((client, time.monotonic()))
+            if len(entries) > self.max_idle_per_key:
+                overflow, _ = entries.pop(0)
+        if overflow is not None:
+            _close_client(overflow)
+
+
+_pool: Optional[GradioClientPool] = None
+
+
+def get_client_pool() -> GradioClientPool:
+    """Process-wide client pool singleton."""
+    global _pool
+    if _pool is None:
+        settings = get_settings()
+        _pool = GradioClientPool(
+            max_idle_per_key=settings.GRADIO_POOL_MAX_IDLE,
+            idle_ttl=settings.GRADIO_POOL_IDLE_TTL_SECONDS,
+        )
+    return _pool
@@ -0,0 +1,261 @@
+"""
+Storage janitor — periodic cleanup of temp uploads and stored results.
+
+Temp files (uploads and their resized copies) are deleted once they are
+older than TEMP_TTL_SECONDS, unless a queued try-on job still needs them. Stored results are kept under
+STORAGE_MAX_BYTES by evicting the least recently accessed files, and the
+``images`` table is kept in step with what is actually on disk. Cached
+derivatives of images that are gone are removed too.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Collection, Iterator, Optional
+
+from app.config import get_settings
+from app.database import delete_blobs, delete_images_by_url, list_blob_paths, list_image_urls
+from app.services.job_service import get_job_manager
+from app.services.storage import URL_PREFIX, blob_lock, blob_path_of, has_pending_reference
+
+logger = logging.getLogger(__name__)
+
+# Evict down to this fraction of the quota so every sweep doesn't evict again
+_STORAGE_LOW_WATER = 0.9
+
+
+class StorageJanitor:
+    """Sweeps TEMP_DIR and STORAGE_DIR; ``sweep`` is blocking, ``run`` loops it off the event loop."""
+
+    def __init__(
+        self,
+        temp_dir: Path,
+        storage_dir: Path,
+        temp_ttl: float,
+        storage_max_bytes: int,
+        interval: float,
+        derivative_dir: Optional[Path] = None,
+        in_use: Optional[Callable[[], Collection[Path]]] = None,
+    ):
+        self.temp_dir = Path(temp_dir)
+        self.storage_dir = Path(storage_dir)
+        self.derivative_dir = Path(derivative_dir) if derivative_dir else None
+        self.temp_ttl = temp_ttl
+        self.storage_max_bytes = storage_max_bytes
+        self.interval = interval
+        # Temp files still needed by someone (queued jobs); called on the event loop
+        self.in_use = in_use
+        self._lock = threading.Lock()
+
+        self.sweeps = 0
+        self.temp_files_removed = 0
+        self.storage_files_evicted = 0
+        self.derivatives_removed = 0
+        self.db_rows_removed = 0
+        self.bytes_reclaimed = 0
+        self.storage_bytes: Optional[int] = None
+        self.last_sweep_at: Optional[float] = None
+
+    # ── Public API ──────────────────────────────────────────────────
+
+    async def run(self) -> None:
+        """Sweep now and then every ``interval`` seconds until cancelled."""
+        while True:
+            try:
+                keep = self.in_use() if self.in_use is not None else ()
+                result = await asyncio.to_thread(self.sweep, keep)
+                if result["bytes_reclaimed"]:
+                    logger.info(
+                        f"Janitor reclaimed {result['bytes_reclaimed']} bytes "
+                        f"({result['temp_files_removed']} temp, {result['storage_files_evicted']} stored)"
+                    )
+            except Exception as e:
+                logger.error(f"Janitor sweep failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def sweep(self, keep: Collection[Path] = ()) -> dict:
+        """Run one cleanup pass and return what it removed. Temp files in ``keep`` are left alone."""
+        with self._lock:
+            temp_removed, temp_bytes = self._sweep_temp(keep)
+            # Stores, deletes and the legacy migration take the same lock, so a
+            # file can't be deduplicated against, or moved, while it is judged here
+            with blob_lock:
+                evicted, evicted_bytes = self._enforce_quota()
+                rows_removed = self._sync_database()
+            derivatives_removed, derivative_bytes = self._sweep_derivatives()
+            reclaimed = temp_bytes + evicted_bytes + derivative_bytes
+
+            self.sweeps += 1
+            self.temp_files_removed += temp_removed
+            self.storage_files_evicted += len(evicted)
+            self.derivatives_removed += derivatives_removed
+            self.db_rows_removed += rows_removed
+            self.bytes_reclaimed += reclaimed
+            self.last_sweep_at = time.time()
+
+            return {
+                "temp_files_removed": temp_removed,
+                "storage_files_evicted": len(evicted),
+                "derivatives_removed": derivatives_removed,
+                "db_rows_removed": rows_removed,
+                "bytes_reclaimed": reclaimed,
+            }
+
+    def stats(self) -> dict:
+        """Totals across sweeps, for the metrics endpoint."""
+        with self._lock:
+            return {
+                "sweeps": self.sweeps,
+                "last_sweep_at": self.last_sweep_at,
+                "temp_files_removed": self.temp_files_removed,
+                "storage_files_evicted": self.storage_files_evicted,
+                "derivatives_removed": self.derivatives_removed,
+                "db_rows_removed": self.db_rows_removed,
+                "bytes_reclaimed": self.bytes_reclaimed,
+                "storage_bytes": self.storage_bytes,
+                "storage_max_bytes": self.storage_max_bytes,
+            }
+
+    # ── Internals ───────────────────────────────────────────────────
+
+    def _sweep_temp(self, keep: Collection[Path]) -> tuple[int, int]:
+        cutoff = time.time() - self.temp_ttl
+        keep_names = {Path(path).name for path in keep}
+        removed = reclaimed = 0
+        for name, path, st in _scan_files(self.temp_dir, recursive=False):
+            if name in keep_names:
+                continue
+            if st.st_mtime < cutoff and _unlink(path):
+                removed += 1
+                reclaimed += st.st_size
+        return removed, reclaimed
+
+    def _enforce_quota(self) -> tuple[list[str], int]:
+        files = list(_scan_files(self.storage_dir))
+        total = sum(st.st_size for _, _, st in files)
+
+        evicted: list[str] = []
+        reclaimed = 0
+        if total > self.storage_max_bytes:
+            target = self.storage_max_bytes * _STORAGE_LOW_WATER
+            # Least recently accessed first — serving an image records its atime
+            # explicitly (storage.record_access), so this holds on noatime mounts
+            for relative, path, st in sorted(files, key=lambda f: f[2].st_atime):
+                if total <= target:
+                    break
+                if has_pending_reference(relative):
+                    continue  # just deduplicated against; its new row isn't committed yet
+                if _unlink(path):
+                    evicted.append(relative)
+                    total -= st.st_size
+                    reclaimed += st.st_size
+                    _prune_empty_parents(Path(path), self.storage_dir)
+            logger.info(f"Storage over quota — evicted {len(evicted)} least recently used results")
+
+        if evicted:
+            # A content-addressed file may back several image rows — they all go
+            # with it, each releasing its reference. Whatever count is left over
+            # (drift) goes too: the file is gone.
+            _delete_image_rows([URL_PREFIX + relative for relative in evicted])
+            delete_blobs(evicted)
+        self.storage_bytes = total
+        return evicted, reclaimed
+
+    def _sync_database(self) -> int:
+        """Drop image and blob rows whose file no longer exists (evicted, or deleted by hand)."""
+        # Rows are listed before the scan: a file is always written before its rows,
+        # so a result stored mid-sweep can't be mistaken for a missing one
+        urls, blob_paths = list_image_urls(), list_blob_paths()
+        on_disk = {relative for relative, _, _ in _scan_files(self.storage_dir)}
+        missing_images = [
+            url for url in urls
+            if url.startswith(URL_PREFIX) and url[len(URL_PREFIX):] not in on_disk
+        ]
+        removed = _delete_image_rows(missing_images)
+        delete_blobs([path for path in blob_paths if path not in on_disk])
+        return removed
+
+    def _sweep_derivatives(self) -> tuple[int, int]:
+        """Remove cached derivatives whose source image is no longer stored."""
+        if self.derivative_dir is None:
+            return 0, 0
+        # Derivatives are named <source hash>_w<width>.<fmt>; sources are <hash>.<ext>
+        sources = {Path(relative).stem for relative, _, _ in _scan_files(self.storage_dir)}
+        removed = reclaimed = 0
+        for relative, path, st in _scan_files(self.derivative_dir):
+            if Path(relative).name.split("_w", 1)[0] not in sources and _unlink(path):
+                removed += 1
+                reclaimed += st.st_size
+                _prune_empty_parents(Path(path), self.derivative_dir)
+        return removed, reclaimed
+
+
+def _delete_image_rows(urls: list[str]) -> int:
+    """Delete image rows by URL, releasing their blob references."""
+    blob_paths = {url: path for url in urls if (path := blob_path_of(url)) is not None}
+    return delete_images_by_url(urls, blob_paths)
+
+
+def _scan_files(directory: Path, recursive: bool = True) -> Iterator[tuple[str, str, os.stat_result]]:
+    """Yield (relative path, path, stat) for regular files under ``directory``, skipping dotfiles."""
+    pending = [(Path(directory), "")]
+    while pending:
+        current, prefix = pending.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.name.startswith("."):
+                        continue
+                    try:
+                        if entry.is_file(follow_symlinks=False):
+                            yield prefix + entry.name, entry.path, entry.stat(follow_symlinks=False)
+                        elif recursive and entry.is_dir(follow_symlinks=False):
+                            pending.append((Path(entry.path), f"{prefix}{entry.name}/"))
+                    except FileNotFoundError:
+                        continue  # Removed while we were scanning
+        except FileNotFoundError:
+            continue
+
+
+def _prune_empty_parents(path: Path, root: Path) -> None:
+    """Remove shard directories left empty by an eviction."""
+    parent = path.parent
+    while parent != root and root in parent.parents:
+        try:
+            parent.rmdir()
+        except OSError:
+            return
+        parent = parent.parent
+
+
+def _unlink(path: str) -> bool:
+    try:
+        os.unlink(path)
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        logger.warning(f"Janitor could not delete {path}: {e}")
+        return False
+
+
+_janitor: Optional[StorageJanitor] = None
+
+
+def get_janitor() -> StorageJanitor:
+    """Process-wide storage janitor singleton."""
+    global _janitor
+    if _janitor is None:
+        settings = get_settings()
+        _janitor = StorageJanitor(
+            temp_dir=settings.TEMP_DIR,
+            storage_dir=settings.STORAGE_DIR,
+            temp_ttl=settings.TEMP_TTL_SECONDS,
+            storage_max_bytes=settings.STORAGE_MAX_BYTES,
+            interval=settings.JANITOR_INTERVAL_SECONDS,
+            derivative_dir=settings.DERIVATIVE_CACHE_DIR,
+            in_use=lambda: get_job_manager().pending_inputs(),
+        )
+    return _janitor
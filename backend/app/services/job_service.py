@@ -0,0 +1,222 @@
+"""
+Try-on job service — queues try-ons behind a bounded worker pool.
+
+Clients submit a job and get an id immediately, then poll or stream its
+state instead of holding an HTTP connection open for the whole remote call.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from app.config import get_settings
+from app.utils.hf_errors import HFTokenError
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueueFullError(Exception):
+    """Raised when the try-on job queue has no room for another job."""
+
+
+@dataclass
+class TryOnJob:
+    """State of one queued try-on."""
+    id: str
+    seq: int
+    run: Callable[[], Awaitable[str]] = field(repr=False)
+    inputs: tuple[Path, ...] = ()  # temp files the job reads; kept from the janitor until it finishes
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    image_url: Optional[str] = None
+    error_code: Optional[str] = None
+    message: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+
+class TryOnJobManager:
+    """
+    In-process job queue drained by a fixed number of worker tasks.
+
+    Queue position is O(1): jobs are numbered on submit and started in order,
+    so a queued job's position is its number minus the count already started.
+    Finished jobs are kept for ``result_ttl`` seconds so clients can collect them.
+    """
+
+    def __init__(self, workers: int, max_queue: int, result_ttl: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+
+        self._jobs: dict[str, TryOnJob] = {}
+        self._finished: deque[TryOnJob] = deque()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Event] = None
+
+        self._submitted = 0
+        self._started = 0
+        self.completed = 0
+        self.failed = 0
+
+    # ── Lifecycle ───────────────────────────────────────────────────
+
+    async def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._changed = asyncio.Event()
+        self._jobs.clear()
+        self._finished.clear()
+        self._submitted = self._started = 0
+        self._tasks = [
+            loop.create_task(self._worker(i), name=f"tryon-job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Try-on job pool started with {self.workers} workers")
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks; queued jobs are dropped."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ── Public API ──────────────────────────────────────────────────
+
+    async def submit(self, run: Callable[[], Awaitable[str]], inputs: tuple[Path, ...] = ()) -> TryOnJob:
+        """
+        Queue a job. ``run`` performs the try-on and returns the result image URL.
+
+        ``inputs`` are the temp files ``run`` reads. They can sit in the queue
+        for longer than TEMP_TTL_SECONDS, so the janitor skips them until the
+        job finishes (see ``pending_inputs``).
+
+        Raises:
+            JobQueueFullError: If the queue already holds ``max_queue`` jobs.
+        """
+        await self.start()
+        self._prune()
+
+        job = TryOnJob(id=uuid.uuid4().hex, seq=self._submitted + 1, run=run, inputs=tuple(inputs))
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFullError(
+                f"Try-on queue is full ({self.max_queue} jobs). Please try again shortly."
+            )
+
+        self._submitted += 1
+        self._jobs[job.id] = job
+        logger.info(f"Try-on job {job.id} queued at position {self.position(job)}")
+        return job
+
+    def get(self, job_id: str) -> Optional[TryOnJob]:
+        """Look up a job by id."""
+        return self._jobs.get(job_id)
+
+    def position(self, job: TryOnJob) -> int:
+        """1-based queue position of a queued job, 0 once it has started."""
+        if job.status != QUEUED:
+            return 0
+        return job.seq - self._started
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        """Block until any job changes state. Returns False if the timeout elapsed first."""
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def pending_inputs(self) -> set[Path]:
+        """Input files of every job that hasn't finished yet. Call on the event loop."""
+        return {path for job in self._jobs.values() if not job.finished for path in job.inputs}
+
+    def stats(self) -> dict:
+        """Counters for the metrics endpoint."""
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": sum(1 for j in self._jobs.values() if j.status == RUNNING),
+            "completed": self.completed,
+            "failed": self.failed,
+            "tracked_jobs": len(self._jobs),
+        }
+
+    # ── Internals ───────────────────────────────────────────────────
+
+    def _notify(self) -> None:
+        # Wake every watcher, then arm a fresh event for the next change
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.result_ttl
+        while self._finished and self._finished[0].finished_at < cutoff:
+            self._jobs.pop(self._finished.popleft().id, None)
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self._queue.get()
+            self._started += 1
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._notify()
+
+            try:
+                job.image_url = await job.run()
+                job.status = DONE
+                self.completed += 1
+            except HFTokenError as e:
+                job.status = FAILED
+                job.error_code = e.error_code
+                job.message = e.user_message
+                self.failed += 1
+            except Exception as e:
+                logger.error(f"Try-on job {job.id} failed: {e}", exc_info=True)
+                job.status = FAILED
+                job.message = str(e)
+                self.failed += 1
+            finally:
+                job.finished_at = time.time()
+                self._finished.append(job)
+                self._queue.task_done()
+                self._notify()
+
+
+_manager: Optional[TryOnJobManager] = None
+
+
+def get_job_manager() -> TryOnJobManager:
+    """Process-wide job manager singleton."""
+    global _manager
+    if _manager is None:
+        settings = get_settings()
+        _manager = TryOnJobManager(
+            workers=settings.TRYON_JOB_WORKERS,
+            max_queue=settings.TRYON_JOB_QUEUE_SIZE,
+            result_ttl=settings.TRYON_JOB_TTL_SECONDS,
+        )
+    return _manager
@@ -0,0 +1,256 @@
+"""
+Local CPU try-on engine — a rough, instant preview built with NumPy and PIL.
+
+No network and no GPU: the garment is cut out from its background, the
+person's torso is located with simple silhouette heuristics, and the
+garment is warped and alpha-blended onto it. The output is deterministic,
+which also makes this engine handy for load tests.
+"""
+import io
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageFilter, ImageOps
+
+# Working resolution — previews don't need more, and it keeps runtime well under a second
+_PERSON_MAX_SIDE = 768
+_GARMENT_MAX_SIDE = 512
+# Segmentation and face search only need a rough silhouette; the rank filters
+# they use cost O(pixels x kernel), so they run on a much smaller copy
+_ANALYSIS_MAX_SIDE = 256
+
+# Colour distance from the estimated background that counts as foreground
+_FOREGROUND_THRESHOLD = 40.0
+
+# Vertical extent of each category as fractions of the person's silhouette height
+_REGIONS = {
+    "upper_body": (0.22, 0.58),
+    "lower_body": (0.48, 0.97),
+    "dresses": (0.22, 0.85),
+}
+
+# Bottom-edge width relative to the top edge — garments taper slightly towards the waist/hem
+_TAPER = {
+    "upper_body": 0.9,
+    "lower_body": 0.8,
+    "dresses": 1.1,
+}
+
+
+def render_preview(person_path: Path, garment_path: Path, category: str = "upper_body") -> bytes:
+    """Composite the garment onto the person and return PNG bytes."""
+    person = _load(person_path, _PERSON_MAX_SIDE, "RGB")
+    garment = _load(garment_path, _GARMENT_MAX_SIDE, "RGBA")
+
+    garment, garment_mask = _cut_out_garment(garment)
+    left, top, width, height = _target_region(person, category)
+
+    warped = _warp(garment, (width, height), _TAPER.get(category, 1.0))
+    warped_mask = _warp(garment_mask, (width, height), _TAPER.get(category, 1.0))
+    warped_mask = warped_mask.filter(ImageFilter.GaussianBlur(1.5))
+
+    region = person.crop((left, top, left + width, top + height))
+    shaded = _apply_shading(warped.convert("RGB"), region)
+
+    result = person.copy()
+    result.paste(shaded, (left, top), warped_mask)
+
+    buf = io.BytesIO()
+    result.save(buf, format="PNG", optimize=False, compress_level=1)
+    return buf.getvalue()
+
+
+def _load(path: Path, max_side: int, mode: str) -> Image.Image:
+    """Open an image upright and downsized to fit ``max_side``."""
+    with Image.open(path) as img:
+        # JPEGs decode straight at a reduced scale (still >= max_side) — a
+        # phone photo then costs a fraction of a full decode
+        img.draft("RGB", (max_side, max_side))
+        img = ImageOps.exif_transpose(img).convert(mode)
+    img.thumbnail((max_side, max_side), Image.BILINEAR)
+    return img
+
+
+def _analysis_copy(img: Image.Image) -> tuple[Image.Image, float]:
+    """A copy downsized to the analysis resolution, and the factor back to ``img`` pixels."""
+    small = img.copy()
+    small.thumbnail((_ANALYSIS_MAX_SIDE, _ANALYSIS_MAX_SIDE), Image.BILINEAR)
+    return small, img.width / small.width
+
+
+# ── Segmentation ────────────────────────────────────────────────────
+
+def _foreground_mask(rgb: np.ndarray) -> np.ndarray:
+    """Boolean mask of pixels that differ from the dominant border colour."""
+    border = np.concatenate([rgb[0], rgb[-1], rgb[:, 0], rgb[:, -1]]).astype(np.float32)
+    background = np.median(border, axis=0)
+    distance = np.linalg.norm(rgb.astype(np.float32) - background, axis=2)
+    return distance > _FOREGROUND_THRESHOLD
+
+
+def _clean(mask: np.ndarray, size: int = 5) -> Image.Image:
+    """Morphological open + close to drop speckles and fill small holes."""
+    img = Image.fromarray(mask.astype(np.uint8) * 255)
+    img = img.filter(ImageFilter.MinFilter(size)).filter(ImageFilter.MaxFilter(size))
+    img = img.filter(ImageFilter.MaxFilter(size)).filter(ImageFilter.MinFilter(size))
+    return img
+
+
+def _cut_out_garment(garment: Image.Image) -> tuple[Image.Image, Image.Image]:
+    """Return the garment cropped to its silhouette, plus its alpha mask."""
+    rgba = np.asarray(garment)
+    alpha = rgba[..., 3]
+
+    if (alpha < 250).mean() > 0.05:
+        # Already a cut-out (transparent PNG/WebP) — trust its alpha channel
+        mask = Image.fromarray(alpha)
+    else:
+        # Clean up at the analysis resolution, then intersect with the
+        # full-resolution mask so edges stay sharp and free of background fringe
+        small, _ = _analysis_copy(garment)
+        cleaned = _clean(_foreground_mask(np.asarray(small)[..., :3]), size=3)
+        cleaned = np.asarray(cleaned.resize(garment.size, Image.BILINEAR)) >= 128
+        mask = Image.fromarray(((cleaned & _foreground_mask(rgba[..., :3])) * 255).astype(np.uint8))
+
+    bbox = mask.getbbox()
+    if bbox is None:
+        # Nothing stands out from the background — use the whole image
+        bbox = (0, 0, garment.width, garment.height)
+        mask = Image.new("L", garment.size, 255)
+
+    return garment.crop(bbox), mask.crop(bbox)
+
+
+# ── Body heuristics ─────────────────────────────────────────────────
+
+# Garment placement in head-heights, measured from the bottom of the face:
+# (offset to top edge, height, width in face-widths)
+_HEAD_PROPORTIONS = {
+    "upper_body": (0.2, 2.7, 3.4),
+    "lower_body": (2.6, 4.0, 2.6),
+    "dresses": (0.2, 5.0, 3.2),
+}
+
+
+def _skin_mask(person: Image.Image) -> np.ndarray:
+    """Classic YCbCr skin-tone range; robust enough to find a face for a preview."""
+    ycbcr = np.asarray(person.convert("YCbCr"), dtype=np.int16)
+    cb, cr = ycbcr[..., 1], ycbcr[..., 2]
+    return (cb >= 77) & (cb <= 127) & (cr >= 133) & (cr <= 173)
+
+
+def _runs(indices: np.ndarray, max_gap: int) -> list[tuple[int, int]]:
+    """Group sorted indices into (first, last) runs, bridging gaps up to ``max_gap``."""
+    if indices.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(indices) > max_gap)
+    starts = np.concatenate([[indices[0]], indices[breaks + 1]])
+    ends = np.concatenate([indices[breaks], [indices[-1]]])
+    return [(int(a), int(b)) for a, b in zip(starts, ends)]
+
+
+def _find_face(person: Image.Image) -> tuple[int, int, int, int] | None:
+    """
+    Estimate the face box (left, top, right, bottom) from skin-tone blobs.
+
+    Only the top 60% of the frame is searched, which skips hands and legs.
+    Every blob found as a run of skin rows split into runs of skin columns
+    is a candidate; the largest one with face-like proportions wins.
+    """
+    skin = np.asarray(_clean(_skin_mask(person), size=3)) > 0
+    upper = skin[: int(skin.shape[0] * 0.6)]
+    gap = max(3, person.height // 100)
+    min_side = max(6, min(person.size) // 20)
+
+    best, best_area = None, 0
+    for top, bottom in _runs(np.flatnonzero(upper.sum(axis=1) >= 2), gap):
+        band = upper[top:bottom + 1]
+        for left, right in _runs(np.flatnonzero(band.any(axis=0)), gap):
+            # Tighten the rows to where this column run actually has skin
+            face_rows = np.flatnonzero(band[:, left:right + 1].any(axis=1))
+            face_top, face_bottom = top + int(face_rows[0]), top + int(face_rows[-1])
+            face_w, face_h = right - left, face_bottom - face_top
+
+            # Reject implausible shapes: specks, skin-toned walls or curtains,
+            # and anything cut off by the frame edge
+            if face_w < min_side or face_w > person.width * 0.4:
+                continue
+            if left == 0 or face_top == 0 or right >= person.width - 1:
+                continue
+            if not 0.9 <= face_h / face_w <= 2.0:
+                continue
+            fill = band[face_rows[0]:face_rows[-1] + 1, left:right + 1].mean()
+            if fill < 0.45 or face_w * face_h <= best_area:
+                continue
+            best, best_area = (left, face_top, right, face_bottom), face_w * face_h
+    return best
+
+
+def _target_region(person: Image.Image, category: str) -> tuple[int, int, int, int]:
+    """Locate where the garment goes as (left, top, width, height) in person pixels."""
+    small, scale = _analysis_copy(person)
+    face = _find_face(small)
+    if face is not None:
+        left, face_top, right, face_bottom = (round(v * scale) for v in face)
+        face_w, face_h = right - left, face_bottom - face_top
+        offset, length, span = _HEAD_PROPORTIONS.get(category, _HEAD_PROPORTIONS["upper_body"])
+        top = face_bottom + int(face_h * offset)
+        height = int(face_h * length)
+        width = int(face_w * span)
+        centre = (left + right) // 2
+    else:
+        top, height, width, centre = (round(v * scale) for v in _silhouette_region(small, category))
+
+    top = max(0, min(top, person.height - 8))
+    height = max(8, min(height, person.height - top))
+    width = max(8, min(width, person.width))
+    left = max(0, min(centre - width // 2, person.width - width))
+    return left, top, width, height
+
+
+def _silhouette_region(person: Image.Image, category: str) -> tuple[int, int, int, int]:
+    """Fallback placement from the foreground silhouette: (top, height, width, centre)."""
+    mask = np.asarray(_clean(_foreground_mask(np.asarray(person)), size=3)) > 0
+    rows = np.flatnonzero(mask.sum(axis=1) > mask.shape[1] * 0.02)
+
+    if rows.size < 10 or mask.mean() > 0.8:
+        # No usable silhouette — assume a centred subject filling the frame
+        mask = np.zeros_like(mask)
+        mask[:, person.width // 4: person.width * 3 // 4] = True
+        rows = np.arange(mask.shape[0])
+
+    body_top, body_bottom = int(rows[0]), int(rows[-1])
+    body_height = body_bottom - body_top + 1
+    start, end = _REGIONS.get(category, _REGIONS["upper_body"])
+    top = body_top + int(body_height * start)
+    bottom = max(top + 1, body_top + int(body_height * end))
+
+    band = mask[top:bottom]
+    cols = np.flatnonzero(band.any(axis=0))
+    if cols.size == 0:
+        return top, bottom - top, person.width // 2, person.width // 2
+
+    row_widths = band.sum(axis=1)
+    width = int(np.percentile(row_widths[row_widths > 0], 75) * 1.08)
+    return top, bottom - top, width, int(np.median(cols))
+
+
+# ── Warp and blend ──────────────────────────────────────────────────
+
+def _warp(img: Image.Image, size: tuple[int, int], taper: float) -> Image.Image:
+    """Stretch ``img`` into ``size`` with the bottom edge scaled by ``taper``."""
+    w, h = img.size
+    # QUAD maps a source quadrilateral onto the output rectangle. Widening the
+    # source's bottom edge narrows the garment's bottom edge in the output.
+    dx = w * (1 / taper - 1) / 2
+    quad = (0, 0, -dx, h, w + dx, h, w, 0)
+    return img.transform(size, Image.QUAD, quad, resample=Image.BILINEAR)
+
+
+def _apply_shading(garment: Image.Image, region: Image.Image, strength: float = 0.35) -> Image.Image:
+    """Modulate garment brightness by the person's local lighting so folds and shadows carry over."""
+    luminance = np.asarray(region.convert("L"), dtype=np.float32)
+    mean = luminance.mean() or 1.0
+    gain = 1.0 + strength * (luminance / mean - 1.0)
+    shaded = np.asarray(garment, dtype=np.float32) * gain[..., None]
+    return Image.fromarray(np.clip(shaded, 0, 255).astype(np.uint8))
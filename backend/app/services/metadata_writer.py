@@ -0,0 +1,186 @@
+"""
+Group-commit writer for image metadata rows.
+
+Stored results each need an ``images`` row. Committing them one by one costs
+one fsync per image, which adds up during batch try-ons and bulk imports.
+The writer collects rows from a queue and commits whatever arrives within a
+short window (or up to a batch size) in a single transaction.
+
+``submit`` is thread-safe and returns a future for the new row id, so both
+storage worker threads and async handlers can use it. While the writer isn't
+running (tests, scripts, or after shutdown) rows are written directly.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+from app.config import get_settings
+from app.database import insert_images, run_db, save_image_metadata
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MetadataWriter:
+    """Batches image metadata inserts into group commits on a background task."""
+
+    def __init__(self, window_ms: int, max_batch: int):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Guards _accepting so nothing is queued after the stop marker
+        self._lock = threading.Lock()
+        self._accepting = False
+
+        self.rows = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.direct_writes = 0
+
+    # ── Lifecycle ───────────────────────────────────────────────────
+
+    async def start(self) -> None:
+        """Start the writer task on the running event loop."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = self._loop.create_task(self._run(), name="metadata-writer")
+        with self._lock:
+            self._accepting = True
+        logger.info(f"Metadata writer started (window {self.window * 1000:.0f}ms, batch {self.max_batch})")
+
+    async def stop(self) -> None:
+        """Flush every queued row, then stop. Later submits are written directly."""
+        with self._lock:
+            if not self._accepting:
+                return
+            self._accepting = False
+            # Scheduled the same way as submits, so it lands behind all of them
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, _STOP)
+        await self._task
+        self._task = None
+
+    # ── Public API ──────────────────────────────────────────────────
+
+    def submit(
+        self,
+        filename: str,
+        url: str,
+        meta: Optional[dict] = None,
+        blob: Optional[tuple[str, str, int]] = None,
+    ) -> Future:
+        """
+        Queue an image row; the future resolves to its id once committed. Thread-safe.
+
+        ``blob`` is the (path, hash, size) of the stored file; its reference is
+        counted in the same group commit as the row. Cancelling the future
+        before its batch is flushed drops the row.
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._accepting:
+                self._loop.call_soon_threadsafe(self._queue.put_nowait, (filename, url, meta, blob, future))
+                return future
+
+        self.direct_writes += 1
+        try:
+            future.set_result(save_image_metadata(filename, url, meta, blob))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def stats(self) -> dict:
+        return {
+            "running": self._accepting,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "rows": self.rows,
+            "batches": self.batches,
+            "largest_batch": self.largest_batch,
+            "direct_writes": self.direct_writes,
+        }
+
+    # ── Internals ───────────────────────────────────────────────────
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+
+            deadline = self._loop.time() + self.window
+            while len(batch) < self.max_batch:
+                # Drain what's already queued without waiting
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - self._loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                # Never let one batch end the loop: submits would queue forever
+                logger.error(f"Metadata batch of {len(batch)} failed: {e}", exc_info=True)
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _flush(self, batch: list[tuple]) -> None:
+        # Claim each future; a row whose caller already cancelled it is dropped,
+        # and a claimed future can no longer be cancelled under us
+        batch = [row for row in batch if row[-1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            ids = await run_db(insert_images, [row[:4] for row in batch])
+        except Exception as e:
+            # One bad row (e.g. a duplicate filename) rolls back the whole
+            # transaction — retry individually so only that row fails
+            logger.warning(f"Metadata batch of {len(batch)} failed ({e}); retrying rows individually")
+            for filename, url, meta, blob, future in batch:
+                try:
+                    future.set_result(await run_db(save_image_metadata, filename, url, meta, blob))
+                    self.rows += 1
+                except Exception as row_error:
+                    logger.error(f"Could not save image row {filename}: {row_error}")
+                    future.set_exception(row_error)
+            return
+
+        for (*_, future), row_id in zip(batch, ids):
+            future.set_result(row_id)
+        self.rows += len(batch)
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+
+_writer: Optional[MetadataWriter] = None
+
+
+def get_metadata_writer() -> MetadataWriter:
+    """Process-wide metadata writer singleton."""
+    global _writer
+    if _writer is None:
+        settings = get_settings()
+        _writer = MetadataWriter(
+            window_ms=settings.METADATA_BATCH_WINDOW_MS,
+            max_batch=settings.METADATA_BATCH_MAX,
+        )
+    return _writer
@@ -0,0 +1,140 @@
+"""
+Recommendation cache — reuses Gemini suggestions for identical requests.
+
+The recommendation prompt is fully determined by the (normalised) request
+fields, so the key is a hash of the prompt plus a fingerprint of the
+attached image. An in-memory LRU with TTL answers repeats without touching
+the model; an optional SQLite tier shares entries across worker processes.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import get_settings
+from app.database import get_cached_recommendation, put_cached_recommendation, run_db
+
+logger = logging.getLogger(__name__)
+
+# Expired SQLite rows are purged once every this many writes
+_PURGE_EVERY = 100
+
+
+def make_recommendation_key(prompt: str, image_b64: Optional[str], model: str) -> str:
+    """Cache key for one recommendation: prompt, image fingerprint and model name."""
+    image_hash = hashlib.sha256(image_b64.encode("ascii")).hexdigest() if image_b64 else None
+    payload = json.dumps({"prompt": prompt, "image": image_hash, "model": model}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RecommendationCache:
+    """
+    In-memory LRU with TTL, optionally backed by a SQLite table.
+
+    Memory lookups are synchronous and take microseconds; the SQLite tier is
+    only consulted on a memory miss, off the event loop via ``run_db``.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, use_sqlite: bool = False):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.use_sqlite = use_sqlite
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.hits = 0
+        self.sqlite_hits = 0
+        self.misses = 0
+
+    def get_memory(self, key: str) -> Optional[str]:
+        """Return a cached suggestion from memory, or None. Never blocks on I/O."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            return None
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return a cached suggestion from either tier, or None."""
+        suggestion = self.get_memory(key)
+        if suggestion is not None:
+            return suggestion
+
+        if self.use_sqlite:
+            row = await run_db(get_cached_recommendation, key, time.time())
+            if row is not None:
+                suggestion, expires_at = row
+                self._remember(key, suggestion, expires_at)
+                with self._lock:
+                    self.hits += 1
+                    self.sqlite_hits += 1
+                return suggestion
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def put(self, key: str, suggestion: str) -> None:
+        """Store a suggestion in both tiers."""
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, suggestion, expires_at)
+        if self.use_sqlite:
+            with self._lock:
+                self._writes += 1
+                purge = self._writes % _PURGE_EVERY == 0
+            try:
+                await run_db(put_cached_recommendation, key, suggestion, expires_at, purge)
+            except Exception as e:
+                # The memory tier still has it — a shared-tier failure isn't worth an error
+                logger.warning(f"Recommendation cache write failed: {e}")
+
+    def clear(self) -> None:
+        """Drop the in-memory tier."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "sqlite_hits": self.sqlite_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "sqlite_tier": self.use_sqlite,
+            }
+
+    def _remember(self, key: str, suggestion: str, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (suggestion, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_cache: Optional[RecommendationCache] = None
+
+
+def get_recommendation_cache() -> Optional[RecommendationCache]:
+    """Process-wide recommendation cache, or None when disabled."""
+    global _cache
+    settings = get_settings()
+    if not settings.RECOMMEND_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = RecommendationCache(
+            ttl_seconds=settings.RECOMMEND_CACHE_TTL_SECONDS,
+            max_entries=settings.RECOMMEND_CACHE_MAX_ENTRIES,
+            use_sqlite=settings.RECOMMEND_CACHE_SQLITE,
+        )
+    return _cache
@@ -0,0 +1,205 @@
+"""
+Dedicated, bounded executor for blocking remote-model calls.
+
+Remote try-ons and Gemini calls each run on their own thread pool instead
+of the event loop's default executor, behind a per-backend concurrency
+limit. Calls receive a ``threading.Event`` that is set when the caller times
+out or is cancelled, so the worker thread can cancel its remote job and free
+its slot.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class RemoteCallCancelled(Exception):
+    """Raised inside a worker thread when its caller gave up on the call."""
+
+
+@dataclass
+class _BackendTimings:
+    """Per-backend call counts, and time spent queued vs. inside the call."""
+    calls: int = 0
+    errors: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+    call_total: float = 0.0
+    call_max: float = 0.0
+
+
+class RemoteCallExecutor:
+    """
+    Thread pool with per-backend semaphores and cooperative cancellation.
+
+    A backend's semaphore slot is held until the worker thread actually
+    finishes — not just until the caller stops waiting — so the limits
+    reflect real remote load even after timeouts. Metrics separate time spent
+    queued for a slot and a thread from time inside the call.
+    """
+
+    def __init__(self, max_workers: int, limits: dict[str, int], thread_name_prefix: str = "remote-call"):
+        self.max_workers = max_workers
+        self.limits = dict(limits)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._semaphores: dict[str, tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+        self._lock = threading.Lock()
+
+        self._waiting: dict[str, int] = {name: 0 for name in self.limits}
+        self._in_flight: dict[str, int] = {name: 0 for name in self.limits}
+        self._timings: dict[str, _BackendTimings] = {name: _BackendTimings() for name in self.limits}
+        self._submitted = 0
+        self._running = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    async def run(
+        self,
+        backend: str,
+        fn: Callable[[threading.Event], T],
+        timeout: Optional[float],
+        include_wait: bool = False,
+    ) -> T:
+        """
+        Run ``fn(cancel_event)`` on the pool once ``backend`` has a free slot.
+
+        ``timeout`` bounds the call itself; with ``include_wait`` it bounds the
+        wait for a slot as well, for callers that need a total latency cap.
+        None leaves the call unbounded, for callers that time it themselves.
+
+        Raises:
+            asyncio.TimeoutError: If the call does not finish in time.
+        """
+        loop = asyncio.get_running_loop()
+        queued_at = time.monotonic()
+        deadline = loop.time() + timeout if timeout is not None else None
+
+        semaphore = self._semaphore(backend)
+        self._waiting[backend] = self._waiting.get(backend, 0) + 1
+        try:
+            if include_wait:
+                await asyncio.wait_for(semaphore.acquire(), timeout=timeout)
+            else:
+                await semaphore.acquire()
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"Call to {backend} waited {timeout}s for a free slot — giving up")
+            raise
+        finally:
+            self._waiting[backend] -= 1
+
+        self._in_flight[backend] = self._in_flight.get(backend, 0) + 1
+        cancel_event = threading.Event()
+        with self._lock:
+            self._submitted += 1
+        future = loop.run_in_executor(self._executor, self._call, backend, fn, cancel_event, queued_at)
+
+        def _release(done: asyncio.Future) -> None:
+            self._in_flight[backend] -= 1
+            semaphore.release()
+            # Nobody may be awaiting a timed-out call — mark its outcome as retrieved
+            if not done.cancelled():
+                done.exception()
+
+        future.add_done_callback(_release)
+
+        remaining = max(deadline - loop.time(), 0) if include_wait and deadline is not None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=remaining)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            cancel_event.set()
+            logger.warning(f"Call to {backend} timed out after {timeout}s — cancelling")
+            raise
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            cancel_event.set()
+            raise
+
+    def shutdown(self) -> None:
+        """Stop accepting work and drop calls that have not started."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Saturation counters for the metrics endpoint."""
+        with self._lock:
+            queued = self._submitted - self._running - self.completed
+            running = self._running
+        return {
+            "max_workers": self.max_workers,
+            "running": running,
+            "queued": queued,
+            "saturation": round(running / self.max_workers, 3) if self.max_workers else 0.0,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "backends": {
+                name: self._backend_stats(name, limit) for name, limit in self.limits.items()
+            },
+        }
+
+    # ── Internals ───────────────────────────────────────────────────
+
+    def _backend_stats(self, name: str, limit: int) -> dict:
+        with self._lock:
+            t = self._timings.get(name) or _BackendTimings()
+            return {
+                "limit": limit,
+                "in_flight": self._in_flight.get(name, 0),
+                "waiting": self._waiting.get(name, 0),
+                "calls": t.calls,
+                "errors": t.errors,
+                "queue_wait_avg_ms": round(t.wait_total / t.calls * 1000, 1) if t.calls else 0.0,
+                "queue_wait_max_ms": round(t.wait_max * 1000, 1),
+                "call_time_avg_ms": round(t.call_total / t.calls * 1000, 1) if t.calls else 0.0,
+                "call_time_max_ms": round(t.call_max * 1000, 1),
+            }
+
+    def _semaphore(self, backend: str) -> asyncio.Semaphore:
+        # Semaphores bind to one event loop; tests and restarts bring new ones
+        loop = asyncio.get_running_loop()
+        entry = self._semaphores.get(backend)
+        if entry is None or entry[0] is not loop:
+            entry = (loop, asyncio.Semaphore(self.limits.get(backend, self.max_workers)))
+            self._semaphores[backend] = entry
+        return entry[1]
+
+    def _call(
+        self,
+        backend: str,
+        fn: Callable[[threading.Event], T],
+        cancel_event: threading.Event,
+        queued_at: float,
+    ) -> T:
+        started = time.monotonic()
+        with self._lock:
+            self._running += 1
+        failed = False
+        try:
+            if cancel_event.is_set():
+                # Timed out while still queued for a thread — don't start the remote call
+                raise RemoteCallCancelled("Call cancelled before it started")
+            return fn(cancel_event)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+                t = self._timings.setdefault(backend, _BackendTimings())
+                t.calls += 1
+                t.errors += failed
+                t.wait_total += started - queued_at
+                t.wait_max = max(t.wait_max, started - queued_at)
+                t.call_total += finished - started
+                t.call_max = max(t.call_max, finished - started)
@@ -0,0 +1,263 @@
+"""
+Try-on result cache — content-addressed, disk-backed with an in-memory LRU in front.
+
+Keys are a SHA-256 over the person bytes, garment bytes, category and the
+model parameters sent to the remote space, so a repeat try-on returns the
+stored result without touching the HuggingFace space (or its GPU quota).
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path: str | Path) -> str:
+    """Return the hex SHA-256 digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_cache_key(
+    person_hash: str,
+    garment_hash: str,
+    category: str,
+    backend: str,
+    params: dict,
+) -> str:
+    """Build the cache key for one try-on from its input hashes and model parameters."""
+    payload = json.dumps(
+        {
+            "person": person_hash,
+            "garment": garment_hash,
+            "category": category,
+            "backend": backend,
+            "params": params,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TryOnResultCache:
+    """
+    Two-tier result cache: a bounded in-memory LRU over a sharded directory on disk.
+
+    Disk entries use mtime as their creation time (for TTL) and atime as their
+    last use (for LRU eviction when the directory exceeds ``max_bytes``).
+    All methods are blocking and thread-safe — call them via ``asyncio.to_thread``.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int,
+        ttl_seconds: int,
+        memory_items: int,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.memory_items = memory_items
+
+        self._memory: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None  # computed lazily on first write
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ── Public API ──────────────────────────────────────────────────
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached result bytes for ``key``, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                data, created_at = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return data
+                del self._memory[key]
+
+            path = self._path_for(key)
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+
+            if now - st.st_mtime > self.ttl_seconds:
+                self._remove_file(path, st.st_size)
+                self.misses += 1
+                return None
+
+            try:
+                data = path.read_bytes()
+                # Bump atime only — mtime stays the creation time for TTL purposes
+                os.utime(path, (now, st.st_mtime))
+            except OSError as e:
+                logger.warning(f"Result cache read failed for {key[:12]}: {e}")
+                self.misses += 1
+                return None
+
+            self._remember(key, data, st.st_mtime)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store result bytes under ``key`` in both tiers."""
+        now = time.time()
+        path = self._path_for(key)
+        with self._lock:
+            self._ensure_disk_usage()
+            try:
+                old_size = path.stat().st_size
+            except FileNotFoundError:
+                old_size = 0
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.parent / f"{key}.{threading.get_ident()}.tmp"
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+
+            self._disk_bytes += len(data) - old_size
+            self._remember(key, data, now)
+
+            if self._disk_bytes > self.max_bytes:
+                self._evict_disk()
+
+    def put_file(self, key: str, source: Path) -> None:
+        """Store a result file under ``key`` on disk only, copying it without reading it into memory."""
+        path = self._path_for(key)
+        with self._lock:
+            self._ensure_disk_usage()
+            try:
+                old_size = path.stat().st_size
+            except FileNotFoundError:
+                old_size = 0
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.parent / f"{key}.{threading.get_ident()}.tmp"
+            shutil.copyfile(source, tmp)
+            size = tmp.stat().st_size
+            os.replace(tmp, path)
+
+            self._disk_bytes += size - old_size
+            self._memory.pop(key, None)
+
+            if self._disk_bytes > self.max_bytes:
+                self._evict_disk()
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            for path in self._iter_entries():
+                path.unlink(missing_ok=True)
+            self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current sizes, for the metrics endpoint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_items": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    # ── Internals ───────────────────────────────────────────────────
+
+    def _path_for(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def _iter_entries(self):
+        if not self.directory.exists():
+            return
+        for shard in self.directory.iterdir():
+            if shard.is_dir():
+                yield from (p for p in shard.iterdir() if p.is_file())
+
+    def _remember(self, key: str, data: bytes, created_at: float) -> None:
+        if self.memory_items <= 0:
+            return
+        self._memory[key] = (data, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _remove_file(self, path: Path, size: int) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return
+        if self._disk_bytes is not None:
+            self._disk_bytes -= size
+        self._memory.pop(path.name, None)
+        self.evictions += 1
+
+    def _ensure_disk_usage(self) -> None:
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(p.stat().st_size for p in self._iter_entries())
+
+    def _evict_disk(self) -> None:
+        """Drop expired entries, then least-recently-used ones down to 90% of the budget."""
+        now = time.time()
+        entries = []
+        for path in self._iter_entries():
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - st.st_mtime > self.ttl_seconds:
+                self._remove_file(path, st.st_size)
+            else:
+                entries.append((st.st_atime, st.st_size, path))
+
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in sorted(entries):
+            if self._disk_bytes <= target:
+                break
+            self._remove_file(path, size)
+
+        logger.info(f"Result cache evicted down to {self._disk_bytes} bytes")
+
+
+@lru_cache()
+def get_result_cache() -> Optional[TryOnResultCache]:
+    """Cached result-cache singleton, or None when caching is disabled."""
+    settings = get_settings()
+    if not settings.TRYON_CACHE_ENABLED:
+        return None
+    return TryOnResultCache(
+        directory=settings.TRYON_CACHE_DIR,
+        max_bytes=settings.TRYON_CACHE_MAX_BYTES,
+        ttl_seconds=settings.TRYON_CACHE_TTL_SECONDS,
+        memory_items=settings.TRYON_CACHE_MEMORY_ITEMS,
+    )
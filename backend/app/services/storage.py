@@ -0,0 +1,266 @@
+"""
+Result storage — content-addressed, sharded, deduplicated.
+
+Stored images are named by the SHA-256 of their bytes and sharded into two
+levels of prefix directories (``ab/cd/abcd….png``), which keeps directories
+small and makes identical results share one file. The ``blobs`` table counts
+how many image rows point at each file; the file is deleted with its last
+reference, either through ``delete_image`` or when the janitor evicts it.
+
+Images saved before this layout were flat ``<uuid>.png`` files. Their
+``/images/<name>`` URLs keep resolving through the ``images`` table, and
+``migrate_legacy_files`` moves them into the sharded layout.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+from app.config import get_settings
+from app.database import (
+    add_blob_reference,
+    delete_image as delete_image_row,
+    get_image_url,
+    release_blob_reference,
+    set_image_url,
+)
+from app.services.metadata_writer import get_metadata_writer
+
+logger = logging.getLogger(__name__)
+
+URL_PREFIX = "/images/"
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# ab/cd/<64 hex chars>.<ext>
+_BLOB_PATH = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]{1,5}$")
+# Pre-sharding names: <uuid hex>.<ext>
+_LEGACY_NAME = re.compile(r"^[\w-]{1,64}\.[a-z0-9]{1,5}$")
+
+# Serializes refcount changes with the file creation, moves and deletion they
+# imply. The janitor holds it while it evicts files or reconciles the tables.
+blob_lock = threading.Lock()
+
+# Serving a file re-records its access time at most this often (seconds)
+_ACCESS_RESOLUTION = 60
+
+# Blob path -> references queued in the metadata writer but not yet committed
+_pending: dict[str, int] = {}
+_pending_lock = threading.Lock()
+
+
+def blob_path_for(content_hash: str, ext: str) -> str:
+    """Relative sharded path of a blob: ``ab/cd/<hash><ext>``."""
+    return f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{ext.lower()}"
+
+
+def store_bytes(data: bytes, ext: str, meta: Optional[dict] = None) -> str:
+    """
+    Store image bytes, record an image row, and return its URL path. Blocking.
+
+    ``meta`` holds optional wardrobe fields for the row (owner, style,
+    accessories, category); size, dimensions and hash are filled in here.
+    """
+    content_hash = hashlib.sha256(data).hexdigest()
+
+    def write(dest: Path) -> None:
+        tmp = dest.with_name(f"{dest.name}.{uuid.uuid4().hex[:8]}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, dest)
+
+    return _store(content_hash, len(data), ext, write, meta)
+
+
+def store_file(source: Path, ext: str, meta: Optional[dict] = None) -> str:
+    """Store an image file, record an image row, and return its URL path. Blocking."""
+    digest = hashlib.sha256()
+    with open(source, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    def write(dest: Path) -> None:
+        tmp = dest.with_name(f"{dest.name}.{uuid.uuid4().hex[:8]}.tmp")
+        # A hard link costs no copy; fall back to copying across filesystems
+        try:
+            os.link(source, tmp)
+        except OSError:
+            shutil.copyfile(source, tmp)
+        os.replace(tmp, dest)
+
+    return _store(digest.hexdigest(), Path(source).stat().st_size, ext, write, meta)
+
+
+def blob_path_of(url_path: str) -> Optional[str]:
+    """The sharded blob path behind an image URL, or None for legacy and foreign URLs."""
+    relative = url_path[len(URL_PREFIX):] if url_path.startswith(URL_PREFIX) else url_path
+    return relative if _BLOB_PATH.match(relative) else None
+
+
+def delete_image(image_id: int) -> bool:
+    """
+    Delete an image row and release its blob; the file goes with the last
+    reference. Returns False if there is no such row. Blocking.
+    """
+    with blob_lock:
+        url = delete_image_row(image_id)
+        if url is None:
+            return False
+        # A crash between the two transactions leaves the count one high: the
+        # file outlives its rows until the janitor evicts it, never the reverse
+        _release(url)
+        return True
+
+
+def resolve(path: str) -> Optional[Path]:
+    """
+    Map the part of an image URL after ``/images/`` to a file on disk, or None.
+
+    Sharded paths map directly. Legacy flat names are served from the flat
+    file if it is still there, else looked up in the ``images`` table.
+    """
+    storage_dir = get_settings().STORAGE_DIR
+    if _BLOB_PATH.match(path):
+        candidate = storage_dir / path
+        return candidate if candidate.is_file() else None
+
+    if not _LEGACY_NAME.match(path):
+        return None
+    legacy = storage_dir / path
+    if legacy.is_file():
+        return legacy
+
+    url = get_image_url(path)
+    if url and url.startswith(URL_PREFIX) and _BLOB_PATH.match(url[len(URL_PREFIX):]):
+        candidate = storage_dir / url[len(URL_PREFIX):]
+        return candidate if candidate.is_file() else None
+    return None
+
+
+def record_access(file_path: Path) -> None:
+    """
+    Mark a stored file as just served by setting its atime; mtime is kept. Blocking.
+
+    The janitor evicts by atime, and reads alone don't keep it current on
+    noatime/relatime mounts or on Windows, so serving records it explicitly.
+    """
+    now = time.time()
+    try:
+        st = file_path.stat()
+        if now - st.st_atime >= _ACCESS_RESOLUTION:
+            os.utime(file_path, (now, st.st_mtime))
+    except OSError as e:
+        logger.debug(f"Could not record access to {file_path}: {e}")
+
+
+def migrate_legacy_files() -> int:
+    """Move flat pre-sharding files into the sharded layout. Returns how many moved. Blocking."""
+    storage_dir = get_settings().STORAGE_DIR
+    if not storage_dir.exists():
+        return 0
+
+    moved = 0
+    for entry in list(os.scandir(storage_dir)):
+        if not entry.is_file() or not _LEGACY_NAME.match(entry.name):
+            continue
+        source = Path(entry.path)
+        digest = hashlib.sha256(source.read_bytes()).hexdigest()
+        relative = blob_path_for(digest, source.suffix)
+        dest = storage_dir / relative
+
+        with blob_lock:
+            if dest.exists():
+                source.unlink()
+            else:
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(source, dest)
+            add_blob_reference(relative, digest, dest.stat().st_size)
+
+            url = URL_PREFIX + relative
+            if get_image_url(entry.name) is None:
+                width, height = _dimensions(dest)
+                get_metadata_writer().submit(entry.name, url, {
+                    "width": width, "height": height,
+                    "byte_size": dest.stat().st_size, "content_hash": digest,
+                })
+            else:
+                set_image_url(entry.name, url)
+        moved += 1
+
+    if moved:
+        logger.info(f"Moved {moved} legacy stored images into the sharded layout")
+    return moved
+
+
+# ── Internals ───────────────────────────────────────────────────────
+
+def _release(url_path: str) -> bool:
+    # Caller holds blob_lock
+    relative = blob_path_of(url_path)
+    if relative is None or release_blob_reference(relative) > 0:
+        return False
+    if has_pending_reference(relative):
+        return False  # a queued row is about to reference it again
+    (get_settings().STORAGE_DIR / relative).unlink(missing_ok=True)
+    return True
+
+
+def has_pending_reference(relative: str) -> bool:
+    """True if a stored file has a reference queued in the metadata writer but not yet committed."""
+    with _pending_lock:
+        return relative in _pending
+
+
+def _settle(relative: str) -> None:
+    # The queued row (and its blob reference) committed or failed
+    with _pending_lock:
+        _pending[relative] -= 1
+        if _pending[relative] <= 0:
+            del _pending[relative]
+
+
+def _store(content_hash: str, size: int, ext: str, write, meta: Optional[dict]) -> str:
+    relative = blob_path_for(content_hash, ext)
+    dest = get_settings().STORAGE_DIR / relative
+
+    with blob_lock:
+        # The file is written before it is referenced, so a row never points at nothing
+        if dest.exists():
+            logger.info(f"Stored image deduplicated ({content_hash[:12]})")
+        else:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            write(dest)
+        # Counted as pending until the writer commits the reference, so neither
+        # delete_image nor the janitor removes the file in between
+        with _pending_lock:
+            _pending[relative] = _pending.get(relative, 0) + 1
+
+    try:
+        url_path = URL_PREFIX + relative
+        width, height = _dimensions(dest)
+        meta = {**(meta or {}), "width": width, "height": height, "byte_size": size, "content_hash": content_hash}
+        # Each save is its own image row; identical content shares the blob. The
+        # row and the blob reference are group-committed together, and the URL is
+        # only handed out once they are — callers may list or search it right away.
+        get_metadata_writer().submit(
+            f"{uuid.uuid4().hex}{ext}", url_path, meta, blob=(relative, content_hash, size)
+        ).result()
+    finally:
+        _settle(relative)
+    return url_path
+
+
+def _dimensions(path: Path) -> tuple[Optional[int], Optional[int]]:
+    """Image width and height from the file header, or (None, None) if unreadable."""
+    try:
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None, None
@@ -2,16 +2,42 @@
 Virtual Try-On service — handles AI try-on via IDM-VTON Gradio space or mock mode.
 """
 import asyncio
+import hashlib
 import logging
+import threading
 import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Optional
 
 from app.config import get_settings
-from app.utils.image_utils import file_to_base64_data_uri
+from app.services.gradio_pool import get_client_pool
+from app.services.local_tryon import render_preview
+from app.services.remote_executor import RemoteCallCancelled, RemoteCallExecutor
+from app.services.result_cache import file_sha256, get_result_cache, make_cache_key
+from app.services.upload_cache import get_upload_cache, is_file_gone_error, upload_file
+from app.utils.image_utils import (
+    bytes_to_base64_data_uri,
+    file_mime_type,
+    parse_size,
+    prepare_for_upload,
+    sniff_image_mime,
+)
 from app.utils.hf_errors import HFTokenError
+from app.utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Try-on engines a caller can pick: remote spaces, or the instant local CPU preview
+TRYON_ENGINES = ("remote", "local")
+
+# Identical remote try-ons in flight at the same time share one space call
+_inflight = SingleFlight()
+
+# How often a worker thread checks whether its caller gave up on a remote job
+_JOB_POLL_SECONDS = 0.5
+
 # Error substrings that indicate HF token / rate-limit issues
 _HF_AUTH_ERRORS = [
     "401",
@@ -34,18 +60,145 @@ _HF_RATE_ERRORS = [
 ]
 
 
+# Remote backends and the base model parameters sent to each. Quality-tier presets
+# from Settings are layered on top; the merged parameters are part of the result-cache key.
+IDM_VTON_SPACE = "yisol/IDM-VTON"
+OOTD_SPACE = "levihsu/OOTDiffusion"
+
+IDM_VTON_PARAMS = {
+    "garment_des": "shirt",
+    "is_checked": True,
+    "is_checked_crop": False,
+    "denoise_steps": 30,
+    "seed": 42,
+}
+
+OOTD_PARAMS = {
+    "n_samples": 1,
+    "n_steps": 20,
+    "image_scale": 2.0,
+    "seed": -1,
+}
+
+
+@dataclass(frozen=True)
+class TryOnResult:
+    """
+    A try-on output image: a file on disk or bytes in memory, plus its MIME type.
+
+    Results are passed around by reference and only base64-encoded for
+    API clients that explicitly ask for inline data.
+    """
+
+    source: Path | bytes
+    mime_type: str
+
+    def read_bytes(self) -> bytes:
+        """Return the image bytes (blocking if the result is a file)."""
+        if isinstance(self.source, bytes):
+            return self.source
+        return Path(self.source).read_bytes()
+
+    def to_data_uri(self) -> str:
+        """Return the image as a base64 data URI (blocking if the result is a file)."""
+        return bytes_to_base64_data_uri(self.read_bytes(), self.mime_type)
+
+
 def _is_hf_token_error(error: Exception) -> bool:
     """Check if the error is related to HF token auth or rate limiting."""
     msg = str(error).lower()
     return any(s in msg for s in _HF_AUTH_ERRORS + _HF_RATE_ERRORS)
 
 
+def quality_tiers() -> list[str]:
+    """Quality tiers configured for every remote backend."""
+    settings = get_settings()
+    return [q for q in settings.IDM_VTON_PRESETS if q in settings.OOTD_PRESETS]
+
+
+def _backend_for(category: str, quality: str | None = None) -> tuple[str, dict]:
+    """Return the (space, model parameters) that handle a clothing category at a quality tier."""
+    settings = get_settings()
+    quality = quality or settings.TRYON_DEFAULT_QUALITY
+    if category in ("lower_body", "dresses"):
+        space, params, presets = OOTD_SPACE, OOTD_PARAMS, settings.OOTD_PRESETS
+    else:
+        space, params, presets = IDM_VTON_SPACE, IDM_VTON_PARAMS, settings.IDM_VTON_PRESETS
+    if quality not in presets:
+        raise ValueError(f"Unknown quality tier '{quality}' for {space}")
+    return space, {**params, **presets[quality]}
+
+
+def _prepare_input(path: Path, space: str) -> Path:
+    """Downsize and re-encode an input to the space's working resolution before upload."""
+    settings = get_settings()
+    size = settings.OOTD_UPLOAD_SIZE if space == OOTD_SPACE else settings.IDM_VTON_UPLOAD_SIZE
+    try:
+        prepared = prepare_for_upload(
+            path,
+            parse_size(size),
+            fmt=settings.TRYON_UPLOAD_FORMAT,
+            quality=settings.TRYON_UPLOAD_QUALITY,
+        )
+    except Exception as e:
+        logger.warning(f"Could not normalize {path.name} for upload, sending as-is: {e}")
+        return path
+
+    if prepared != path:
+        logger.info(
+            f"Normalized {path.name} for {space}: "
+            f"{path.stat().st_size} -> {prepared.stat().st_size} bytes"
+        )
+    return prepared
+
+
+_executor: Optional[RemoteCallExecutor] = None
+
+
+def get_remote_executor() -> RemoteCallExecutor:
+    """Dedicated executor for remote try-on calls, with one concurrency limit per space."""
+    global _executor
+    if _executor is None:
+        settings = get_settings()
+        _executor = RemoteCallExecutor(
+            max_workers=settings.TRYON_EXECUTOR_WORKERS,
+            limits={
+                IDM_VTON_SPACE: settings.IDM_VTON_MAX_CONCURRENCY,
+                OOTD_SPACE: settings.OOTD_MAX_CONCURRENCY,
+            },
+        )
+    return _executor
+
+
+def shutdown_remote_executor() -> None:
+    """Shut down the remote-call executor; the next call creates a fresh one."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+def _await_job(job: Any, cancel_event: threading.Event) -> Any:
+    """Wait for a gradio Job, cancelling it remotely if the caller gives up."""
+    while True:
+        try:
+            return job.result(timeout=_JOB_POLL_SECONDS)
+        except FuturesTimeoutError:
+            if cancel_event.is_set():
+                job.cancel()
+                raise RemoteCallCancelled("Remote try-on cancelled by caller")
+
+
 async def process_tryon(
     person_path: Path,
     clothing_path: Path,
     hf_token: str | None = None,
     category: str = "clothing",
-) -> str:
+    person_hash: str | None = None,
+    garment_hash: str | None = None,
+    engine: str | None = None,
+    quality: str | None = None,
+) -> TryOnResult:
     """
     Run the virtual try-on pipeline.
 
@@ -53,26 +206,117 @@ async def process_tryon(
         person_path: Path to the person image on disk.
         clothing_path: Path to the clothing image on disk.
         hf_token: Optional user-provided HuggingFace token (takes priority over server token).
+        category: Clothing category — selects the remote backend.
+        person_hash: SHA-256 of the person image, if the caller already has it.
+        garment_hash: SHA-256 of the garment image, if the caller already has it.
+        engine: "remote" or "local" — defaults to TRYON_ENGINE. The local engine
+            renders a rough preview on the CPU, even in mock mode.
+        quality: Remote quality tier ("fast", "standard", "high") — defaults to
+            TRYON_DEFAULT_QUALITY. Its parameters are part of the cache key.
+
+    Remote results are cached by input content and model parameters, so a
+    repeat try-on is served from the result cache without a remote call.
+    Concurrent requests with the same fingerprint and token share a single
+    remote call.
 
     Returns:
-        Base64 data URI of the result image.
+        The result image — a file or bytes, never base64.
     """
     settings = get_settings()
+    engine = engine or settings.TRYON_ENGINE
+
+    if engine == "local":
+        return await _local_tryon(person_path, clothing_path, category)
 
     if settings.USE_MOCK_AI:
         return await _mock_tryon(clothing_path)
-    else:
-        return await _real_tryon(person_path, clothing_path, hf_token=hf_token, category=category)
 
+    space, params = _backend_for(category, quality)
+    if person_hash is None:
+        person_hash = await asyncio.to_thread(file_sha256, person_path)
+    if garment_hash is None:
+        garment_hash = await asyncio.to_thread(file_sha256, clothing_path)
+    key = make_cache_key(person_hash, garment_hash, category, space, params)
+
+    cache = get_result_cache()
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            logger.info(f"Try-on result cache hit ({key[:12]}) — skipping {space}")
+            return TryOnResult(cached, sniff_image_mime(cached[:12]))
+
+    async def _fetch() -> TryOnResult:
+        output_path = await _real_tryon(
+            person_path,
+            clothing_path,
+            hf_token=hf_token,
+            category=category,
+            person_hash=person_hash,
+            garment_hash=garment_hash,
+            quality=quality,
+        )
+        output_path = Path(output_path)
+        mime_type = await asyncio.to_thread(file_mime_type, output_path)
+        if cache is not None:
+            await asyncio.to_thread(cache.put_file, key, output_path)
+        return TryOnResult(output_path, mime_type)
+
+    # Callers only share a call made with the same token, so one that brings
+    # its own token never inherits another call's auth or rate-limit error
+    token = hf_token or settings.HF_TOKEN or ""
+    token_digest = hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+    return await _inflight.do(f"{key}:{token_digest}", _fetch)
 
-async def _mock_tryon(clothing_path: Path) -> str:
+
+async def prewarm_clients() -> None:
+    """Build pooled clients for both remote spaces with the server token, in the background."""
+    settings = get_settings()
+    pool = get_client_pool()
+    token = settings.HF_TOKEN or None
+
+    for space in (IDM_VTON_SPACE, OOTD_SPACE):
+        try:
+            await asyncio.to_thread(pool.warm, space, token)
+        except Exception as e:
+            logger.warning(f"Could not pre-warm gradio client for {space}: {e}")
+
+
+def get_inflight_stats() -> dict:
+    """Single-flight counters for the metrics endpoint."""
+    return _inflight.stats()
+
+
+async def _mock_tryon(clothing_path: Path) -> TryOnResult:
     """
     Mock try-on: simulate processing delay, return the clothing image as the result.
     Useful for local development without GPU.
     """
     logger.info("Running in MOCK MODE — returning clothing image as result")
     await asyncio.sleep(1)  # Simulate brief processing
-    return file_to_base64_data_uri(clothing_path)
+    mime_type = await asyncio.to_thread(file_mime_type, clothing_path)
+    return TryOnResult(Path(clothing_path), mime_type)
+
+
+async def _local_tryon(person_path: Path, clothing_path: Path, category: str) -> TryOnResult:
+    """
+    Local try-on: composite the garment onto the person on the CPU.
+    A rough but instant preview — no network, deterministic output.
+    """
+    start = time.monotonic()
+    data = await asyncio.to_thread(render_preview, person_path, clothing_path, category)
+    logger.info(f"Local preview rendered in {time.monotonic() - start:.2f}s")
+    return TryOnResult(data, "image/png")
+
+
+def _file_reference(client: Any, space: str, path: Path, content_hash: str | None) -> Any:
+    """Reuse this content's earlier upload to ``space`` if it is still live, else upload it."""
+    from gradio_client import handle_file
+
+    if content_hash is None:
+        return handle_file(str(path))
+
+    # Batch workers sending the same person image wait for one upload
+    return get_upload_cache().get_or_upload(content_hash, space, lambda: upload_file(client, str(path)))
 
 
 async def _real_tryon(
@@ -80,18 +324,61 @@ async def _real_tryon(
     clothing_path: Path,
     hf_token: str | None = None,
     category: str = "clothing",
+    person_hash: str | None = None,
+    garment_hash: str | None = None,
+    quality: str | None = None,
 ) -> str:
     """
     Real try-on: call the IDM-VTON Gradio space on HuggingFace.
     Uses: user-provided token > server .env token > no token (priority order).
+
+    When content hashes are given, inputs already uploaded to the space are
+    referenced instead of uploaded again; if the space has dropped them, the
+    call is retried once with fresh uploads.
+
+    Returns:
+        Local path of the result image downloaded by gradio_client.
     """
     logger.info("Calling IDM-VTON Gradio space for real try-on...")
 
-    TIMEOUT_SECONDS = 120
+    TIMEOUT_SECONDS = get_settings().TRYON_TIMEOUT_SECONDS
+    space, params = _backend_for(category, quality)
 
-    def _call_gradio():
-        from gradio_client import Client, handle_file
+    # The spaces downsample to ~768x1024 anyway — don't upload full phone photos
+    person_path, clothing_path = await asyncio.gather(
+        asyncio.to_thread(_prepare_input, Path(person_path), space),
+        asyncio.to_thread(_prepare_input, Path(clothing_path), space),
+    )
 
+    def _submit(client: Any, cancel_event: threading.Event, p_hash: str | None, g_hash: str | None):
+        person_ref = _file_reference(client, space, person_path, p_hash)
+        garment_ref = _file_reference(client, space, clothing_path, g_hash)
+
+        if space == OOTD_SPACE:
+            logger.info(f"Routing to OOTDiffusion for category: {category}")
+            job = client.submit(
+                vton_img=person_ref,
+                garm_img=garment_ref,
+                category="Lower-body" if category == "lower_body" else "Dress",
+                **params,
+                api_name="/process_dc"
+            )
+            return _await_job(job, cancel_event)[0]["image"]
+
+        logger.info("Routing to IDM-VTON for upper body try-on")
+        job = client.submit(
+            dict={
+                "background": person_ref,
+                "layers": [],
+                "composite": None,
+            },
+            garm_img=garment_ref,
+            **params,
+            api_name="/tryon",
+        )
+        return _await_job(job, cancel_event)[0]
+
+    def _call_gradio(cancel_event: threading.Event):
         settings = get_settings()
 
         # Token priority: user-provided > server config > none
@@ -100,42 +387,20 @@ async def _real_tryon(
         logger.info(f"Using HF token from: {token_source}")
 
         try:
-            if category in ("lower_body", "dresses"):
-                logger.info(f"Routing to OOTDiffusion for category: {category}")
-                ootd_cat = "Lower-body" if category == "lower_body" else "Dress"
-                client = Client("levihsu/OOTDiffusion", token=token) if token else Client("levihsu/OOTDiffusion")
-                
-                result = client.predict(
-                    vton_img=handle_file(str(person_path)),
-                    garm_img=handle_file(str(clothing_path)),
-                    category=ootd_cat,
-                    n_samples=1,
-                    n_steps=20,
-                    image_scale=2.0,
-                    seed=-1,
-                    api_name="/process_dc"
-                )
-                output_image_path = result[0]["image"]
-            else:
-                logger.info("Routing to IDM-VTON for upper body try-on")
-                client = Client("yisol/IDM-VTON", token=token) if token else Client("yisol/IDM-VTON")
-                
-                result = client.predict(
-                    dict={
-                        "background": handle_file(str(person_path)),
-                        "layers": [],
-                        "composite": None,
-                    },
-                    garm_img=handle_file(str(clothing_path)),
-                    garment_des="shirt",
-                    is_checked=True,
-                    is_checked_crop=False,
-                    denoise_steps=30,
-                    seed=42,
-                    api_name="/tryon",
-                )
-                output_image_path = result[0]
-                
+            with get_client_pool().client(space, token) as client:
+                try:
+                    output_image_path = _submit(client, cancel_event, person_hash, garment_hash)
+                except Exception as e:
+                    if not is_file_gone_error(e) or (person_hash is None and garment_hash is None):
+                        raise
+                    logger.info(f"{space} dropped a reused upload — retrying with fresh uploads")
+                    for content_hash in (person_hash, garment_hash):
+                        if content_hash is not None:
+                            get_upload_cache().invalidate(content_hash, space)
+                    output_image_path = _submit(client, cancel_event, person_hash, garment_hash)
+
+        except RemoteCallCancelled:
+            raise
         except Exception as e:
             if _is_hf_token_error(e):
                 raise HFTokenError(
@@ -149,12 +414,8 @@ async def _real_tryon(
 
         return output_image_path
 
-    loop = asyncio.get_event_loop()
     try:
-        output_path = await asyncio.wait_for(
-            loop.run_in_executor(None, _call_gradio),
-            timeout=TIMEOUT_SECONDS,
-        )
+        output_path = await get_remote_executor().run(space, _call_gradio, timeout=TIMEOUT_SECONDS)
     except asyncio.TimeoutError:
         raise TimeoutError(
             f"IDM-VTON did not respond within {TIMEOUT_SECONDS}s. "
@@ -178,4 +439,4 @@ async def _real_tryon(
         )
 
     logger.info(f"IDM-VTON returned result at: {output_path}")
-    return file_to_base64_data_uri(output_path)
+    return output_path
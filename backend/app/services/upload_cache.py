@@ -0,0 +1,165 @@
+"""
+Upload-handle cache — remembers files already uploaded to a gradio space.
+
+A user cycling through garments sends the same person image every time.
+Once it has been uploaded, the space-side file reference is reused until
+it expires, instead of uploading the same bytes again on every call.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Error substrings that mean the space no longer has an uploaded file
+_FILE_GONE_ERRORS = [
+    "no such file",
+    "file not found",
+    "filenotfounderror",
+    "does not exist",
+]
+
+
+def is_file_gone_error(error: Exception) -> bool:
+    """Check if a remote error says a previously uploaded file is gone."""
+    msg = str(error).lower()
+    return any(s in msg for s in _FILE_GONE_ERRORS)
+
+
+def upload_file(client: Any, path: str) -> dict:
+    """
+    Upload a local file to the client's space and return a reference to it.
+
+    The reference deliberately has no ``meta`` key: gradio_client only
+    re-uploads dicts tagged as ``gradio.FileData``, so this one is sent as-is
+    and the space reads the file it already has.
+    """
+    import httpx
+
+    name = Path(path).name
+    with open(path, "rb") as f:
+        response = httpx.post(
+            client.upload_url,
+            headers=client.headers,
+            cookies=client.cookies,
+            verify=client.ssl_verify,
+            files=[("files", (name, f))],
+            **client.httpx_kwargs,
+        )
+    response.raise_for_status()
+    return {"path": response.json()[0], "orig_name": name}
+
+
+class UploadHandleCache:
+    """Thread-safe LRU of space-side file references keyed by (content hash, space)."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], tuple[dict, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per (hash, space) being uploaded, with how many threads hold or wait on it
+        self._uploading: dict[tuple[str, str], tuple[threading.Lock, int]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.coalesced = 0
+
+    def get(self, content_hash: str, space: str) -> Optional[dict]:
+        """Return a live reference for this content on ``space``, or None."""
+        with self._lock:
+            handle = self._lookup((content_hash, space))
+            if handle is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return handle
+
+    def get_or_upload(self, content_hash: str, space: str, upload: Callable[[], dict]) -> dict:
+        """
+        Return a live reference for this content on ``space``, calling ``upload`` on a miss.
+
+        Concurrent misses for the same content and space wait for the first
+        upload instead of each sending the same bytes. Blocking.
+        """
+        handle = self.get(content_hash, space)
+        if handle is not None:
+            return handle
+
+        key = (content_hash, space)
+        with self._lock:
+            lock, users = self._uploading.get(key, (threading.Lock(), 0))
+            self._uploading[key] = (lock, users + 1)
+        try:
+            with lock:
+                with self._lock:
+                    handle = self._lookup(key)
+                    if handle is not None:
+                        self.coalesced += 1
+                        return handle
+                handle = upload()
+                self.put(content_hash, space, handle)
+                return handle
+        finally:
+            with self._lock:
+                lock, users = self._uploading[key]
+                if users == 1:
+                    del self._uploading[key]
+                else:
+                    self._uploading[key] = (lock, users - 1)
+
+    def put(self, content_hash: str, space: str, handle: dict) -> None:
+        """Remember the reference returned by an upload."""
+        with self._lock:
+            self._entries[(content_hash, space)] = (handle, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end((content_hash, space))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, content_hash: str, space: str) -> None:
+        """Forget a reference the space has dropped."""
+        with self._lock:
+            if self._entries.pop((content_hash, space), None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        """Counters for the metrics endpoint."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "coalesced": self.coalesced,
+            }
+
+    def _lookup(self, key: tuple[str, str]) -> Optional[dict]:
+        # Caller holds self._lock
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            self._entries.move_to_end(key)
+            return entry[0]
+        if entry is not None:
+            del self._entries[key]
+        return None
+
+
+_cache: Optional[UploadHandleCache] = None
+
+
+def get_upload_cache() -> UploadHandleCache:
+    """Process-wide upload-handle cache singleton."""
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        _cache = UploadHandleCache(
+            ttl_seconds=settings.UPLOAD_HANDLE_TTL_SECONDS,
+            max_entries=settings.UPLOAD_HANDLE_MAX_ENTRIES,
+        )
+    return _cache
@@ -1,19 +1,54 @@
 """
 Image utility helpers for file I/O and base64 encoding.
 """
+import asyncio
 import base64
-import shutil
+import hashlib
+import io
+import os
 import uuid
+from dataclasses import dataclass
 from pathlib import Path
+from typing import BinaryIO
 
 from fastapi import UploadFile
+from PIL import Image, ImageOps
 
 from app.config import get_settings
+from app.utils.upload_errors import UploadRejectedError
 
 
-async def save_upload_to_temp(upload: UploadFile, prefix: str = "") -> Path:
+@dataclass(frozen=True)
+class ImageInfo:
+    """Format, dimensions and mode of an image, read from its header only."""
+
+    format: str
+    width: int
+    height: int
+    mode: str
+
+
+@dataclass(frozen=True)
+class IngestedUpload:
+    """An upload written to the temp directory, with the SHA-256 computed on the way in."""
+
+    path: Path
+    sha256: str
+    size: int
+    info: ImageInfo
+
+
+async def ingest_upload(upload: UploadFile, prefix: str = "") -> IngestedUpload:
     """
-    Save an uploaded file to the temp directory and return its path.
+    Stream an uploaded file to the temp directory in chunks, off the event loop.
+
+    The image header is validated before this returns, so bad inputs are
+    refused in milliseconds instead of after a remote round-trip.
+
+    Raises:
+        UploadRejectedError: (413) If the file exceeds UPLOAD_MAX_BYTES or its
+            header declares more than UPLOAD_MAX_PIXELS pixels; (415/400/422) if
+            it fails ``inspect_image``.
     """
     settings = get_settings()
     settings.TEMP_DIR.mkdir(parents=True, exist_ok=True)
@@ -23,20 +58,190 @@ async def save_upload_to_temp(upload: UploadFile, prefix: str = "") -> Path:
     filename = f"{prefix}_{file_id}{ext}" if prefix else f"{file_id}{ext}"
     dest = settings.TEMP_DIR / filename
 
-    with open(dest, "wb") as f:
-        shutil.copyfileobj(upload.file, f)
+    def _ingest() -> IngestedUpload:
+        sha256, size = _stream_to_file(
+            upload.file,
+            dest,
+            settings.UPLOAD_MAX_BYTES,
+            settings.UPLOAD_MAX_PIXELS,
+            settings.UPLOAD_CHUNK_BYTES,
+        )
+        try:
+            info = inspect_image(dest)
+        except UploadRejectedError:
+            dest.unlink(missing_ok=True)
+            raise
+        return IngestedUpload(dest, sha256, size, info)
 
-    return dest
+    return await asyncio.to_thread(_ingest)
 
 
-def file_to_base64_data_uri(file_path: str | Path, mime_type: str = "image/png") -> str:
+async def save_upload_to_temp(upload: UploadFile, prefix: str = "") -> Path:
     """
-    Read a file and return a base64-encoded data URI string.
+    Save an uploaded file to the temp directory and return its path.
     """
-    with open(file_path, "rb") as f:
-        img_data = f.read()
-    b64 = base64.b64encode(img_data).decode("utf-8")
-    return f"data:{mime_type};base64,{b64}"
+    return (await ingest_upload(upload, prefix)).path
+
+
+def inspect_image(path: Path) -> ImageInfo:
+    """
+    Validate an image from its magic bytes and header, without decoding pixel data.
+
+    Raises:
+        UploadRejectedError: not_an_image / unsupported_format (415),
+            corrupt_image (400), image_too_large (413) or image_too_small (422).
+    """
+    settings = get_settings()
+    allowed = settings.upload_format_list
+
+    with open(path, "rb") as f:
+        head = f.read(16)
+    sniffed = _sniff_image_format(head)
+    if sniffed is None:
+        raise UploadRejectedError(
+            "File is not an image. Upload a JPEG, PNG or WebP photo.",
+            error_code="not_an_image",
+            status_code=415,
+        )
+    if sniffed == "image/heif":
+        raise UploadRejectedError(
+            f"HEIC/AVIF images are not supported. Upload one of: {', '.join(allowed)}.",
+            error_code="unsupported_format",
+            status_code=415,
+        )
+
+    try:
+        # Image.open only parses the header; pixel data is never loaded here
+        with Image.open(path) as img:
+            info = ImageInfo(img.format or "", img.width, img.height, img.mode)
+    except Image.DecompressionBombError:
+        raise UploadRejectedError(
+            f"Image is too large; the limit is {settings.UPLOAD_MAX_PIXELS:,} pixels.",
+            error_code="image_too_large",
+            status_code=413,
+        )
+    except Exception:
+        raise UploadRejectedError(
+            "Image file is corrupt or truncated.",
+            error_code="corrupt_image",
+            status_code=400,
+        )
+
+    if info.format not in allowed:
+        raise UploadRejectedError(
+            f"{info.format or 'This'} images are not supported. Upload one of: {', '.join(allowed)}.",
+            error_code="unsupported_format",
+            status_code=415,
+        )
+    # The streaming check only sees the first chunk; a header pushed past it
+    # (e.g. by a large ICC profile) is caught here
+    if info.width * info.height > settings.UPLOAD_MAX_PIXELS:
+        raise UploadRejectedError(
+            f"Image is {info.width}x{info.height}; the limit is {settings.UPLOAD_MAX_PIXELS:,} pixels.",
+            error_code="image_too_large",
+            status_code=413,
+        )
+    if min(info.width, info.height) < settings.UPLOAD_MIN_SIDE:
+        raise UploadRejectedError(
+            f"Image is {info.width}x{info.height}; each side must be at least "
+            f"{settings.UPLOAD_MIN_SIDE} pixels.",
+            error_code="image_too_small",
+            status_code=422,
+        )
+    return info
+
+
+def _stream_to_file(
+    src: BinaryIO, dest: Path, max_bytes: int, max_pixels: int, chunk_size: int
+) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(dest, "wb") as f:
+            while chunk := src.read(chunk_size):
+                if size == 0:
+                    # The first chunk holds the header — refuse huge images before copying the rest
+                    _check_pixel_count(chunk, max_pixels)
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejectedError(
+                        f"Image is larger than the {max_bytes // (1024 * 1024)} MB limit.",
+                        error_code="file_too_large",
+                        status_code=413,
+                    )
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+    return digest.hexdigest(), size
+
+
+def _check_pixel_count(head: bytes, max_pixels: int) -> None:
+    try:
+        with Image.open(io.BytesIO(head)) as img:
+            width, height = img.size
+    except Image.DecompressionBombError:
+        width = height = None  # Far past PIL's own limit
+    except Exception:
+        return  # Header not parseable from this chunk — nothing to enforce here
+    if width is None or width * height > max_pixels:
+        size = f"{width}x{height}" if width else "too large"
+        raise UploadRejectedError(
+            f"Image is {size}; the limit is {max_pixels:,} pixels.",
+            error_code="image_too_large",
+            status_code=413,
+        )
+
+
+def parse_size(value: str) -> tuple[int, int]:
+    """Parse a "WIDTHxHEIGHT" setting such as "768x1024"."""
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height)
+
+
+def prepare_for_upload(
+    src: Path,
+    max_size: tuple[int, int],
+    fmt: str = "JPEG",
+    quality: int = 90,
+) -> Path:
+    """
+    Normalize an image before it is uploaded to a remote model.
+
+    Applies the EXIF orientation, downsizes to fit within ``max_size`` (never
+    upscales) and re-encodes as a compact JPEG/WebP next to the source file.
+    Returns ``src`` unchanged when it is already small, upright and compact.
+    A prepared file from an earlier call (e.g. the person image of a batch)
+    is reused instead of being encoded again.
+    """
+    fmt = fmt.upper()
+    ext = ".webp" if fmt == "WEBP" else ".jpg"
+    dest = src.with_name(f"{src.stem}_{max_size[0]}x{max_size[1]}{ext}")
+    if dest.exists():
+        return dest
+
+    with Image.open(src) as img:
+        orientation = img.getexif().get(0x0112, 1)  # EXIF Orientation tag
+        fits = img.width <= max_size[0] and img.height <= max_size[1]
+        if fits and orientation == 1 and img.format == fmt:
+            return src
+
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail(max_size, Image.LANCZOS)
+
+        if fmt == "JPEG" and img.mode != "RGB":
+            # JPEG has no alpha — flatten transparent garments onto white
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.getchannel("A"))
+
+        # Write-then-rename so concurrent callers never see a partial file
+        tmp = dest.with_name(f"{dest.stem}.{uuid.uuid4().hex[:8]}.tmp")
+        img.save(tmp, format=fmt, quality=quality, optimize=True)
+        os.replace(tmp, dest)
+
+    return dest
 
 
 def bytes_to_base64_data_uri(data: bytes, mime_type: str = "image/png") -> str:
@@ -47,54 +252,69 @@ def bytes_to_base64_data_uri(data: bytes, mime_type: str = "image/png") -> str:
     return f"data:{mime_type};base64,{b64}"
 
 
-def save_base64_to_storage(base64_str: str) -> str:
+# Leading bytes of common image formats
+_IMAGE_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"RIFF", "image/webp"),  # followed by a size and b"WEBP"
+    (b"GIF8", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+]
+
+_MIME_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+}
+
+
+def sniff_image_mime(head: bytes) -> str:
     """
-    Decode a base64 string, save it to storage, record in DB, and return the URL path.
-    Example return: "/images/ab12cd34.png"
+    Guess an image's MIME type from its first bytes. Defaults to PNG.
     """
-    if "," in base64_str:
-        header, encoded = base64_str.split(",", 1)
-        # extracting extension from header "data:image/png;base64"
-        ext = ".png"
-        if "image/jpeg" in header:
-            ext = ".jpg"
-        elif "image/webp" in header:
-            ext = ".webp"
-    else:
-        encoded = base64_str
-        ext = ".png"
+    return _sniff_image_format(head) or "image/png"
 
-    data = base64.b64decode(encoded)
-    return _save_bytes_to_storage(data, ext)
 
+def _sniff_image_format(head: bytes) -> str | None:
+    if head[4:12] in (b"ftypheic", b"ftypheix", b"ftypmif1", b"ftypavif"):
+        return "image/heif"
+    for signature, mime_type in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            if mime_type == "image/webp" and head[8:12] != b"WEBP":
+                continue
+            return mime_type
+    return None
 
-def save_image_to_storage(file_path: Path) -> str:
+
+def file_mime_type(file_path: str | Path) -> str:
     """
-    Read an image file from disk, save it to persistent storage, record in DB, and return URL.
+    Guess an image file's MIME type from its header (blocking — reads 12 bytes).
     """
     with open(file_path, "rb") as f:
-        data = f.read()
-    ext = file_path.suffix or ".png"
-    return _save_bytes_to_storage(data, ext)
-
+        return sniff_image_mime(f.read(12))
 
-def _save_bytes_to_storage(data: bytes, ext: str) -> str:
-    from app.database import save_image_metadata
 
-    settings = get_settings()
-    settings.STORAGE_DIR.mkdir(parents=True, exist_ok=True)
-
-    file_id = uuid.uuid4().hex
-    filename = f"{file_id}{ext}"
-    dest = settings.STORAGE_DIR / filename
+def save_result_to_storage(source: Path | bytes, mime_type: str, meta: dict | None = None) -> str:
+    """
+    Save a result image — a file on disk or bytes in memory — to storage,
+    record it in the DB with optional wardrobe ``meta``, and return the URL
+    path. Blocking: call it off the event loop.
+    """
+    from app.services.storage import store_bytes, store_file
 
-    with open(dest, "wb") as f:
-        f.write(data)
+    ext = _MIME_EXTENSIONS.get(mime_type, ".png")
+    if isinstance(source, bytes):
+        return store_bytes(source, ext, meta)
+    return store_file(Path(source), ext, meta)
 
-    # Relative URL path that will be served by StaticFiles
-    url_path = f"/images/{filename}"
 
-    # Save to SQLite
-    save_image_metadata(filename, url_path)
+def save_image_to_storage(file_path: Path) -> str:
+    """
+    Save an image file from disk to persistent storage, record in DB, and return URL.
+    """
+    from app.services.storage import store_file
 
-    return url_path
+    return store_file(file_path, file_path.suffix or ".png")
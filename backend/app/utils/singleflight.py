@@ -0,0 +1,51 @@
+"""
+Single-flight coalescing for concurrent async calls that share a key.
+"""
+import asyncio
+from functools import partial
+from typing import Any, Awaitable, Callable
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time; concurrent callers share its outcome.
+
+    The shared call runs in its own task and every caller awaits it through
+    ``asyncio.shield``, so cancelling one caller never cancels the call the
+    others are waiting on. Results and exceptions are delivered to all callers.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``fn()`` — or the identical call already in flight for ``key``."""
+        loop = asyncio.get_running_loop()
+        task = self._calls.get(key)
+
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(partial(self._forget, key))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        """Counters for the metrics endpoint."""
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved — every waiter may have been cancelled
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,21 @@
+"""
+Server-Sent Events helpers.
+"""
+import json
+from typing import Any, Optional
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# Headers that stop proxies (nginx, Render) from buffering the stream
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+SSE_KEEPALIVE = ": keep-alive\n\n"
+
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """Encode one SSE message with a JSON payload."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
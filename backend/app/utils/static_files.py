@@ -0,0 +1,236 @@
+"""
+Cache-friendly static file serving for the frontend.
+
+Files get content-hash ETags (so a conditional request is a cheap 304), and
+compressible assets are served from gzip / brotli variants built once by
+``precompress`` instead of being sent raw on every page load. Only web asset
+types are served — the repo root also holds the backend, docs and dotfiles.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import stat
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # optional — gzip only without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Web asset types the frontend mount will serve
+SERVED_SUFFIXES = {
+    ".html", ".js", ".css", ".json", ".svg", ".ico", ".txt", ".webmanifest",
+    ".png", ".jpg", ".jpeg", ".webp", ".avif", ".gif",
+    ".woff", ".woff2", ".ttf",
+}
+
+# Text types worth compressing; images and fonts are already compressed
+COMPRESSIBLE_SUFFIXES = {".html", ".js", ".css", ".json", ".svg", ".txt", ".webmanifest"}
+
+# Skip tiny files — the encoding headers would outweigh the savings
+_MIN_COMPRESS_BYTES = 1024
+
+
+@dataclass
+class StaticEntry:
+    """Precomputed content ETag and compressed variants of one static file."""
+    etag: str
+    size: int
+    mtime: float
+    variants: dict[str, Path] = field(default_factory=dict)  # encoding -> file
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    ``StaticFiles`` with content-hash ETags, precompressed variants and a suffix whitelist.
+
+    Files changed since ``precompress`` ran (or added after it) fall back to
+    Starlette's default mtime/size ETag and are served uncompressed.
+    """
+
+    def __init__(
+        self,
+        *,
+        directory: str | Path,
+        compressed_dir: str | Path,
+        exclude_dirs: tuple[str, ...] = (),
+        max_age: int = 3600,
+        html: bool = False,
+    ):
+        super().__init__(directory=directory, html=html)
+        self.root = Path(directory)
+        self.compressed_dir = Path(compressed_dir)
+        self.exclude_dirs = set(exclude_dirs)
+        self.max_age = max_age
+        self._entries: dict[str, StaticEntry] = {}
+        self._bytes_saved = 0
+
+    def precompress(self) -> int:
+        """Hash every served file and write compressed variants of text assets. Blocking."""
+        self.compressed_dir.mkdir(parents=True, exist_ok=True)
+        entries: dict[str, StaticEntry] = {}
+        saved = 0
+
+        for path in self._iter_served_files():
+            data = path.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()[:32]
+            st = path.stat()
+            entry = StaticEntry(etag=digest, size=st.st_size, mtime=st.st_mtime)
+
+            if path.suffix.lower() in COMPRESSIBLE_SUFFIXES and len(data) >= _MIN_COMPRESS_BYTES:
+                for encoding, compress in _encoders():
+                    variant = self.compressed_dir / f"{digest}.{encoding}"
+                    if not variant.exists():
+                        tmp = variant.with_name(f"{variant.name}.{os.getpid()}.tmp")
+                        tmp.write_bytes(compress(data))
+                        os.replace(tmp, variant)
+                    size = variant.stat().st_size
+                    if size < len(data):
+                        entry.variants[encoding] = variant
+                        saved += len(data) - size
+
+            entries[path.relative_to(self.root).as_posix()] = entry
+
+        self._entries = entries
+        self._bytes_saved = saved
+        logger.info(
+            f"Precompressed static assets: {len(entries)} files, "
+            f"{sum(len(e.variants) for e in entries.values())} variants"
+        )
+        return len(entries)
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self._entries),
+            "compressed_variants": sum(len(e.variants) for e in self._entries.values()),
+            "bytes_saved_per_full_load": self._bytes_saved,
+            "brotli": brotli is not None,
+        }
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if not self._is_served(path):
+            raise HTTPException(status_code=404)
+        if self.html and Path(path).suffix == "":
+            # A suffix-less path is only a directory URL — a bare file like TODO is never served
+            _, index_stat = await anyio.to_thread.run_sync(self.lookup_path, os.path.join(path, "index.html"))
+            if index_stat is None or not stat.S_ISREG(index_stat.st_mode):
+                raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+    def file_response(
+        self,
+        full_path: str | os.PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        entry = self._entry_for(Path(full_path), stat_result)
+        if entry is None:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            response.headers.setdefault("cache-control", self._cache_control(full_path))
+            return response
+
+        encoding = _pick_encoding(request_headers.get("accept-encoding", ""), entry.variants)
+        etag = f'"{entry.etag}-{encoding}"' if encoding else f'"{entry.etag}"'
+        headers = {"etag": etag, "cache-control": self._cache_control(full_path)}
+        if entry.variants:
+            headers["vary"] = "Accept-Encoding"
+
+        if status_code == 200 and etag_matches(request_headers.get("if-none-match"), etag):
+            return NotModifiedResponse(Headers(headers))
+
+        media_type = FileResponse(full_path).media_type
+        if encoding is None:
+            return FileResponse(
+                full_path, status_code=status_code, stat_result=stat_result, headers=headers, media_type=media_type
+            )
+
+        headers["content-encoding"] = encoding
+        return FileResponse(entry.variants[encoding], status_code=status_code, headers=headers, media_type=media_type)
+
+    # ── Internals ───────────────────────────────────────────────────
+
+    def _cache_control(self, full_path: str | os.PathLike) -> str:
+        # Asset names aren't fingerprinted, so pages always revalidate (a cheap
+        # 304) and only their subresources are cached for a while
+        if Path(full_path).suffix.lower() == ".html":
+            return "no-cache"
+        return f"public, max-age={self.max_age}"
+
+    def _is_served(self, path: str) -> bool:
+        parts = Path(path).parts
+        if any(part.startswith(".") for part in parts):
+            return False
+        if parts and parts[0] in self.exclude_dirs:
+            return False
+        suffix = Path(path).suffix.lower()
+        # Directory URLs (suffix-less) resolve to index.html in html mode;
+        # get_response checks that the index actually exists
+        return suffix in SERVED_SUFFIXES or (self.html and suffix == "")
+
+    def _iter_served_files(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            rel_dir = Path(dirpath).relative_to(self.root)
+            dirnames[:] = [
+                d for d in dirnames
+                if not d.startswith(".") and not (rel_dir == Path(".") and d in self.exclude_dirs)
+            ]
+            for name in filenames:
+                if not name.startswith(".") and Path(name).suffix.lower() in SERVED_SUFFIXES:
+                    yield Path(dirpath) / name
+
+    def _entry_for(self, full_path: Path, stat_result: os.stat_result) -> Optional[StaticEntry]:
+        try:
+            relative = full_path.resolve().relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return None
+        entry = self._entries.get(relative)
+        if entry is None or entry.size != stat_result.st_size or entry.mtime != stat_result.st_mtime:
+            return None  # not precompressed yet, or edited since
+        return entry
+
+
+def _encoders():
+    yield "gzip", lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield "br", lambda data: brotli.compress(data, quality=11)
+
+
+def _pick_encoding(accept_encoding: str, variants: dict[str, Path]) -> Optional[str]:
+    """Choose the best available variant the client accepts (brotli over gzip)."""
+    accepted = set()
+    for token in accept_encoding.lower().split(","):
+        name, _, params = token.partition(";")
+        q = params.strip().removeprefix("q=")
+        try:
+            if params and float(q) <= 0:
+                continue  # explicitly refused
+        except ValueError:
+            pass
+        if name.strip():
+            accepted.add(name.strip())
+    for encoding in ("br", "gzip"):
+        if encoding in variants and (encoding in accepted or "*" in accepted):
+            return encoding
+    return None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header names ``etag`` (weak comparison, as for GET)."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
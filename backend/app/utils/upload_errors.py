@@ -0,0 +1,36 @@
+"""
+Custom exceptions for rejected uploads, and per-reason reject counters.
+"""
+import threading
+from collections import Counter
+
+
+class UploadRejectedError(Exception):
+    """
+    Raised when an uploaded file is refused before any work is done on it.
+    Returned to the client as a structured error with ``status_code``.
+    """
+
+    def __init__(self, user_message: str, error_code: str, status_code: int = 400):
+        self.user_message = user_message
+        self.error_code = error_code
+        self.status_code = status_code
+        super().__init__(user_message)
+
+
+# ── Reject counters ─────────────────────────────────────────────────
+
+_rejections: Counter[str] = Counter()
+_lock = threading.Lock()
+
+
+def record_rejection(error_code: str) -> None:
+    """Count a rejected upload by reason."""
+    with _lock:
+        _rejections[error_code] += 1
+
+
+def rejection_stats() -> dict:
+    """Rejected uploads per reason, for the metrics endpoint."""
+    with _lock:
+        return {"total": sum(_rejections.values()), "by_reason": dict(_rejections)}
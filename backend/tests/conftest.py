@@ -3,6 +3,9 @@ Shared test fixtures and configuration.
 """
 import io
 import os
+import shutil
+import tempfile
+from pathlib import Path
 
 import pytest
 from fastapi.testclient import TestClient
@@ -10,10 +13,33 @@ from fastapi.testclient import TestClient
 # Force mock mode and no Gemini key for testing
 os.environ["USE_MOCK_AI"] = "True"
 os.environ["GEMINI_API_KEY"] = ""
+# The shared dummy images are 10x10 — below the production minimum
+os.environ["UPLOAD_MIN_SIDE"] = "1"
+
+# Everything the app writes (lifespan migration, janitor, precompression, uploads)
+# goes to a throwaway directory, never the developer's backend/storage and temp
+_TEST_ROOT = Path(tempfile.mkdtemp(prefix="tryon-tests-"))
+os.environ["TEMP_DIR"] = str(_TEST_ROOT / "temp")
+os.environ["STORAGE_DIR"] = str(_TEST_ROOT / "storage" / "images")
+os.environ["DB_PATH"] = str(_TEST_ROOT / "storage" / "metadata.db")
+os.environ["DERIVATIVE_CACHE_DIR"] = str(_TEST_ROOT / "storage" / "derivatives")
+os.environ["STATIC_CACHE_DIR"] = str(_TEST_ROOT / "storage" / "static_cache")
+os.environ["TRYON_CACHE_DIR"] = str(_TEST_ROOT / "storage" / "tryon_cache")
+
+from app.config import get_settings  # noqa: E402
+
+get_settings.cache_clear()
 
 from app.main import app  # noqa: E402
 
 
+@pytest.fixture(scope="session", autouse=True)
+def _test_root():
+    """Remove the throwaway storage directory after the run."""
+    yield _TEST_ROOT
+    shutil.rmtree(_TEST_ROOT, ignore_errors=True)
+
+
 @pytest.fixture
 def client():
     """FastAPI test client."""
@@ -37,3 +63,14 @@ def dummy_image_bytes():
 def dummy_image_file(dummy_image_bytes):
     """Return a tuple (filename, bytes, content_type) for upload."""
     return ("test.png", io.BytesIO(dummy_image_bytes), "image/png")
+
+
+@pytest.fixture(autouse=True)
+def clear_recommendation_cache():
+    """Cached Gemini suggestions from one test must not answer another."""
+    from app.services.recommendation_cache import get_recommendation_cache
+
+    cache = get_recommendation_cache()
+    if cache is not None:
+        cache.clear()
+    yield
@@ -1,7 +1,19 @@
 """
 Tests for the /combos/{style} endpoint.
 """
-from unittest.mock import patch
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services import combo_service
+
+
+@pytest.fixture
+def tip_table(monkeypatch):
+    table = combo_service.ComboTipTable(styles=combo_service.get_available_styles(), interval=60)
+    monkeypatch.setattr(combo_service, "_tip_table", table)
+    return table
 
 
 class TestCombos:
@@ -77,12 +89,17 @@ class TestCombos:
         assert data["ai_tip"] is None
 
     @patch("app.services.combo_service.get_combo_tip")
-    def test_combo_with_ai_tip(self, mock_tip, client):
+    def test_combo_with_ai_tip(self, mock_tip, client, tip_table):
         """When Gemini is available, ai_tip should be populated."""
         mock_tip.return_value = "Try a pocket square for extra flair."
+        asyncio.run(tip_table.refresh())
+        mock_tip.reset_mock()
+
         response = client.get("/combos/formal")
         data = response.json()
-        # The important thing is the endpoint doesn't crash
+        assert data["ai_tip"] == "Try a pocket square for extra flair."
+        # Served from the precomputed table — the model isn't asked per request
+        mock_tip.assert_not_called()
 
     def test_all_styles_return_valid_responses(self, client):
         """All three styles should return valid responses."""
@@ -92,3 +109,49 @@ class TestCombos:
             data = response.json()
             assert data["status"] == "success"
             assert data["style"] == style
+
+
+class TestComboTipTable:
+    """Tests for precomputed combo tips."""
+
+    def test_failed_refresh_keeps_the_stale_tip(self, tip_table):
+        with patch.object(combo_service, "get_combo_tip", AsyncMock(return_value="Old tip.")):
+            asyncio.run(tip_table.refresh())
+
+        async def flaky(style):
+            if style == "formal":
+                raise TimeoutError("Gemini timed out")
+            return None  # model unavailable
+
+        with patch.object(combo_service, "get_combo_tip", flaky):
+            assert asyncio.run(tip_table.refresh()) == 0
+
+        assert tip_table.get("formal") == "Old tip."
+        assert tip_table.get("party") == "Old tip."
+        assert tip_table.stats()["failures"] == 3
+
+    def test_styles_refresh_concurrently(self, tip_table):
+        styles = combo_service.get_available_styles()
+        in_flight = max_in_flight = 0
+
+        async def refresh():
+            # Every tip waits until all of them have started: a sequential
+            # refresh would never get past the first one
+            all_started = asyncio.Event()
+
+            async def blocking_tip(style):
+                nonlocal in_flight, max_in_flight
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                if max_in_flight == len(styles):
+                    all_started.set()
+                await asyncio.wait_for(all_started.wait(), 5)
+                in_flight -= 1
+                return f"{style} tip"
+
+            with patch.object(combo_service, "get_combo_tip", blocking_tip):
+                await tip_table.refresh()
+
+        asyncio.run(refresh())
+        assert max_in_flight == len(styles)
+        assert tip_table.get("casual") == "casual tip"
@@ -0,0 +1,203 @@
+"""
+Tests for the SQLite connection handling.
+"""
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from app import database
+from app.config import get_settings
+
+
+@pytest.fixture(autouse=True)
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "DB_PATH", tmp_path / "metadata.db")
+    database.init_db()
+    yield
+    database.shutdown_db()
+
+
+def test_connection_is_reused_and_in_wal_mode():
+    conn = database.get_db_connection()
+    assert database.get_db_connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+
+def test_threads_get_their_own_connection():
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(database.get_db_connection()))
+    thread.start()
+    thread.join()
+    assert seen[0] is not database.get_db_connection()
+
+
+def test_parallel_writes_all_land():
+    def writer(n):
+        for i in range(25):
+            database.save_image_metadata(f"{n}-{i}.png", f"/images/{n}-{i}.png")
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(database.list_image_urls()) == 200
+
+
+def test_failed_write_rolls_back():
+    database.save_image_metadata("a.png", "/images/a.png")
+    with pytest.raises(sqlite3.IntegrityError):
+        database.save_image_metadata("a.png", "/images/again.png")  # filename is unique
+    database.set_image_url("a.png", "/images/b.png")
+    assert database.get_image_url("a.png") == "/images/b.png"
+
+
+def test_deleting_rows_releases_their_blob_references():
+    for name in ("a.png", "b.png"):
+        database.add_blob_reference("ab/cd/blob.png", "hash", 10)
+        database.save_image_metadata(name, "/images/ab/cd/blob.png")
+    database.add_blob_reference("ef/gh/other.png", "other", 10)
+    database.save_image_metadata("c.png", "/images/ef/gh/other.png")
+
+    removed = database.delete_images_by_url(
+        ["/images/ab/cd/blob.png"], {"/images/ab/cd/blob.png": "ab/cd/blob.png"}
+    )
+
+    assert removed == 2
+    assert database.list_blob_paths() == ["ef/gh/other.png"]
+
+
+def test_run_db_runs_off_the_event_loop():
+    async def main():
+        loop_thread = threading.get_ident()
+        await database.run_db(database.save_image_metadata, "x.png", "/images/x.png")
+        worker = await database.run_db(threading.get_ident)
+        return loop_thread, worker, await database.run_db(database.get_image_url, "x.png")
+
+    loop_thread, worker, url = asyncio.run(main())
+    assert worker != loop_thread
+    assert url == "/images/x.png"
+
+
+def test_closed_connections_are_reopened():
+    database.get_db_connection()
+    database.close_connections()
+    assert database.db_stats()["connections"] == 0
+    assert database.list_image_urls() == []
+
+
+class TestListImages:
+    """Tests for wardrobe metadata and keyset listing."""
+
+    @pytest.fixture
+    def wardrobe(self):
+        rows = []
+        for i in range(30):
+            rows.append((f"{i}.png", f"/images/{i}.png", {
+                "owner": "alice" if i % 2 else "bob",
+                "style": "formal" if i % 3 == 0 else "casual",
+                "category": "upper_body",
+                "accessories": "Watch, glasses" if i % 5 == 0 else None,
+            }))
+        return database.insert_images(rows)
+
+    def test_pages_cover_every_row_once(self, wardrobe):
+        seen, cursor = [], None
+        while True:
+            page = database.list_images(owner="alice", before_id=cursor, limit=4)
+            seen += [row["id"] for row in page]
+            if len(page) < 4:
+                break
+            cursor = page[-1]["id"]
+        assert seen == sorted((i for n, i in enumerate(wardrobe) if n % 2), reverse=True)
+
+    def test_filters_combine(self, wardrobe):
+        rows = database.list_images(owner="bob", style="formal")
+        assert {row["filename"] for row in rows} == {"0.png", "6.png", "12.png", "18.png", "24.png"}
+
+    def test_accessory_tags_are_normalised_and_filterable(self, wardrobe):
+        rows = database.list_images(accessory="WATCH")
+        assert [row["filename"] for row in rows] == ["25.png", "20.png", "15.png", "10.png", "5.png", "0.png"]
+        assert rows[0]["accessories"] == "watch,glasses"
+        assert [row["filename"] for row in database.list_images(accessory="watch", before_id=rows[1]["id"])] == [
+            "15.png", "10.png", "5.png", "0.png",
+        ]
+
+    def test_filtered_listing_uses_an_index(self):
+        conn = database.get_db_connection()
+        plan = " ".join(
+            row["detail"] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM images i WHERE i.owner = ? AND i.style = ? "
+                "AND i.id < ? ORDER BY i.id DESC LIMIT 50", ("a", "b", 10)
+            )
+        )
+        assert "idx_images_owner_style" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_deleting_an_image_drops_its_tags(self, wardrobe):
+        database.delete_images_by_url(["/images/0.png"])
+        assert "0.png" not in {row["filename"] for row in database.list_images(accessory="watch")}
+        count = database.get_db_connection().execute("SELECT COUNT(*) FROM image_accessories").fetchone()[0]
+        assert count == 10
+
+    def test_unknown_fields_are_rejected(self):
+        with pytest.raises(ValueError):
+            database.save_image_metadata("x.png", "/images/x.png", {"colour": "red"})
+
+
+def test_old_schema_gains_wardrobe_columns(tmp_path, monkeypatch):
+    db_path = tmp_path / "old.db"
+    old = sqlite3.connect(db_path)
+    old.execute(
+        "CREATE TABLE images (id INTEGER PRIMARY KEY AUTOINCREMENT, filename TEXT UNIQUE NOT NULL, "
+        "url TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    old.execute("INSERT INTO images (filename, url) VALUES ('legacy.png', '/images/legacy.png')")
+    old.commit()
+    old.close()
+
+    monkeypatch.setattr(get_settings(), "DB_PATH", db_path)
+    database.init_db()
+    database.save_image_metadata("new.png", "/images/new.png", {"owner": "alice"})
+    assert [row["owner"] for row in database.list_images()] == ["alice", None]
+
+
+class TestSearchImages:
+    """Tests for the FTS5 wardrobe search index."""
+
+    @pytest.fixture
+    def wardrobe(self):
+        database.insert_images([
+            ("1.png", "/images/1.png", {"owner": "alice", "name": "Navy blazer", "style": "formal",
+                                        "accessories": "watch", "category": "upper_body"}),
+            ("2.png", "/images/2.png", {"owner": "alice", "name": "Summer dress", "style": "casual",
+                                        "category": "dresses", "description": "Light floral print, pairs with a watch"}),
+            ("3.png", "/images/3.png", {"owner": "bob", "name": "Denim jacket", "style": "casual",
+                                        "accessories": "sunglasses,chain", "category": "upper_body"}),
+        ])
+
+    def test_prefix_words_must_all_match(self, wardrobe):
+        assert [r["filename"] for r in database.search_images("blaz form")] == ["1.png"]
+        assert {r["filename"] for r in database.search_images("upper")} == {"1.png", "3.png"}
+
+    def test_name_and_tags_outrank_description(self, wardrobe):
+        assert [r["filename"] for r in database.search_images("watch")] == ["1.png", "2.png"]
+
+    def test_owner_filter(self, wardrobe):
+        assert [r["filename"] for r in database.search_images("casual", owner="bob")] == ["3.png"]
+
+    def test_fts_syntax_in_input_is_literal(self, wardrobe):
+        assert database.search_images('NEAR("x" OR *') == []
+        assert database.search_images("   ") == []
+
+    def test_index_follows_updates_and_deletes(self, wardrobe):
+        conn = database.get_db_connection()
+        conn.execute("UPDATE images SET name = 'Tweed coat' WHERE filename = '1.png'")
+        assert database.search_images("blazer") == []
+        assert [r["filename"] for r in database.search_images("tweed")] == ["1.png"]
+
+        database.delete_images_by_url(["/images/3.png"])
+        assert database.search_images("denim") == []
@@ -0,0 +1,61 @@
+"""
+Tests for on-demand image derivatives.
+"""
+import io
+
+import pytest
+from PIL import Image
+
+from app.config import get_settings
+from app.database import init_db
+from app.services.derivatives import DerivativeParamsError, get_derivative, validate_params
+from app.services.storage import store_bytes
+
+
+@pytest.fixture
+def stored_image(tmp_path, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "DB_PATH", tmp_path / "metadata.db")
+    monkeypatch.setattr(settings, "STORAGE_DIR", tmp_path / "images")
+    monkeypatch.setattr(settings, "DERIVATIVE_CACHE_DIR", tmp_path / "derivatives")
+    init_db()
+
+    buf = io.BytesIO()
+    Image.new("RGB", (1200, 1600), color="teal").save(buf, format="PNG")
+    return store_bytes(buf.getvalue(), ".png")
+
+
+class TestDerivatives:
+    """Tests for derivative rendering and caching."""
+
+    def test_resized_and_reencoded(self, stored_image):
+        source = get_settings().STORAGE_DIR / stored_image[len("/images/"):]
+        path, media_type = get_derivative(source, 256, "webp")
+
+        assert media_type == "image/webp"
+        with Image.open(path) as img:
+            assert img.format == "WEBP"
+            assert img.size == (256, 341)
+        assert path.stat().st_size * 10 < source.stat().st_size
+
+    def test_second_request_is_served_from_cache(self, stored_image):
+        source = get_settings().STORAGE_DIR / stored_image[len("/images/"):]
+        first, _ = get_derivative(source, 128, "jpeg")
+        mtime = first.stat().st_mtime_ns
+        second, _ = get_derivative(source, 128, "jpeg")
+        assert second == first and second.stat().st_mtime_ns == mtime
+
+    def test_params_outside_whitelist_are_rejected(self):
+        assert validate_params(256, "jpg") == (256, "jpeg")
+        with pytest.raises(DerivativeParamsError):
+            validate_params(300, None)
+        with pytest.raises(DerivativeParamsError):
+            validate_params(None, "bmp")
+
+
+def test_derivative_endpoint(client, stored_image):
+    response = client.get(f"{stored_image}?w=256&fmt=webp")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+
+    assert client.get(f"{stored_image}?w=333").status_code == 400
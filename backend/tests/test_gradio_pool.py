@@ -0,0 +1,76 @@
+"""
+Tests for the pooled gradio_client.Client instances.
+"""
+import time
+
+import pytest
+
+from app.services.gradio_pool import GradioClientPool
+
+
+class FakeClient:
+    def __init__(self, space, token):
+        self.space = space
+        self.token = token
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool():
+    return GradioClientPool(max_idle_per_key=2, idle_ttl=60, factory=FakeClient)
+
+
+class TestGradioClientPool:
+    """Tests for GradioClientPool."""
+
+    def test_clients_are_reused(self, pool):
+        with pool.client("yisol/IDM-VTON") as first:
+            pass
+        with pool.client("yisol/IDM-VTON") as second:
+            pass
+        assert first is second
+        assert pool.stats()["created"] == 1
+        assert pool.stats()["reused"] == 1
+
+    def test_pool_is_keyed_by_space_and_token(self, pool):
+        with pool.client("yisol/IDM-VTON", "token-a") as a:
+            pass
+        with pool.client("yisol/IDM-VTON", "token-b") as b:
+            pass
+        with pool.client("levihsu/OOTDiffusion", "token-a") as c:
+            pass
+        assert len({id(a), id(b), id(c)}) == 3
+        assert b.token == "token-b"
+
+    def test_connection_error_discards_client(self, pool):
+        with pytest.raises(ConnectionError):
+            with pool.client("yisol/IDM-VTON") as broken:
+                raise ConnectionError("space restarted")
+        with pool.client("yisol/IDM-VTON") as rebuilt:
+            pass
+        assert broken.closed
+        assert rebuilt is not broken
+
+    def test_other_errors_keep_client(self, pool):
+        with pytest.raises(ValueError):
+            with pool.client("yisol/IDM-VTON") as first:
+                raise ValueError("bad input")
+        with pool.client("yisol/IDM-VTON") as second:
+            pass
+        assert first is second
+
+    def test_idle_clients_expire(self, pool):
+        pool.warm("yisol/IDM-VTON")
+        pool.idle_ttl = 0
+        time.sleep(0.01)
+        assert pool.evict_idle() == 1
+        assert pool.stats()["idle"] == {}
+
+    def test_warm_builds_client_ahead_of_time(self, pool):
+        pool.warm("levihsu/OOTDiffusion", "token")
+        with pool.client("levihsu/OOTDiffusion", "token"):
+            pass
+        assert pool.stats()["created"] == 1
@@ -0,0 +1,187 @@
+"""
+Tests for image utility helpers.
+"""
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+from PIL import Image
+
+from app.config import get_settings
+from app.utils.image_utils import (
+    ingest_upload,
+    inspect_image,
+    parse_size,
+    prepare_for_upload,
+    save_result_to_storage,
+    sniff_image_mime,
+)
+from app.utils.upload_errors import UploadRejectedError
+
+
+class TestPrepareForUpload:
+    """Tests for the pre-upload normalization stage."""
+
+    def test_large_image_is_downsized_to_fit(self, tmp_path):
+        src = tmp_path / "person.png"
+        Image.new("RGB", (3000, 4000), color="green").save(src)
+
+        dest = prepare_for_upload(src, (768, 1024))
+
+        assert dest != src
+        assert dest.suffix == ".jpg"
+        assert prepare_for_upload(src, (768, 1024)) == dest  # reused, not re-encoded
+        with Image.open(dest) as img:
+            assert img.size == (768, 1024)
+            assert img.format == "JPEG"
+        assert dest.stat().st_size < src.stat().st_size
+
+    def test_exif_orientation_is_applied(self, tmp_path):
+        src = tmp_path / "rotated.jpg"
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotate 90° clockwise on display
+        Image.new("RGB", (400, 200), color="blue").save(src, exif=exif)
+
+        dest = prepare_for_upload(src, (768, 1024))
+
+        with Image.open(dest) as img:
+            assert img.size == (200, 400)
+
+    def test_small_upright_jpeg_is_left_alone(self, tmp_path):
+        src = tmp_path / "small.jpg"
+        Image.new("RGB", (100, 100), color="red").save(src)
+        assert prepare_for_upload(src, (768, 1024)) == src
+
+    def test_transparent_png_is_flattened_for_jpeg(self, tmp_path):
+        src = tmp_path / "garment.png"
+        Image.new("RGBA", (50, 50), (0, 0, 0, 0)).save(src)
+
+        dest = prepare_for_upload(src, (768, 1024))
+
+        with Image.open(dest) as img:
+            assert img.mode == "RGB"
+            assert img.getpixel((25, 25))[0] > 240
+
+    def test_webp_output(self, tmp_path):
+        src = tmp_path / "person.png"
+        Image.new("RGB", (2000, 2000), color="white").save(src)
+        dest = prepare_for_upload(src, (768, 1024), fmt="WEBP")
+        assert dest.suffix == ".webp"
+        with Image.open(dest) as img:
+            assert img.size == (768, 768)
+
+
+def test_parse_size():
+    assert parse_size("768x1024") == (768, 1024)
+
+
+class TestSaveResultToStorage:
+    """Tests for storing try-on results without a base64 round-trip."""
+
+    def test_file_result_is_linked_not_rewritten(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(get_settings(), "STORAGE_DIR", tmp_path / "storage")
+        src = tmp_path / "result.tmp"
+        Image.new("RGB", (20, 20), color="red").save(src, format="WEBP")
+
+        url = save_result_to_storage(src, sniff_image_mime(src.read_bytes()[:12]))
+
+        assert url.startswith("/images/") and url.endswith(".webp")
+        dest = tmp_path / "storage" / url[len("/images/"):]
+        assert dest.read_bytes() == src.read_bytes()
+        assert os.path.samefile(dest, src)
+
+    def test_bytes_result_is_written(self, tmp_path, monkeypatch, dummy_image_bytes):
+        monkeypatch.setattr(get_settings(), "STORAGE_DIR", tmp_path / "storage")
+        url = save_result_to_storage(dummy_image_bytes, "image/png")
+        assert (tmp_path / "storage" / url[len("/images/"):]).read_bytes() == dummy_image_bytes
+
+
+class TestIngestUpload:
+    """Tests for streaming upload ingestion."""
+
+    @pytest.fixture(autouse=True)
+    def temp_dir(self, tmp_path, monkeypatch):
+        settings = get_settings()
+        monkeypatch.setattr(settings, "TEMP_DIR", tmp_path)
+        monkeypatch.setattr(settings, "UPLOAD_CHUNK_BYTES", 64)
+        return tmp_path
+
+    def test_hash_is_computed_while_streaming(self, dummy_image_bytes):
+        upload = UploadFile(file=io.BytesIO(dummy_image_bytes), filename="person.png")
+        ingested = asyncio.run(ingest_upload(upload, prefix="person"))
+
+        assert ingested.path.read_bytes() == dummy_image_bytes
+        assert ingested.sha256 == hashlib.sha256(dummy_image_bytes).hexdigest()
+        assert ingested.size == len(dummy_image_bytes)
+
+    def test_oversized_file_is_rejected_and_removed(self, temp_dir, monkeypatch):
+        monkeypatch.setattr(get_settings(), "UPLOAD_MAX_BYTES", 100)
+        upload = UploadFile(file=io.BytesIO(b"x" * 1000), filename="big.png")
+
+        with pytest.raises(UploadRejectedError) as exc:
+            asyncio.run(ingest_upload(upload))
+
+        assert exc.value.status_code == 413
+        assert exc.value.error_code == "file_too_large"
+        assert list(temp_dir.iterdir()) == []
+
+    def test_too_many_pixels_is_rejected_from_the_header(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "UPLOAD_MAX_PIXELS", 50 * 50)
+        buf = io.BytesIO()
+        Image.new("RGB", (100, 100)).save(buf, format="PNG")
+        upload = UploadFile(file=io.BytesIO(buf.getvalue()), filename="wide.png")
+
+        with pytest.raises(UploadRejectedError) as exc:
+            asyncio.run(ingest_upload(upload))
+        assert exc.value.error_code == "image_too_large"
+
+    def test_too_many_pixels_is_rejected_when_header_is_past_first_chunk(self, temp_dir, monkeypatch):
+        monkeypatch.setattr(get_settings(), "UPLOAD_MAX_PIXELS", 50 * 50)
+        buf = io.BytesIO()
+        # A large ICC profile pushes the JPEG frame header out of the first chunk
+        Image.new("RGB", (100, 100)).save(buf, format="JPEG", icc_profile=b"\0" * 4096)
+        upload = UploadFile(file=io.BytesIO(buf.getvalue()), filename="profiled.jpg")
+
+        with pytest.raises(UploadRejectedError) as exc:
+            asyncio.run(ingest_upload(upload))
+        assert exc.value.error_code == "image_too_large"
+        assert list(temp_dir.iterdir()) == []
+
+
+class TestInspectImage:
+    """Tests for header-only upload validation."""
+
+    def _reject_code(self, path):
+        with pytest.raises(UploadRejectedError) as exc:
+            inspect_image(path)
+        return exc.value.error_code, exc.value.status_code
+
+    def test_valid_image_header(self, tmp_path):
+        path = tmp_path / "person.jpg"
+        Image.new("RGB", (300, 400)).save(path)
+        info = inspect_image(path)
+        assert (info.format, info.width, info.height, info.mode) == ("JPEG", 300, 400, "RGB")
+
+    def test_non_image_is_rejected(self, tmp_path):
+        path = tmp_path / "notes.png"
+        path.write_bytes(b"%PDF-1.7 definitely not a photo")
+        assert self._reject_code(path) == ("not_an_image", 415)
+
+    def test_corrupt_header_is_rejected(self, tmp_path):
+        path = tmp_path / "broken.png"
+        path.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x00" * 40)
+        assert self._reject_code(path) == ("corrupt_image", 400)
+
+    def test_unsupported_format_is_rejected(self, tmp_path):
+        path = tmp_path / "anim.gif"
+        Image.new("RGB", (300, 300)).save(path)
+        assert self._reject_code(path) == ("unsupported_format", 415)
+
+    def test_thumbnail_is_rejected(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(get_settings(), "UPLOAD_MIN_SIDE", 128)
+        path = tmp_path / "thumb.png"
+        Image.new("RGB", (64, 400)).save(path)
+        assert self._reject_code(path) == ("image_too_small", 422)
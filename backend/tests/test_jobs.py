@@ -0,0 +1,99 @@
+"""
+Tests for the asynchronous /try_on/jobs API.
+"""
+import io
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+@pytest.fixture
+def live_client():
+    """Test client that runs the app lifespan, so job workers stay alive between requests."""
+    with TestClient(app) as client:
+        yield client
+
+
+def _submit(client, image_bytes):
+    return client.post(
+        "/try_on/jobs",
+        files={
+            "person_image": ("person.png", io.BytesIO(image_bytes), "image/png"),
+            "garment_image": ("garment.png", io.BytesIO(image_bytes), "image/png"),
+        },
+    )
+
+
+class TestTryOnJobs:
+    """Tests for job submission, polling and streaming."""
+
+    def test_submit_returns_job_id_immediately(self, live_client, dummy_image_bytes):
+        response = _submit(live_client, dummy_image_bytes)
+        assert response.status_code == 202
+        data = response.json()
+        assert data["job_id"]
+        assert data["status"] in ("queued", "running")
+
+    def test_poll_until_done(self, live_client, dummy_image_bytes):
+        job_id = _submit(live_client, dummy_image_bytes).json()["job_id"]
+
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            data = live_client.get(f"/try_on/jobs/{job_id}").json()
+            if data["status"] in ("done", "failed"):
+                break
+            time.sleep(0.1)
+
+        assert data["status"] == "done"
+        assert data["position"] == 0
+        assert "/images/" in data["image_url"]
+
+    def test_event_stream_ends_with_done(self, live_client, dummy_image_bytes):
+        job_id = _submit(live_client, dummy_image_bytes).json()["job_id"]
+
+        events = []
+        with live_client.stream("GET", f"/try_on/jobs/{job_id}/events") as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            for line in response.iter_lines():
+                if line.startswith("data: "):
+                    events.append(json.loads(line[len("data: "):]))
+
+        assert events[-1]["status"] == "done"
+        assert events[-1]["image_url"]
+
+    def test_unknown_job_returns_404(self, live_client):
+        response = live_client.get("/try_on/jobs/does-not-exist")
+        assert response.status_code == 404
+
+
+def test_pending_inputs_are_released_when_the_job_finishes(tmp_path):
+    """The janitor must not delete the inputs of a job still waiting in the queue."""
+    import asyncio
+
+    from app.services.job_service import TryOnJobManager
+
+    person = tmp_path / "person_1.png"
+
+    async def main():
+        manager = TryOnJobManager(workers=1, max_queue=10, result_ttl=60)
+        release = asyncio.Event()
+
+        async def run():
+            await release.wait()
+            return "/images/result.png"
+
+        job = await manager.submit(run, inputs=(person,))
+        pending = manager.pending_inputs()
+        release.set()
+        while not job.finished:
+            await manager.wait_for_change(timeout=1)
+        await manager.stop()
+        return pending, manager.pending_inputs()
+
+    pending, after = asyncio.run(main())
+    assert pending == {person}
+    assert after == set()
@@ -0,0 +1,78 @@
+"""
+Tests for the local CPU try-on engine.
+"""
+import asyncio
+import io
+import time
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app.services.local_tryon import render_preview
+from app.services.tryon_service import process_tryon
+
+# Real phone-sized portrait shipped with the frontend
+SAMPLE_PHOTO = Path(__file__).resolve().parents[2] / "person_test.jpg"
+
+
+@pytest.fixture
+def person_and_garment(tmp_path):
+    """A plain-background 'person' (skin-toned head over a grey body) and a red shirt on white."""
+    person = Image.new("RGB", (300, 600), color=(40, 90, 160))
+    draw = ImageDraw.Draw(person)
+    draw.ellipse((120, 40, 180, 120), fill=(224, 172, 140))
+    draw.rectangle((90, 125, 210, 560), fill=(120, 120, 120))
+    person_path = tmp_path / "person.png"
+    person.save(person_path)
+
+    garment = Image.new("RGB", (200, 200), color="white")
+    ImageDraw.Draw(garment).rectangle((40, 30, 160, 180), fill=(200, 20, 20))
+    garment_path = tmp_path / "garment.png"
+    garment.save(garment_path)
+    return person_path, garment_path
+
+
+class TestRenderPreview:
+    """Tests for render_preview."""
+
+    def test_garment_lands_on_torso(self, person_and_garment):
+        person_path, garment_path = person_and_garment
+        result = Image.open(io.BytesIO(render_preview(person_path, garment_path, "upper_body")))
+
+        assert result.size == (300, 600)
+        # Chest turns red, the face and background stay as they were
+        r, g, b = result.getpixel((150, 220))
+        assert r > 150 and g < 90 and b < 90
+        assert result.getpixel((150, 80)) == (224, 172, 140)
+        assert result.getpixel((10, 590)) == (40, 90, 160)
+
+    def test_output_is_deterministic(self, person_and_garment):
+        person_path, garment_path = person_and_garment
+        assert render_preview(person_path, garment_path) == render_preview(person_path, garment_path)
+
+    def test_large_inputs_render_quickly(self, tmp_path):
+        person_path = tmp_path / "big_person.jpg"
+        garment_path = tmp_path / "big_garment.jpg"
+        Image.new("RGB", (3000, 4000), color=(90, 90, 90)).save(person_path)
+        Image.new("RGB", (2000, 2000), color=(10, 10, 200)).save(garment_path)
+
+        # Generous bound: this catches a regression to full-resolution
+        # analysis, not jitter on a slow or loaded runner
+        start = time.monotonic()
+        render_preview(person_path, garment_path, "dresses")
+        assert time.monotonic() - start < 5
+
+    @pytest.mark.skipif(not SAMPLE_PHOTO.exists(), reason="sample photo not in checkout")
+    def test_sample_photo_renders_quickly(self, person_and_garment):
+        _, garment_path = person_and_garment
+        start = time.monotonic()
+        render_preview(SAMPLE_PHOTO, garment_path, "upper_body")
+        assert time.monotonic() - start < 5
+
+
+def test_local_engine_bypasses_mock_mode(person_and_garment):
+    person_path, garment_path = person_and_garment
+    result = asyncio.run(process_tryon(person_path, garment_path, category="upper_body", engine="local"))
+    assert result.mime_type == "image/png"
+    assert result.read_bytes().startswith(b"\x89PNG")
@@ -0,0 +1,199 @@
+"""
+Tests for the group-commit metadata writer.
+"""
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from app import database
+from app.config import get_settings
+from app.services.metadata_writer import MetadataWriter
+
+
+@pytest.fixture(autouse=True)
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "DB_PATH", tmp_path / "metadata.db")
+    database.init_db()
+    yield
+    database.shutdown_db()
+
+
+def test_concurrent_rows_share_commits():
+    writer = MetadataWriter(window_ms=50, max_batch=500)
+
+    async def main():
+        await writer.start()
+        ids = await asyncio.gather(
+            *(asyncio.wrap_future(writer.submit(f"{i}.png", f"/images/{i}.png")) for i in range(100))
+        )
+        await writer.stop()
+        return ids
+
+    ids = asyncio.run(main())
+    assert len(set(ids)) == 100
+    assert len(database.list_image_urls()) == 100
+    assert writer.stats()["batches"] < 10
+
+
+def test_submits_from_threads():
+    writer = MetadataWriter(window_ms=10, max_batch=50)
+
+    async def main():
+        await writer.start()
+        futures = []
+
+        def produce(n):
+            for i in range(20):
+                futures.append(writer.submit(f"{n}-{i}.png", "/images/x.png"))
+
+        threads = [threading.Thread(target=produce, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        await writer.stop()
+        return futures
+
+    futures = asyncio.run(main())
+    assert all(f.done() for f in futures)
+    assert len(database.list_image_urls()) == 80
+    assert writer.stats()["largest_batch"] <= 50
+
+
+def test_stop_flushes_queued_rows():
+    writer = MetadataWriter(window_ms=10_000, max_batch=1000)
+
+    async def main():
+        await writer.start()
+        futures = [writer.submit(f"{i}.png", "/images/x.png") for i in range(10)]
+        await writer.stop()
+        return futures
+
+    futures = asyncio.run(main())
+    assert [f.result() for f in futures]
+    assert len(database.list_image_urls()) == 10
+
+
+def test_bad_row_fails_alone():
+    database.save_image_metadata("taken.png", "/images/taken.png")
+    writer = MetadataWriter(window_ms=50, max_batch=100)
+
+    async def main():
+        await writer.start()
+        results = await asyncio.gather(
+            asyncio.wrap_future(writer.submit("ok-1.png", "/images/1.png")),
+            asyncio.wrap_future(writer.submit("taken.png", "/images/dup.png")),
+            asyncio.wrap_future(writer.submit("ok-2.png", "/images/2.png")),
+            return_exceptions=True,
+        )
+        await writer.stop()
+        return results
+
+    ok1, dup, ok2 = asyncio.run(main())
+    assert isinstance(dup, sqlite3.IntegrityError)
+    assert isinstance(ok1, int) and isinstance(ok2, int)
+    assert len(database.list_image_urls()) == 3
+
+
+def test_cancelled_submit_is_dropped_and_writer_keeps_running():
+    writer = MetadataWriter(window_ms=50, max_batch=100)
+
+    async def main():
+        await writer.start()
+        cancelled = writer.submit("cancelled.png", "/images/cancelled.png")
+        assert cancelled.cancel()
+        kept = await asyncio.wrap_future(writer.submit("kept.png", "/images/kept.png"))
+        later = await asyncio.wait_for(asyncio.wrap_future(writer.submit("later.png", "/images/later.png")), 5)
+        await writer.stop()
+        return kept, later
+
+    kept, later = asyncio.run(main())
+    assert kept and later
+    assert database.get_image_url("cancelled.png") is None
+    assert sorted(database.list_image_urls()) == ["/images/kept.png", "/images/later.png"]
+
+
+def test_failed_flush_fails_its_rows_and_writer_keeps_running(monkeypatch):
+    writer = MetadataWriter(window_ms=10, max_batch=100)
+    real_flush = writer._flush
+    calls = []
+
+    async def flaky_flush(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError("disk on fire")
+        await real_flush(batch)
+
+    monkeypatch.setattr(writer, "_flush", flaky_flush)
+
+    async def main():
+        await writer.start()
+        first = writer.submit("first.png", "/images/first.png")
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(asyncio.wrap_future(first), 5)
+        second = await asyncio.wait_for(asyncio.wrap_future(writer.submit("second.png", "/images/second.png")), 5)
+        await writer.stop()
+        return second
+
+    assert asyncio.run(main()) > 0
+    assert database.list_image_urls() == ["/images/second.png"]
+
+
+def test_writes_directly_when_not_running():
+    writer = MetadataWriter(window_ms=10, max_batch=10)
+    assert writer.submit("direct.png", "/images/direct.png").result() > 0
+    assert database.get_image_url("direct.png") == "/images/direct.png"
+    assert writer.stats()["direct_writes"] == 1
+
+
+def test_stored_results_commit_row_and_blob_reference_together(tmp_path, monkeypatch):
+    from app.services import metadata_writer, storage
+
+    monkeypatch.setattr(get_settings(), "STORAGE_DIR", tmp_path / "images")
+    writer = MetadataWriter(window_ms=50, max_batch=500)
+    monkeypatch.setattr(metadata_writer, "_writer", writer)
+    commits = []
+    real_write = database._write
+
+    def counting_write():
+        commits.append(1)
+        return real_write()
+
+    monkeypatch.setattr(database, "_write", counting_write)
+
+    async def main():
+        await writer.start()
+        urls = await asyncio.gather(*(asyncio.to_thread(storage.store_bytes, b"same", ".png") for _ in range(20)))
+        await writer.stop()
+        return urls
+
+    urls = asyncio.run(main())
+    relative = urls[0][len("/images/"):]
+    refcount = database.get_db_connection().execute(
+        "SELECT refcount FROM blobs WHERE path = ?", (relative,)
+    ).fetchone()[0]
+    assert refcount == 20
+    assert len(database.list_image_urls()) == 20
+    assert len(commits) == writer.stats()["batches"] < 20
+    assert not storage.has_pending_reference(relative)
+
+
+def test_stored_url_is_listed_as_soon_as_it_is_returned(tmp_path, monkeypatch):
+    from app.services import metadata_writer, storage
+
+    monkeypatch.setattr(get_settings(), "STORAGE_DIR", tmp_path / "images")
+    # A long window: the row would sit in the queue if store didn't wait for it
+    writer = MetadataWriter(window_ms=200, max_batch=500)
+    monkeypatch.setattr(metadata_writer, "_writer", writer)
+
+    async def main():
+        await writer.start()
+        url = await asyncio.to_thread(storage.store_bytes, b"fresh", ".png", {"owner": "alice"})
+        listed = [row["url"] for row in database.list_images(owner="alice")]
+        await writer.stop()
+        return url, listed
+
+    url, listed = asyncio.run(main())
+    assert listed == [url]
@@ -3,6 +3,10 @@ Tests for the /recommend endpoint.
 """
 from unittest.mock import patch, AsyncMock
 
+import pytest
+
+from app.config import get_settings
+
 
 class TestRecommend:
     """Tests for the POST /recommend endpoint."""
@@ -99,3 +103,245 @@ class TestRecommend:
         assert data["status"] == "success"
         assert data["source"] == "fallback"
         assert len(data["suggestion"]) > 0
+
+
+class TestGeminiExecutor:
+    """Tests for running Gemini calls off the event loop."""
+
+    def test_concurrency_is_capped_and_loop_stays_free(self, monkeypatch):
+        import asyncio
+        import threading
+        import time
+
+        from app.services import gemini_service
+        from app.services.remote_executor import RemoteCallExecutor
+
+        executor = RemoteCallExecutor(max_workers=2, limits={"gemini": 2}, thread_name_prefix="gemini")
+        monkeypatch.setattr(gemini_service, "_executor", executor)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def slow_call(cancel):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.1)
+            with lock:
+                active[0] -= 1
+            return "ok"
+
+        async def main():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            tick_task = asyncio.create_task(ticker())
+            results = await asyncio.gather(*(gemini_service._run_gemini(slow_call) for _ in range(6)))
+            tick_task.cancel()
+            return results, ticks
+
+        results, ticks = asyncio.run(main())
+        gemini_service.shutdown_gemini_executor()
+        assert results == ["ok"] * 6
+        assert peak[0] == 2
+        assert ticks > 10  # the event loop kept running during the calls
+        stats = executor.stats()["backends"]["gemini"]
+        assert stats["calls"] == 6
+        assert stats["queue_wait_max_ms"] >= 100
+
+    @patch("app.services.gemini_service._get_model")
+    def test_slow_gemini_times_out_to_fallback(self, mock_get_model, client, monkeypatch):
+        import time
+
+        from app.services import gemini_service
+
+        monkeypatch.setattr(get_settings(), "GEMINI_TIMEOUT_SECONDS", 0.05)
+        monkeypatch.setattr(get_settings(), "GEMINI_MAX_CONCURRENCY", 1)
+        gemini_service.shutdown_gemini_executor()
+        mock_get_model.return_value.generate_content.side_effect = lambda content: time.sleep(0.3)
+
+        data = client.post("/recommend", json={"occasion": "party"}).json()
+        assert data["source"] == "fallback"
+        assert gemini_service.get_gemini_executor().stats()["timeouts"] == 1
+        gemini_service.shutdown_gemini_executor()
+
+    def test_slot_wait_counts_against_the_timeout(self, monkeypatch):
+        import asyncio
+        import threading
+
+        from app.services import gemini_service
+        from app.services.remote_executor import RemoteCallExecutor
+
+        monkeypatch.setattr(get_settings(), "GEMINI_TIMEOUT_SECONDS", 0.1)
+        monkeypatch.setattr(gemini_service, "_executor", RemoteCallExecutor(max_workers=1, limits={"gemini": 1}))
+        release = threading.Event()
+
+        async def main():
+            hog = asyncio.ensure_future(gemini_service._run_gemini(lambda cancel: release.wait(5)))
+            await asyncio.sleep(0.01)
+            try:
+                with pytest.raises(asyncio.TimeoutError):
+                    await gemini_service._run_gemini(lambda cancel: "never runs")
+            finally:
+                release.set()
+                await asyncio.gather(hog, return_exceptions=True)
+
+        asyncio.run(main())
+        gemini_service.shutdown_gemini_executor()
+
+
+class TestRecommendationCache:
+    """Tests for reusing Gemini suggestions."""
+
+    @patch("app.services.gemini_service._get_model")
+    def test_repeat_request_skips_the_model(self, mock_get_model, client):
+        mock_model = mock_get_model.return_value
+        mock_model.generate_content.return_value = type("Response", (), {"text": "Loafers and a navy blazer."})()
+
+        first = client.post("/recommend", json={"occasion": "Formal", "colors": ["White", "navy"]}).json()
+        # Same request after normalisation: case, whitespace and colour order differ
+        second = client.post("/recommend", json={"occasion": " formal ", "colors": ["NAVY", "white"]}).json()
+
+        assert first["source"] == "gemini"
+        assert second["source"] == "cache"
+        assert second["suggestion"] == first["suggestion"]
+        assert mock_model.generate_content.call_count == 1
+
+    @patch("app.services.gemini_service._get_model")
+    def test_different_image_is_a_different_entry(self, mock_get_model, client):
+        mock_model = mock_get_model.return_value
+        mock_model.generate_content.return_value = type("Response", (), {"text": "Earth tones suit you."})()
+
+        client.post("/recommend", json={"occasion": "casual", "image_data": "data:image/png;base64,AAAA"})
+        data = client.post("/recommend", json={"occasion": "casual", "image_data": "data:image/png;base64,BBBB"}).json()
+        assert data["source"] == "gemini"
+        assert mock_model.generate_content.call_count == 2
+
+    @patch("app.services.gemini_service._get_model")
+    def test_fallbacks_are_not_cached(self, mock_get_model, client):
+        mock_model = mock_get_model.return_value
+        mock_model.generate_content.side_effect = Exception("API quota exceeded")
+        client.post("/recommend", json={"occasion": "party"})
+
+        mock_model.generate_content.side_effect = None
+        mock_model.generate_content.return_value = type("Response", (), {"text": "Chelsea boots."})()
+        assert client.post("/recommend", json={"occasion": "party"}).json()["source"] == "gemini"
+
+    def test_entries_expire_and_sqlite_tier_is_shared(self, tmp_path, monkeypatch):
+        import asyncio
+        import time
+
+        from app import database
+        from app.config import get_settings
+        from app.services.recommendation_cache import RecommendationCache
+
+        monkeypatch.setattr(get_settings(), "DB_PATH", tmp_path / "metadata.db")
+        database.init_db()
+
+        async def main():
+            writer = RecommendationCache(ttl_seconds=60, max_entries=10, use_sqlite=True)
+            other_worker = RecommendationCache(ttl_seconds=60, max_entries=10, use_sqlite=True)
+            await writer.put("k", "suggestion")
+            shared = await other_worker.get("k")
+
+            short = RecommendationCache(ttl_seconds=0.01, max_entries=10)
+            await short.put("k", "suggestion")
+            time.sleep(0.02)
+            return shared, await short.get("k"), other_worker.stats()
+
+        shared, expired, stats = asyncio.run(main())
+        database.shutdown_db()
+        assert shared == "suggestion"
+        assert expired is None
+        assert stats["sqlite_hits"] == 1
+
+
+class TestRecommendStream:
+    """Tests for the POST /recommend/stream endpoint."""
+
+    @staticmethod
+    def _events(response):
+        import json
+
+        events, name = [], None
+        for line in response.text.splitlines():
+            if line.startswith("event: "):
+                name = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((name, json.loads(line[len("data: "):])))
+        return events
+
+    @staticmethod
+    def _chunks(*texts, fail_after=None, delays=None):
+        import time
+
+        def generate(content, stream=False):
+            assert stream
+            for i, text in enumerate(texts):
+                if fail_after is not None and i == fail_after:
+                    raise Exception("connection reset")
+                if delays:
+                    time.sleep(delays[i])
+                yield type("Chunk", (), {"text": text})()
+        return generate
+
+    def test_without_gemini_streams_the_fallback(self, client):
+        events = self._events(client.post("/recommend/stream", json={"occasion": "party"}))
+        assert [name for name, _ in events] == ["chunk", "done"]
+        assert "Chelsea" in events[0][1]["text"]
+        assert events[-1][1]["source"] == "fallback"
+
+    @patch("app.services.gemini_service._get_model")
+    def test_chunks_arrive_in_order_then_done(self, mock_get_model, client):
+        mock_get_model.return_value.generate_content.side_effect = self._chunks("Try a ", "navy ", "blazer.")
+
+        response = client.post("/recommend/stream", json={"occasion": "formal"})
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = self._events(response)
+
+        assert [data["text"] for name, data in events if name == "chunk"] == ["Try a ", "navy ", "blazer."]
+        name, done = events[-1]
+        assert name == "done" and done["source"] == "gemini"
+        assert done["first_chunk_ms"] is not None and done["total_ms"] >= done["first_chunk_ms"]
+
+        # The streamed answer is cached for both endpoints
+        assert client.post("/recommend", json={"occasion": "formal"}).json() == {
+            "status": "success", "suggestion": "Try a navy blazer.", "source": "cache",
+        }
+
+    @patch("app.services.gemini_service._get_model")
+    def test_failure_midway_sends_fallback(self, mock_get_model, client):
+        mock_get_model.return_value.generate_content.side_effect = self._chunks("Try a ", "navy ", fail_after=1)
+
+        events = self._events(client.post("/recommend/stream", json={"occasion": "casual"}))
+        assert [name for name, _ in events] == ["chunk", "fallback", "done"]
+        assert "sneakers" in events[1][1]["text"]
+        assert events[-1][1]["source"] == "fallback"
+
+    @patch("app.services.gemini_service._get_model")
+    def test_slow_stream_is_not_cut_off_by_the_total_timeout(self, mock_get_model, client, monkeypatch):
+        monkeypatch.setattr(get_settings(), "GEMINI_TIMEOUT_SECONDS", 0.3)
+        monkeypatch.setattr(get_settings(), "GEMINI_STREAM_IDLE_SECONDS", 0.3)
+        # 0.6s in total, but never more than 0.1s between chunks
+        mock_get_model.return_value.generate_content.side_effect = self._chunks(
+            "Try ", "a ", "navy ", "blazer ", "with ", "loafers.", delays=[0.1] * 6
+        )
+
+        events = self._events(client.post("/recommend/stream", json={"occasion": "party"}))
+        assert "".join(data["text"] for name, data in events if name == "chunk") == "Try a navy blazer with loafers."
+        assert events[-1][1]["source"] == "gemini"
+
+    @patch("app.services.gemini_service._get_model")
+    def test_stalled_stream_falls_back(self, mock_get_model, client, monkeypatch):
+        monkeypatch.setattr(get_settings(), "GEMINI_STREAM_IDLE_SECONDS", 0.1)
+        mock_get_model.return_value.generate_content.side_effect = self._chunks(
+            "Try a ", "navy blazer.", delays=[0, 1.0]
+        )
+
+        events = self._events(client.post("/recommend/stream", json={"occasion": "party"}))
+        assert [name for name, _ in events] == ["chunk", "fallback", "done"]
+        assert events[-1][1]["source"] == "fallback"
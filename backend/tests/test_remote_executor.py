@@ -0,0 +1,124 @@
+"""
+Tests for the dedicated remote-call executor.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.remote_executor import RemoteCallExecutor
+
+
+class TestRemoteCallExecutor:
+    """Tests for RemoteCallExecutor.run."""
+
+    def test_returns_result(self):
+        executor = RemoteCallExecutor(max_workers=2, limits={"space": 1})
+        result = asyncio.run(executor.run("space", lambda cancel: "ok", timeout=5))
+        assert result == "ok"
+        assert executor.stats()["completed"] == 1
+        executor.shutdown()
+
+    def test_timeout_signals_worker_to_cancel(self):
+        executor = RemoteCallExecutor(max_workers=2, limits={"space": 1})
+        stopped = threading.Event()
+
+        def slow(cancel: threading.Event):
+            cancel.wait(5)
+            stopped.set()
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(executor.run("space", slow, timeout=0.05))
+
+        assert stopped.wait(1)
+        assert executor.stats()["timeouts"] == 1
+        executor.shutdown()
+
+    def test_backend_limit_caps_concurrency(self):
+        executor = RemoteCallExecutor(max_workers=4, limits={"space": 1})
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def work(cancel):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+
+        async def main():
+            await asyncio.gather(*(executor.run("space", work, timeout=5) for _ in range(4)))
+
+        asyncio.run(main())
+        assert peak == 1
+        executor.shutdown()
+
+    def test_stats_report_backend_limits(self):
+        executor = RemoteCallExecutor(max_workers=3, limits={"a": 2, "b": 1})
+        stats = executor.stats()
+        assert stats["max_workers"] == 3
+        assert stats["backends"]["a"] == {
+            "limit": 2, "in_flight": 0, "waiting": 0, "calls": 0, "errors": 0,
+            "queue_wait_avg_ms": 0.0, "queue_wait_max_ms": 0.0,
+            "call_time_avg_ms": 0.0, "call_time_max_ms": 0.0,
+        }
+        executor.shutdown()
+
+    def test_stats_separate_queue_wait_from_call_time(self):
+        executor = RemoteCallExecutor(max_workers=2, limits={"space": 1})
+
+        async def main():
+            await asyncio.gather(*(executor.run("space", lambda cancel: time.sleep(0.05), timeout=5) for _ in range(2)))
+
+        asyncio.run(main())
+        backend = executor.stats()["backends"]["space"]
+        assert backend["calls"] == 2
+        assert backend["call_time_max_ms"] >= 50
+        assert backend["queue_wait_max_ms"] >= 40  # the second call waited for the first
+        executor.shutdown()
+
+    def test_semaphores_follow_the_running_loop(self):
+        executor = RemoteCallExecutor(max_workers=1, limits={"space": 1})
+        for _ in range(2):
+            assert asyncio.run(executor.run("space", lambda cancel: "ok", timeout=5)) == "ok"
+        executor.shutdown()
+
+
+def test_timed_out_tryon_cancels_gradio_job(tmp_path, monkeypatch, dummy_image_bytes):
+    """A remote try-on that times out should cancel its gradio job."""
+    from concurrent.futures import Future
+
+    from app.config import get_settings
+    from app.services import tryon_service
+    from app.services.gradio_pool import GradioClientPool
+
+    class HangingJob(Future):
+        cancelled_remotely = threading.Event()
+
+        def cancel(self):
+            self.cancelled_remotely.set()
+            return True
+
+    class FakeClient:
+        def __init__(self, space, token):
+            pass
+
+        def submit(self, **kwargs):
+            return HangingJob()
+
+    person = tmp_path / "person.png"
+    person.write_bytes(dummy_image_bytes)
+
+    monkeypatch.setattr(get_settings(), "TRYON_TIMEOUT_SECONDS", 0.1)
+    monkeypatch.setattr(tryon_service, "get_client_pool", lambda: GradioClientPool(1, 60, factory=FakeClient))
+    monkeypatch.setattr(tryon_service, "_executor", RemoteCallExecutor(max_workers=1, limits={}))
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(tryon_service._real_tryon(person, person, category="upper_body"))
+
+    assert HangingJob.cancelled_remotely.wait(2)
+    tryon_service.shutdown_remote_executor()
@@ -0,0 +1,119 @@
+"""
+Tests for the try-on result cache.
+"""
+import asyncio
+import os
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.config import get_settings
+from app.services.result_cache import TryOnResultCache, make_cache_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TryOnResultCache(tmp_path / "cache", max_bytes=1000, ttl_seconds=60, memory_items=2)
+
+
+class TestResultCache:
+    """Tests for TryOnResultCache."""
+
+    def test_miss_then_hit(self, cache):
+        assert cache.get("ab" * 32) is None
+        cache.put("ab" * 32, b"result")
+        assert cache.get("ab" * 32) == b"result"
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_disk_tier_survives_new_instance(self, cache, tmp_path):
+        cache.put("cd" * 32, b"persisted")
+        fresh = TryOnResultCache(tmp_path / "cache", max_bytes=1000, ttl_seconds=60, memory_items=2)
+        assert fresh.get("cd" * 32) == b"persisted"
+        assert fresh.stats()["memory_hits"] == 0
+
+    def test_expired_entries_are_misses(self, cache):
+        key = "ef" * 32
+        cache.put(key, b"old")
+        cache._memory.clear()
+        old = time.time() - 120
+        os.utime(cache._path_for(key), (old, old))
+        assert cache.get(key) is None
+        assert not cache._path_for(key).exists()
+
+    def test_size_eviction_drops_least_recently_used(self, cache):
+        for i in range(5):
+            key = f"{i:02d}" * 32
+            cache.put(key, b"x" * 300)
+            past = time.time() - 100 + i
+            os.utime(cache._path_for(key), (past, time.time()))
+        assert cache.stats()["disk_bytes"] <= 1000
+        assert not cache._path_for("00" * 32).exists()
+        assert cache._path_for("04" * 32).exists()
+
+    def test_put_file_is_served_from_disk(self, cache, tmp_path):
+        src = tmp_path / "result.png"
+        src.write_bytes(b"x" * 100)
+        cache.put_file("k1", src)
+        assert cache.get("k1") == b"x" * 100
+        assert cache.stats()["disk_bytes"] == 100
+
+    def test_key_depends_on_params(self):
+        base = make_cache_key("p", "g", "upper_body", "yisol/IDM-VTON", {"denoise_steps": 30})
+        assert base == make_cache_key("p", "g", "upper_body", "yisol/IDM-VTON", {"denoise_steps": 30})
+        assert base != make_cache_key("p", "g", "upper_body", "yisol/IDM-VTON", {"denoise_steps": 20})
+        assert base != make_cache_key("p", "g", "dresses", "yisol/IDM-VTON", {"denoise_steps": 30})
+
+
+def test_repeat_tryon_skips_remote_call(tmp_path, cache, monkeypatch, dummy_image_bytes):
+    """The second identical try-on should be served from the cache."""
+    from app.services import tryon_service
+
+    person = tmp_path / "person.png"
+    garment = tmp_path / "garment.png"
+    output = tmp_path / "output.png"
+    for path in (person, garment, output):
+        path.write_bytes(dummy_image_bytes)
+
+    monkeypatch.setattr(get_settings(), "USE_MOCK_AI", False)
+    with patch.object(tryon_service, "get_result_cache", return_value=cache), \
+         patch.object(tryon_service, "_real_tryon", AsyncMock(return_value=str(output))) as remote:
+        first = asyncio.run(tryon_service.process_tryon(person, garment, category="upper_body"))
+        second = asyncio.run(tryon_service.process_tryon(person, garment, category="upper_body"))
+
+    assert first.read_bytes() == second.read_bytes() == dummy_image_bytes
+    assert second.mime_type == "image/png"
+    assert remote.await_count == 1
+
+
+def test_quality_tiers_are_cached_separately(tmp_path, cache, monkeypatch, dummy_image_bytes):
+    """A fast result must not be served for a standard request, and vice versa."""
+    from app.services import tryon_service
+
+    person = tmp_path / "person.png"
+    garment = tmp_path / "garment.png"
+    output = tmp_path / "output.png"
+    for path in (person, garment, output):
+        path.write_bytes(dummy_image_bytes)
+
+    monkeypatch.setattr(get_settings(), "USE_MOCK_AI", False)
+    with patch.object(tryon_service, "get_result_cache", return_value=cache), \
+         patch.object(tryon_service, "_real_tryon", AsyncMock(return_value=str(output))) as remote:
+        for quality in ("fast", "standard", "fast"):
+            asyncio.run(tryon_service.process_tryon(person, garment, category="upper_body", quality=quality))
+
+    assert remote.await_count == 2
+    assert [c.kwargs["quality"] for c in remote.await_args_list] == ["fast", "standard"]
+
+
+def test_quality_presets_override_base_params():
+    from app.services.tryon_service import _backend_for
+
+    _, fast = _backend_for("upper_body", "fast")
+    _, standard = _backend_for("upper_body")
+    assert fast["denoise_steps"] < standard["denoise_steps"]
+    assert fast["seed"] == standard["seed"]
+    with pytest.raises(ValueError):
+        _backend_for("dresses", "ultra")
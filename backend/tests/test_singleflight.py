@@ -0,0 +1,108 @@
+"""
+Tests for single-flight coalescing of identical in-flight calls.
+"""
+import asyncio
+
+import pytest
+
+from app.utils.hf_errors import HFTokenError
+from app.utils.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Tests for SingleFlight.do."""
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "result"
+
+        async def main():
+            return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+        assert asyncio.run(main()) == ["result"] * 5
+        assert calls == 1
+        assert flight.stats() == {"in_flight": 0, "executed": 1, "coalesced": 4}
+
+    def test_different_keys_run_separately(self):
+        flight = SingleFlight()
+
+        async def main():
+            return await asyncio.gather(
+                flight.do("a", lambda: asyncio.sleep(0.01, result="a")),
+                flight.do("b", lambda: asyncio.sleep(0.01, result="b")),
+            )
+
+        assert asyncio.run(main()) == ["a", "b"]
+        assert flight.executed == 2
+
+    def test_errors_reach_every_waiter(self):
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise HFTokenError("quota exceeded")
+
+        async def main():
+            return await asyncio.gather(
+                *(flight.do("key", work) for _ in range(3)), return_exceptions=True
+            )
+
+        results = asyncio.run(main())
+        assert all(isinstance(r, HFTokenError) for r in results)
+
+    def test_cancelling_one_waiter_keeps_shared_call(self):
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def main():
+            first = asyncio.ensure_future(flight.do("key", work))
+            second = asyncio.ensure_future(flight.do("key", work))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+        assert asyncio.run(main()) == "done"
+
+
+def test_tryons_with_different_tokens_are_not_coalesced(tmp_path, monkeypatch, dummy_image_bytes):
+    """A caller with its own token must not share a call made with another token."""
+    from unittest.mock import patch
+
+    from app.config import get_settings
+    from app.services import tryon_service
+
+    person = tmp_path / "person.png"
+    garment = tmp_path / "garment.png"
+    for path in (person, garment):
+        path.write_bytes(dummy_image_bytes)
+    tokens = []
+
+    async def fake_remote(*args, hf_token=None, **kwargs):
+        tokens.append(hf_token)
+        await asyncio.sleep(0.05)
+        return str(person)
+
+    async def main():
+        return await asyncio.gather(*(
+            tryon_service.process_tryon(person, garment, hf_token=token, category="upper_body")
+            for token in (None, "hf_user", "hf_user")
+        ))
+
+    monkeypatch.setattr(get_settings(), "USE_MOCK_AI", False)
+    monkeypatch.setattr(get_settings(), "HF_TOKEN", "")
+    with patch.object(tryon_service, "get_result_cache", return_value=None), \
+         patch.object(tryon_service, "_real_tryon", side_effect=fake_remote):
+        asyncio.run(main())
+
+    assert sorted(tokens, key=str) == [None, "hf_user"]
@@ -0,0 +1,128 @@
+"""
+Tests for frontend static serving and image cache headers.
+"""
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.static_files import PrecompressedStaticFiles
+
+
+@pytest.fixture
+def site(tmp_path):
+    root = tmp_path / "site"
+    (root / "js").mkdir(parents=True)
+    (root / "backend").mkdir()
+    (root / "index.html").write_text("<html>" + "hello " * 500 + "</html>")
+    (root / "js" / "app.js").write_text("console.log('x');\n" * 200)
+    (root / "tiny.css").write_text("body{}")
+    (root / "notes.docx").write_bytes(b"PK\x03\x04")
+    (root / "TODO").write_text("internal notes")
+    (root / "docs").mkdir()
+    (root / "docs" / "index.html").write_text("<html>docs</html>")
+    (root / ".env").write_text("SECRET=1")
+    (root / "backend" / "config.json").write_text("{}")
+
+    files = PrecompressedStaticFiles(
+        directory=root, compressed_dir=tmp_path / "cache", exclude_dirs=("backend",), max_age=600, html=True
+    )
+    app = FastAPI()
+    app.mount("/", files)
+    return files, TestClient(app)
+
+
+class TestPrecompressedStaticFiles:
+    """Tests for PrecompressedStaticFiles."""
+
+    def test_gzip_variant_is_served(self, site):
+        files, client = site
+        files.precompress()
+
+        response = client.get("/js/app.js", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["cache-control"] == "public, max-age=600"
+        assert response.text == "console.log('x');\n" * 200
+
+    def test_identity_when_client_refuses_compression(self, site):
+        files, client = site
+        files.precompress()
+
+        response = client.get("/js/app.js", headers={"Accept-Encoding": "gzip;q=0"})
+        assert "content-encoding" not in response.headers
+        assert response.headers["etag"].endswith('"') and "-gzip" not in response.headers["etag"]
+
+    def test_conditional_request_returns_304(self, site):
+        files, client = site
+        files.precompress()
+
+        first = client.get("/", headers={"Accept-Encoding": "gzip"})
+        assert first.headers["cache-control"] == "no-cache"
+        second = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+        assert second.status_code == 304
+        assert second.content == b""
+
+    def test_small_files_stay_uncompressed(self, site):
+        files, client = site
+        files.precompress()
+        response = client.get("/tiny.css", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+
+    def test_edited_file_falls_back_to_plain_response(self, site, tmp_path):
+        files, client = site
+        files.precompress()
+        (tmp_path / "site" / "js" / "app.js").write_text("console.log('changed');")
+
+        response = client.get("/js/app.js", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert response.text == "console.log('changed');"
+
+    def test_variants_are_real_gzip(self, site, tmp_path):
+        files, _ = site
+        files.precompress()
+        variants = list((tmp_path / "cache").glob("*.gzip"))
+        assert variants
+        assert all(gzip.decompress(v.read_bytes()) for v in variants)
+        assert files.stats()["compressed_variants"] == len(variants)
+
+    @pytest.mark.parametrize("path", ["/notes.docx", "/.env", "/backend/config.json", "/TODO", "/js/"])
+    def test_non_web_files_are_not_served(self, site, path):
+        _, client = site
+        assert client.get(path).status_code == 404
+
+    def test_directory_with_index_is_served(self, site):
+        _, client = site
+        response = client.get("/docs/")
+        assert response.status_code == 200
+        assert response.text == "<html>docs</html>"
+
+
+class TestImageCacheHeaders:
+    """Cache headers on /images/..."""
+
+    def test_stored_image_is_immutable_with_hash_etag(self, client, dummy_image_bytes):
+        from app.services.storage import store_bytes
+
+        url = store_bytes(dummy_image_bytes, ".png")
+        response = client.get(url)
+        assert response.status_code == 200
+        assert "immutable" in response.headers["cache-control"]
+        content_hash = url.rsplit("/", 1)[-1].split(".")[0]
+        assert response.headers["etag"] == f'"{content_hash}"'
+
+        again = client.get(url, headers={"If-None-Match": response.headers["etag"]})
+        assert again.status_code == 304
+
+    def test_derivative_has_its_own_etag(self, client, dummy_image_bytes):
+        from app.services.storage import store_bytes
+
+        url = store_bytes(dummy_image_bytes, ".png")
+        original = client.get(url)
+        derived = client.get(f"{url}?fmt=webp")
+        assert derived.status_code == 200
+        assert derived.headers["etag"] != original.headers["etag"]
+        assert client.get(f"{url}?fmt=webp", headers={"If-None-Match": derived.headers["etag"]}).status_code == 304
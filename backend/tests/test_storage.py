@@ -0,0 +1,152 @@
+"""
+Tests for content-addressed result storage.
+"""
+import hashlib
+import os
+import time
+
+import pytest
+
+from app.config import get_settings
+from app.database import init_db, list_image_urls, list_images, save_image_metadata
+from app.services import storage
+
+
+@pytest.fixture
+def storage_dir(tmp_path, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "DB_PATH", tmp_path / "metadata.db")
+    monkeypatch.setattr(settings, "STORAGE_DIR", tmp_path / "images")
+    init_db()
+    (tmp_path / "images").mkdir()
+    return tmp_path / "images"
+
+
+def test_bytes_are_stored_under_their_hash(storage_dir):
+    url = storage.store_bytes(b"result", ".png")
+
+    digest = hashlib.sha256(b"result").hexdigest()
+    assert url == f"/images/{digest[:2]}/{digest[2:4]}/{digest}.png"
+    assert (storage_dir / url[len("/images/"):]).read_bytes() == b"result"
+
+
+def test_identical_results_share_one_file(storage_dir, tmp_path):
+    source = tmp_path / "output.webp"
+    source.write_bytes(b"same bytes")
+
+    first = storage.store_file(source, ".webp")
+    second = storage.store_bytes(b"same bytes", ".webp")
+
+    assert first == second
+    assert list_image_urls() == [first, first]
+    assert len([p for p in storage_dir.rglob("*") if p.is_file()]) == 1
+
+
+def test_file_is_deleted_with_its_last_reference(storage_dir):
+    url = storage.store_bytes(b"result", ".png")
+    storage.store_bytes(b"result", ".png")
+    first, second = (row["id"] for row in list_images())
+
+    assert storage.delete_image(first) is True
+    assert storage.resolve(url[len("/images/"):]) is not None
+    assert storage.delete_image(second) is True
+    assert storage.resolve(url[len("/images/"):]) is None
+    assert list_images() == []
+    assert storage.delete_image(second) is False
+
+
+def test_file_with_a_queued_reference_survives_delete(storage_dir):
+    url = storage.store_bytes(b"result", ".png")
+    relative = url[len("/images/"):]
+    (row,) = list_images()
+    storage._pending[relative] = 1  # as if another save's row were still queued
+    try:
+        assert storage.delete_image(row["id"]) is True
+        assert storage.resolve(relative) is not None
+    finally:
+        storage._settle(relative)
+
+
+def test_serving_an_image_records_its_access(storage_dir, client, dummy_image_bytes):
+    url = storage.store_bytes(dummy_image_bytes, ".png")
+    path = storage_dir / url[len("/images/"):]
+    stale = time.time() - 3600
+    os.utime(path, (stale, stale))
+
+    assert client.get(url).status_code == 200
+
+    st = path.stat()
+    assert st.st_atime > stale + 3000
+    assert st.st_mtime == pytest.approx(stale)
+
+
+def test_legacy_urls_resolve_after_migration(storage_dir):
+    (storage_dir / "0123abcd.png").write_bytes(b"old result")
+    save_image_metadata("0123abcd.png", "/images/0123abcd.png")
+
+    assert storage.resolve("0123abcd.png") == storage_dir / "0123abcd.png"
+    assert storage.migrate_legacy_files() == 1
+
+    assert not (storage_dir / "0123abcd.png").exists()
+    resolved = storage.resolve("0123abcd.png")
+    assert resolved is not None and resolved.read_bytes() == b"old result"
+
+
+def test_path_traversal_is_not_resolved(storage_dir):
+    assert storage.resolve("../metadata.db") is None
+    assert storage.resolve("ab/../../metadata.db") is None
+
+
+def test_stored_rows_carry_size_and_hash(storage_dir, dummy_image_bytes):
+    storage.store_bytes(dummy_image_bytes, ".png", {"owner": "alice", "style": "casual"})
+    (row,) = list_images()
+    assert (row["width"], row["height"]) == (10, 10)
+    assert row["byte_size"] == len(dummy_image_bytes)
+    assert row["content_hash"] == hashlib.sha256(dummy_image_bytes).hexdigest()
+    assert row["owner"] == "alice"
+
+
+def test_list_endpoint_paginates(storage_dir, client):
+    for i in range(5):
+        save_image_metadata(f"{i}.png", f"/images/{i}.png", {"owner": "alice", "accessories": "watch"})
+
+    first = client.get("/images", params={"owner": "alice", "limit": 3}).json()
+    assert [item["url"].rsplit("/", 1)[-1] for item in first["items"]] == ["4.png", "3.png", "2.png"]
+    assert first["items"][0]["accessories"] == ["watch"]
+
+    second = client.get("/images", params={"owner": "alice", "limit": 3, "cursor": first["next_cursor"]}).json()
+    assert [item["url"].rsplit("/", 1)[-1] for item in second["items"]] == ["1.png", "0.png"]
+    assert second["next_cursor"] is None
+
+
+def test_wardrobe_search_endpoint(storage_dir, client):
+    save_image_metadata("1.png", "/images/1.png", {"name": "Navy blazer", "style": "formal", "accessories": "watch"})
+    save_image_metadata("2.png", "/images/2.png", {"name": "Denim jacket", "style": "casual"})
+
+    body = client.get("/wardrobe/search", params={"q": "nav wat"}).json()
+    assert [item["name"] for item in body["items"]] == ["Navy blazer"]
+    assert body["items"][0]["accessories"] == ["watch"]
+    assert client.get("/wardrobe/search", params={"q": ""}).status_code == 422
+
+
+def test_saved_results_are_described_for_search(storage_dir, client, dummy_image_bytes, monkeypatch):
+    import asyncio
+
+    from app.routers import tryon
+
+    calls = []
+
+    async def fake_describe(path):
+        calls.append(path)
+        return "Navy linen blazer over a white shirt"
+
+    monkeypatch.setattr(tryon, "describe_outfit", fake_describe)
+    url = storage.store_bytes(dummy_image_bytes, ".png", {"owner": "alice"})
+    asyncio.run(tryon._describe_result(url))
+    # An identical result reuses the description instead of asking again
+    storage.store_bytes(dummy_image_bytes, ".png", {"owner": "alice"})
+    asyncio.run(tryon._describe_result(url))
+
+    assert len(calls) == 1
+    body = client.get("/wardrobe/search", params={"q": "linen", "owner": "alice"}).json()
+    assert len(body["items"]) == 2
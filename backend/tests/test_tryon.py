@@ -71,6 +71,91 @@ class TestTryOn:
         assert img_response.status_code == 200
         assert img_response.headers["content-type"] in ["image/png", "image/jpeg", "image/webp"]
 
+    def test_try_on_with_local_engine(self, client, dummy_image_bytes):
+        """engine=local should return a preview without the mock delay."""
+        response = client.post(
+            "/try_on",
+            files={
+                "person_image": ("person.png", io.BytesIO(dummy_image_bytes), "image/png"),
+                "garment_image": ("garment.png", io.BytesIO(dummy_image_bytes), "image/png"),
+            },
+            data={"engine": "local"},
+        )
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+
+    def test_try_on_rejects_unknown_engine(self, client, dummy_image_bytes):
+        """An unknown engine should return 400."""
+        response = client.post(
+            "/try_on",
+            files={
+                "person_image": ("person.png", io.BytesIO(dummy_image_bytes), "image/png"),
+                "garment_image": ("garment.png", io.BytesIO(dummy_image_bytes), "image/png"),
+            },
+            data={"engine": "gpu"},
+        )
+        assert response.status_code == 400
+
+    def test_try_on_inline_returns_data_uri(self, client, dummy_image_bytes):
+        """inline=true should also return the result as a data URI."""
+        response = client.post(
+            "/try_on",
+            files={
+                "person_image": ("person.png", io.BytesIO(dummy_image_bytes), "image/png"),
+                "garment_image": ("garment.png", io.BytesIO(dummy_image_bytes), "image/png"),
+            },
+            data={"inline": "true"},
+        )
+        data = response.json()
+        assert data["image_data"].startswith("data:image/png;base64,")
+        assert data["image_url"]
+
+    def test_try_on_rejects_unknown_quality(self, client, dummy_image_bytes):
+        """An unknown quality tier should return 400."""
+        response = client.post(
+            "/try_on",
+            files={
+                "person_image": ("person.png", io.BytesIO(dummy_image_bytes), "image/png"),
+                "garment_image": ("garment.png", io.BytesIO(dummy_image_bytes), "image/png"),
+            },
+            data={"quality": "ultra"},
+        )
+        assert response.status_code == 400
+
+    def test_try_on_rejects_oversized_upload(self, client, dummy_image_bytes, monkeypatch):
+        """Uploads over UPLOAD_MAX_BYTES should get a structured 413."""
+        from app.config import get_settings
+
+        monkeypatch.setattr(get_settings(), "UPLOAD_MAX_BYTES", 10)
+        response = client.post(
+            "/try_on",
+            files={
+                "person_image": ("person.png", io.BytesIO(dummy_image_bytes), "image/png"),
+                "garment_image": ("garment.png", io.BytesIO(dummy_image_bytes), "image/png"),
+            },
+        )
+        assert response.status_code == 413
+        assert response.json()["error_code"] == "file_too_large"
+
+    def test_try_on_rejects_non_image_without_remote_call(self, client, dummy_image_bytes):
+        """A non-image upload should get a structured 415 and never reach the try-on pipeline."""
+        from unittest.mock import patch
+
+        with patch("app.routers.tryon.process_tryon") as pipeline:
+            response = client.post(
+                "/try_on",
+                files={
+                    "person_image": ("person.png", io.BytesIO(b"hello, not an image"), "image/png"),
+                    "garment_image": ("garment.png", io.BytesIO(dummy_image_bytes), "image/png"),
+                },
+            )
+        assert response.status_code == 415
+        assert response.json()["error_code"] == "not_an_image"
+        assert not pipeline.called
+
+        rejects = client.get("/api/metrics").json()["upload_rejects"]
+        assert rejects["by_reason"]["not_an_image"] >= 1
+
     def test_try_on_missing_person_image(self, client, dummy_image_bytes):
         """Missing person_image should return 422 validation error."""
         response = client.post(
@@ -113,3 +198,106 @@ class TestTryOn:
         )
         assert response.status_code == 200
         assert response.json()["status"] == "success"
+
+
+class TestTryOnBatch:
+    """Tests for the POST /try_on/batch endpoint."""
+
+    @staticmethod
+    def _events(response):
+        import json
+
+        events, name = [], None
+        for line in response.text.splitlines():
+            if line.startswith("event: "):
+                name = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((name, json.loads(line[len("data: "):])))
+        return events
+
+    def test_batch_streams_one_result_per_garment(self, client, dummy_image_bytes):
+        response = client.post(
+            "/try_on/batch",
+            files=[
+                ("person_image", ("person.png", io.BytesIO(dummy_image_bytes), "image/png")),
+                ("garment_images", ("shirt.png", io.BytesIO(dummy_image_bytes), "image/png")),
+                ("garment_images", ("skirt.png", io.BytesIO(dummy_image_bytes), "image/png")),
+            ],
+            data={"categories": ["upper_body", "lower_body"]},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = self._events(response)
+        results = [data for name, data in events if name == "result"]
+        assert sorted(r["index"] for r in results) == [0, 1]
+        assert all(r["status"] == "success" and r["image_url"] for r in results)
+        assert {r["category"] for r in results} == {"upper_body", "lower_body"}
+        assert events[-1] == ("done", {"total": 2, "succeeded": 2, "failed": 0})
+
+    def test_batch_rejects_mismatched_categories(self, client, dummy_image_bytes):
+        response = client.post(
+            "/try_on/batch",
+            files=[
+                ("person_image", ("person.png", io.BytesIO(dummy_image_bytes), "image/png")),
+                ("garment_images", ("a.png", io.BytesIO(dummy_image_bytes), "image/png")),
+                ("garment_images", ("b.png", io.BytesIO(dummy_image_bytes), "image/png")),
+                ("garment_images", ("c.png", io.BytesIO(dummy_image_bytes), "image/png")),
+            ],
+            data={"categories": ["upper_body", "lower_body"]},
+        )
+        assert response.status_code == 400
+
+    def test_batch_reports_partial_failures(self, client, dummy_image_bytes):
+        from unittest.mock import patch
+
+        from app.services.tryon_service import TryOnResult
+        from app.utils.hf_errors import HFTokenError
+
+        async def fake_tryon(person_path, clothing_path, category="upper_body", **kwargs):
+            if category == "dresses":
+                raise HFTokenError("Quota exceeded")
+            return TryOnResult(dummy_image_bytes, "image/png")
+
+        with patch("app.routers.tryon.process_tryon", side_effect=fake_tryon):
+            response = client.post(
+                "/try_on/batch",
+                files=[
+                    ("person_image", ("person.png", io.BytesIO(dummy_image_bytes), "image/png")),
+                    ("garment_images", ("shirt.png", io.BytesIO(dummy_image_bytes), "image/png")),
+                    ("garment_images", ("dress.png", io.BytesIO(dummy_image_bytes), "image/png")),
+                ],
+                data={"categories": ["upper_body", "dresses"]},
+            )
+
+        results = {d["garment"]: d for name, d in self._events(response) if name == "result"}
+        assert results["shirt.png"]["status"] == "success"
+        assert results["dress.png"]["status"] == "error"
+        assert results["dress.png"]["error_code"] == "hf_token_required"
+
+    def test_batch_reports_rejected_garment_per_garment(self, client, dummy_image_bytes):
+        from unittest.mock import patch
+
+        from app.services.tryon_service import TryOnResult
+
+        async def fake_tryon(person_path, clothing_path, category="upper_body", **kwargs):
+            return TryOnResult(dummy_image_bytes, "image/png")
+
+        with patch("app.routers.tryon.process_tryon", side_effect=fake_tryon):
+            response = client.post(
+                "/try_on/batch",
+                files=[
+                    ("person_image", ("person.png", io.BytesIO(dummy_image_bytes), "image/png")),
+                    ("garment_images", ("shirt.png", io.BytesIO(dummy_image_bytes), "image/png")),
+                    ("garment_images", ("broken.png", io.BytesIO(b"not an image"), "image/png")),
+                ],
+                data={"categories": ["upper_body"]},
+            )
+
+        assert response.status_code == 200
+        events = self._events(response)
+        results = {d["garment"]: d for name, d in events if name == "result"}
+        assert results["shirt.png"]["status"] == "success"
+        assert results["broken.png"]["status"] == "error"
+        assert results["broken.png"]["error_code"]
+        assert events[-1] == ("done", {"total": 2, "succeeded": 1, "failed": 1})
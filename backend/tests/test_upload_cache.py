@@ -0,0 +1,143 @@
+"""
+Tests for reusing space-side upload handles across try-on calls.
+"""
+import asyncio
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+from app.services import tryon_service
+from app.services.gradio_pool import GradioClientPool
+from app.services.remote_executor import RemoteCallExecutor
+from app.services.upload_cache import UploadHandleCache, is_file_gone_error
+
+
+class TestUploadHandleCache:
+    """Tests for UploadHandleCache."""
+
+    def test_put_then_get(self):
+        cache = UploadHandleCache(ttl_seconds=60, max_entries=10)
+        assert cache.get("hash", "space") is None
+        cache.put("hash", "space", {"path": "/tmp/gradio/abc.jpg"})
+        assert cache.get("hash", "space") == {"path": "/tmp/gradio/abc.jpg"}
+        assert cache.get("hash", "other-space") is None
+
+    def test_entries_expire(self):
+        cache = UploadHandleCache(ttl_seconds=0.01, max_entries=10)
+        cache.put("hash", "space", {"path": "x"})
+        time.sleep(0.02)
+        assert cache.get("hash", "space") is None
+
+    def test_invalidate(self):
+        cache = UploadHandleCache(ttl_seconds=60, max_entries=10)
+        cache.put("hash", "space", {"path": "x"})
+        cache.invalidate("hash", "space")
+        assert cache.get("hash", "space") is None
+        assert cache.stats()["invalidations"] == 1
+
+    def test_concurrent_misses_upload_once(self):
+        cache = UploadHandleCache(ttl_seconds=60, max_entries=10)
+        uploads = []
+
+        def upload():
+            uploads.append(1)
+            time.sleep(0.05)
+            return {"path": "/remote/person.png"}
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            handles = list(pool.map(lambda _: cache.get_or_upload("hash", "space", upload), range(4)))
+
+        assert len(uploads) == 1
+        assert all(h == {"path": "/remote/person.png"} for h in handles)
+        stats = cache.stats()
+        assert stats["coalesced"] + stats["hits"] == 3
+
+    def test_failed_upload_is_not_cached(self):
+        cache = UploadHandleCache(ttl_seconds=60, max_entries=10)
+
+        def fail():
+            raise ConnectionError("upload failed")
+
+        with pytest.raises(ConnectionError):
+            cache.get_or_upload("hash", "space", fail)
+        assert cache.get_or_upload("hash", "space", lambda: {"path": "x"}) == {"path": "x"}
+        assert cache._uploading == {}
+
+    def test_file_gone_errors(self):
+        assert is_file_gone_error(Exception("FileNotFoundError: /tmp/gradio/abc.jpg"))
+        assert not is_file_gone_error(Exception("429 Too Many Requests"))
+
+
+class FakeClient:
+    """Records submitted references; can pretend the space lost its uploads once."""
+
+    def __init__(self, space, token):
+        self.calls = []
+        self.lose_uploads_once = False
+
+    def submit(self, **kwargs):
+        self.calls.append(kwargs)
+        job = Future()
+        if self.lose_uploads_once:
+            self.lose_uploads_once = False
+            job.set_exception(Exception("FileNotFoundError: no such file"))
+        else:
+            job.set_result(["/tmp/result.webp"])
+        return job
+
+
+@pytest.fixture
+def fake_space(tmp_path, monkeypatch, dummy_image_bytes):
+    client = FakeClient("yisol/IDM-VTON", None)
+    cache = UploadHandleCache(ttl_seconds=60, max_entries=10)
+    uploads = []
+
+    def fake_upload(c, path):
+        uploads.append(path)
+        return {"path": f"/remote/{len(uploads)}", "orig_name": "x.png"}
+
+    monkeypatch.setattr(tryon_service, "get_client_pool", lambda: GradioClientPool(1, 60, factory=lambda s, t: client))
+    monkeypatch.setattr(tryon_service, "get_upload_cache", lambda: cache)
+    monkeypatch.setattr(tryon_service, "_executor", RemoteCallExecutor(max_workers=2, limits={}))
+    monkeypatch.setattr(tryon_service, "upload_file", fake_upload)
+
+    person = tmp_path / "person.png"
+    person.write_bytes(dummy_image_bytes)
+    garments = []
+    for i in range(3):
+        garment = tmp_path / f"garment{i}.png"
+        garment.write_bytes(dummy_image_bytes)
+        garments.append(garment)
+
+    yield client, uploads, person, garments
+    tryon_service.shutdown_remote_executor()
+
+
+def test_person_upload_is_reused_across_garments(fake_space):
+    client, uploads, person, garments = fake_space
+
+    for i, garment in enumerate(garments):
+        asyncio.run(tryon_service._real_tryon(
+            person, garment, category="upper_body", person_hash="person", garment_hash=f"garment{i}"
+        ))
+
+    # 1 person upload + 3 garment uploads
+    assert len(uploads) == 4
+    person_refs = {c["dict"]["background"]["path"] for c in client.calls}
+    assert person_refs == {"/remote/1"}
+
+
+def test_dropped_upload_falls_back_to_fresh_upload(fake_space):
+    client, uploads, person, garments = fake_space
+
+    asyncio.run(tryon_service._real_tryon(
+        person, garments[0], category="upper_body", person_hash="person", garment_hash="g0"
+    ))
+    client.lose_uploads_once = True
+    result = asyncio.run(tryon_service._real_tryon(
+        person, garments[1], category="upper_body", person_hash="person", garment_hash="g1"
+    ))
+
+    assert result == "/tmp/result.webp"
+    assert client.calls[-1]["dict"]["background"]["path"] != "/remote/1"